@@ -1,15 +1,19 @@
 import streamlit as st
 import os
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 import base64
 
 # Importation de nos modules personnalisés
 # Assurez-vous que config.py, sheets_connector.py, gemini_oracle.py, utils.py sont dans le même dossier
 from config import (
-    SHEET_NAME, WORKSHEET_NAMES, ASSETS_DIR, AUDIO_CLIPS_DIR, SONG_COVERS_DIR, ALBUM_COVERS_DIR, GENERATED_TEXTS_DIR, GEMINI_API_KEY_NAME
+    SHEET_NAME, WORKSHEET_NAMES, ASSETS_DIR, AUDIO_CLIPS_DIR, SONG_COVERS_DIR, ALBUM_COVERS_DIR, GENERATED_TEXTS_DIR, GEMINI_API_KEY_NAME,
+    SHEETS_QUOTA_REQUESTS_PER_MINUTE, STORAGE_BACKEND, TAIL_WINDOW_ROWS, HISTORY_HOT_WINDOW_DAYS, BATCH_MAX_CONCURRENCY,
+    GEMINI_QUOTA_REQUESTS_PER_MINUTE, GEMINI_QUOTA_TOKENS_PER_MINUTE, GEMINI_MAX_CONCURRENT_REQUESTS_PER_MODEL, GEMINI_BACKEND,
+    GEMINI_INTERACTIVE_CONCURRENCY_RESERVE
 )
 import sheets_connector as sc
+from catalogue_view import CATALOGUE_DESCRIPTION_COLUMNS
 import gemini_oracle as go
 import utils as ut
 
@@ -21,6 +25,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# --- Initialisation de l'Oracle (Gemini) ---
+go.init_gemini()
+
 # --- Initialisation de st.session_state ---
 if 'app_initialized' not in st.session_state:
     st.session_state['app_initialized'] = True
@@ -305,7 +312,8 @@ def _render_update_delete_tab(sheet_name_key: str, unique_id_col: str, display_c
     :param form_key: Clé unique pour le formulaire Streamlit.
     """
     st.subheader(f"Mettre à Jour ou Supprimer un Entrée dans {WORKSHEET_NAMES[sheet_name_key]}")
-    current_df = sc.get_dataframe_from_sheet(sheet_name_key)
+    # Seules les colonnes de la liste déroulante sont lues ; la ligne complète est chargée une fois l'élément choisi
+    current_df = sc.get_columns_from_sheet(sheet_name_key, [unique_id_col, display_col])
 
     if current_df.empty:
         st.info("Aucune donnée à modifier ou supprimer pour le moment.")
@@ -321,7 +329,10 @@ def _render_update_delete_tab(sheet_name_key: str, unique_id_col: str, display_c
     selected_item_id = _get_id_from_display_string(selected_item_display)
     
     if selected_item_id:
-        selected_row = current_df[current_df[unique_id_col] == selected_item_id].iloc[0]
+        selected_row = sc.get_row_by_id(sheet_name_key, unique_id_col, selected_item_id)
+        if selected_row is None:
+            st.warning("Cet élément n'existe plus dans la feuille. Rechargez la page.")
+            return
 
         st.markdown("---")
         st.write(f"**Modification de :** {selected_row[display_col]}")
@@ -430,8 +441,8 @@ def _render_update_delete_tab(sheet_name_key: str, unique_id_col: str, display_c
                     updated_data[col_name] = st.date_input(label, value=date_value, key=f"{form_key}_{col_name}")
                 elif input_type == 'number_input':
                     try:
-                        num_value = float(current_value) if current_value else config.get('default', 0.0)
-                    except ValueError:
+                        num_value = float(current_value) if not pd.isna(current_value) and current_value != '' else config.get('default', 0.0)
+                    except (ValueError, TypeError):
                         num_value = config.get('default', 0.0)
                     updated_data[col_name] = st.number_input(label, value=num_value, key=f"{form_key}_{col_name}", min_value=config.get('min_value'), max_value=config.get('max_value'), step=config.get('step'))
                 elif input_type == 'checkbox':
@@ -530,6 +541,13 @@ def _handle_generic_delete_confirmation(session_state_id_key: str, session_state
 
 # --- Fonctions de Rendu des Pages Spécifiques ---
 
+# Onglets de référence chargés en un seul appel par le Générateur de Contenu
+CONTENT_GENERATOR_REFERENCE_TABS = [
+    "STYLES_MUSICAUX_GALACTIQUES", "MOODS_ET_EMOTIONS", "THEMES_CONSTELLES",
+    "STYLES_LYRIQUES_UNIVERS", "STRUCTURES_SONG_UNIVERSELLES", "VOIX_ET_STYLES_VOCAUX",
+    "PUBLIC_CIBLE_DEMOGRAPHIQUE", "ARTISTES_IA_COSMIQUES"
+]
+
 def render_home_page():
     st.write("Bienvenue dans votre Quartier Général de Micro-Empire Numérique Musical IA. Utilisez le menu latéral pour naviguer.")
     st.info("Pensez à bien configurer vos dossiers d'assets et vos secrets dans les paramètres de votre application Streamlit Cloud!")
@@ -546,6 +564,28 @@ def render_home_page():
         st.success(f"Connexion à Google Sheet '{SHEET_NAME}' réussie.")
     except Exception as e:
         st.error(f"Échec de la connexion à Google Sheet : {e}. Vérifiez les permissions de votre compte de service et le partage du Sheet.")
+    with st.expander("Statistiques du cache des onglets"):
+        display_dataframe(sc.get_cache_stats(), key="cache_stats_display")
+        sheets_budget = sc.get_sheets_quota_remaining()
+        if sheets_budget is not None:
+            st.caption(f"Budget de requêtes Google Sheets disponible : {sheets_budget} / {SHEETS_QUOTA_REQUESTS_PER_MINUTE} par minute")
+        else:
+            st.caption(f"Stockage local ('{STORAGE_BACKEND}') : aucun quota de requêtes.")
+        if st.session_state.get('prefetch_timings') is not None and not st.session_state['prefetch_timings'].empty:
+            st.caption("Dernier préchargement parallèle des onglets d'une page :")
+            display_dataframe(st.session_state['prefetch_timings'], key="prefetch_timings_display")
+    with st.expander("Cache des réponses de l'Oracle"):
+        st.json(go.get_oracle_cache_stats())
+        if st.button("Vider le cache de l'Oracle", key="clear_oracle_cache_button"):
+            go.clear_oracle_cache()
+            st.success("Cache des réponses de l'Oracle vidé.")
+    with st.expander("Quota de l'API Gemini (toutes sessions)"):
+        st.caption(
+            f"Limites partagées : {GEMINI_QUOTA_REQUESTS_PER_MINUTE} requêtes et {GEMINI_QUOTA_TOKENS_PER_MINUTE} tokens par minute, "
+            f"{GEMINI_MAX_CONCURRENT_REQUESTS_PER_MODEL} appels simultanés par modèle dont {GEMINI_INTERACTIVE_CONCURRENCY_RESERVE} "
+            f"réservé(s) aux générations demandées une à une (backend : '{GEMINI_BACKEND}')."
+        )
+        display_dataframe(go.get_gemini_limiter_stats(), key="gemini_limiter_stats_display")
 
 def render_content_generator_page():
     st.header("✍️ Générateur de Contenu Musical par l'Oracle")
@@ -553,21 +593,24 @@ def render_content_generator_page():
 
     content_type = st.radio(
         "Quel type de contenu souhaitez-vous générer ?",
-        ["Paroles de Chanson", "Prompt Audio (pour SUNO)", "Idées de Titres", "Description Marketing", "Prompt Pochette d'Album"],
+        ["Paroles de Chanson", "Prompt Audio (pour SUNO)", "Idées de Titres", "Description Marketing", "Prompt Pochette d'Album", "Lot de Morceaux (Catalogue)"],
         key="content_type_radio"
     )
 
     st.markdown("---")
 
+    # Une seule requête groupée pour tous les onglets de référence utilisés par cette page
+    reference_dfs = sc.get_workbook_snapshot(CONTENT_GENERATOR_REFERENCE_TABS)
+
     # --- Formulaire de Génération de Paroles ---
     if content_type == "Paroles de Chanson":
         st.subheader("Générer des Paroles de Chanson")
         
-        genres_musicaux = sc.get_all_styles_musicaux()['ID_Style_Musical'].tolist()
-        moods = sc.get_all_moods()['ID_Mood'].tolist()
-        themes = sc.get_all_themes()['ID_Theme'].tolist()
-        styles_lyriques = sc.get_all_styles_lyriques()['ID_Style_Lyrique'].tolist()
-        structures_song = sc.get_all_structures_song()['ID_Structure'].tolist()
+        genres_musicaux = reference_dfs["STYLES_MUSICAUX_GALACTIQUES"]['ID_Style_Musical'].tolist()
+        moods = reference_dfs["MOODS_ET_EMOTIONS"]['ID_Mood'].tolist()
+        themes = reference_dfs["THEMES_CONSTELLES"]['ID_Theme'].tolist()
+        styles_lyriques = reference_dfs["STYLES_LYRIQUES_UNIVERS"]['ID_Style_Lyrique'].tolist()
+        structures_song = reference_dfs["STRUCTURES_SONG_UNIVERSELLES"]['ID_Structure'].tolist()
         
         with st.form("lyrics_generator_form"):
             col1, col2 = st.columns(2)
@@ -617,8 +660,11 @@ def render_content_generator_page():
                     break
 
             if all_lyrics_fields_filled:
-                with st.spinner("L'Oracle compose les paroles..."):
-                    generated_lyrics = go.generate_song_lyrics(
+                # Les paroles s'affichent au fil de la génération, puis laissent place à la zone de texte ci-dessous
+                stream_placeholder = st.empty()
+                with stream_placeholder.container():
+                    st.caption("L'Oracle compose les paroles...")
+                    generated_lyrics = st.write_stream(go.stream_song_lyrics(
                         genre_musical=st.session_state.lyrics_genre_musical,
                         mood_principal=st.session_state.lyrics_mood_principal,
                         theme_lyrique_principal=st.session_state.lyrics_theme_lyrique_principal,
@@ -628,9 +674,10 @@ def render_content_generator_page():
                         langue_paroles=st.session_state.lyrics_langue_paroles,
                         niveau_langage_paroles=st.session_state.lyrics_niveau_langage_paroles,
                         imagerie_texte=st.session_state.lyrics_imagerie_texte
-                    )
-                    st.session_state['generated_lyrics'] = generated_lyrics
-                    st.success("Paroles générées avec succès !")
+                    ))
+                stream_placeholder.empty()
+                st.session_state['generated_lyrics'] = generated_lyrics
+                st.success("Paroles générées avec succès !")
             # else: validation message is handled by the loop above
 
         if 'generated_lyrics' in st.session_state and st.session_state.generated_lyrics:
@@ -647,7 +694,7 @@ def render_content_generator_page():
             if save_lyrics_option == "Dans un nouveau Morceau (Google Sheet)":
                 with st.form("save_new_morceau_lyrics_form"):
                     st.info("Ces paroles seront ajoutées à un nouveau morceau dans l'onglet `MORCEAUX_GENERES`.")
-                    artistes_ia_list = [''] + sc.get_all_artistes_ia()['ID_Artiste_IA'].tolist()
+                    artistes_ia_list = [''] + reference_dfs["ARTISTES_IA_COSMIQUES"]['ID_Artiste_IA'].tolist()
                     new_morceau_title = st.text_input("Titre du nouveau morceau", value=f"Nouveau Morceau - {st.session_state.lyrics_genre_musical}", key="new_morceau_lyrics_title")
                     # Removed 'required=True'
                     new_morceau_artist_ia = st.selectbox("Artiste IA Associé", artistes_ia_list, key="new_morceau_lyrics_artist_ia")
@@ -684,7 +731,7 @@ def render_content_generator_page():
                             st.warning("Veuillez remplir le titre et sélectionner l'artiste IA.")
             
             elif save_lyrics_option == "Dans un Morceau Existant (Google Sheet)":
-                morceaux_df_all = sc.get_all_morceaux()
+                morceaux_df_all = sc.get_columns_from_sheet("MORCEAUX_GENERES", ['ID_Morceau', 'Titre_Morceau'])
                 if not morceaux_df_all.empty:
                     morceau_to_update_id_display = st.selectbox(
                         "Sélectionnez le morceau à mettre à jour",
@@ -728,10 +775,10 @@ def render_content_generator_page():
     if content_type == "Prompt Audio (pour SUNO)":
         st.subheader("Générer un Prompt Audio Détaillé (pour SUNO)")
         
-        styles_musicaux = sc.get_all_styles_musicaux()['ID_Style_Musical'].tolist()
-        moods = sc.get_all_moods()['ID_Mood'].tolist()
-        structures_song = sc.get_all_structures_song()['ID_Structure'].tolist()
-        types_voix = sc.get_all_voix_styles()['Type_Vocal_General'].unique().tolist()
+        styles_musicaux = reference_dfs["STYLES_MUSICAUX_GALACTIQUES"]['ID_Style_Musical'].tolist()
+        moods = reference_dfs["MOODS_ET_EMOTIONS"]['ID_Mood'].tolist()
+        structures_song = reference_dfs["STRUCTURES_SONG_UNIVERSELLES"]['ID_Structure'].tolist()
+        types_voix = reference_dfs["VOIX_ET_STYLES_VOCAUX"]['Type_Vocal_General'].unique().tolist()
 
         with st.form("audio_prompt_generator_form"):
             col1, col2 = st.columns(2)
@@ -777,7 +824,7 @@ def render_content_generator_page():
             st.subheader("Prompt Audio Généré (pour SUNO ou autre)")
             st.text_area("Copiez ce prompt pour votre générateur audio :", st.session_state.generated_audio_prompt, height=200, key="displayed_generated_audio_prompt")
 
-            morceaux_df_all = sc.get_all_morceaux()
+            morceaux_df_all = sc.get_columns_from_sheet("MORCEAUX_GENERES", ['ID_Morceau', 'Titre_Morceau'])
             if not morceaux_df_all.empty:
                 morceau_to_update_audio_id_display = st.selectbox(
                     "Liez ce prompt à un morceau existant (Google Sheet) :",
@@ -808,8 +855,8 @@ def render_content_generator_page():
     # --- Formulaire de Génération d'Idées de Titres ---
     if content_type == "Idées de Titres":
         st.subheader("Générer des Idées de Titres de Chansons")
-        themes_list = sc.get_all_themes()['ID_Theme'].tolist()
-        genres_list = sc.get_all_styles_musicaux()['ID_Style_Musical'].tolist()
+        themes_list = reference_dfs["THEMES_CONSTELLES"]['ID_Theme'].tolist()
+        genres_list = reference_dfs["STYLES_MUSICAUX_GALACTIQUES"]['ID_Style_Musical'].tolist()
 
         with st.form("title_generator_form"):
             # Removed 'required=True'
@@ -842,9 +889,9 @@ def render_content_generator_page():
     # --- Formulaire de Génération de Description Marketing ---
     if content_type == "Description Marketing":
         st.subheader("Générer une Description Marketing")
-        styles_musicaux_list = sc.get_all_styles_musicaux()['ID_Style_Musical'].tolist()
-        moods_list = sc.get_all_moods()['ID_Mood'].tolist()
-        public_cible_list = sc.get_all_public_cible()['ID_Public'].tolist()
+        styles_musicaux_list = reference_dfs["STYLES_MUSICAUX_GALACTIQUES"]['ID_Style_Musical'].tolist()
+        moods_list = reference_dfs["MOODS_ET_EMOTIONS"]['ID_Mood'].tolist()
+        public_cible_list = reference_dfs["PUBLIC_CIBLE_DEMOGRAPHIQUE"]['ID_Public'].tolist()
 
         with st.form("marketing_copy_form"):
             col1, col2 = st.columns(2)
@@ -897,8 +944,8 @@ def render_content_generator_page():
     # --- Formulaire de Génération de Prompt Pochette d'Album ---
     if content_type == "Prompt Pochette d'Album":
         st.subheader("Générer un Prompt pour Pochette d'Album (Midjourney/DALL-E)")
-        styles_musicaux_list = sc.get_all_styles_musicaux()['ID_Style_Musical'].tolist()
-        moods_list = sc.get_all_moods()['ID_Mood'].tolist()
+        styles_musicaux_list = reference_dfs["STYLES_MUSICAUX_GALACTIQUES"]['ID_Style_Musical'].tolist()
+        moods_list = reference_dfs["MOODS_ET_EMOTIONS"]['ID_Mood'].tolist()
 
         with st.form("album_art_prompt_form"):
             st.text_input("Nom de l'Album", key="album_art_nom_album") # Removed 'required=True'
@@ -942,6 +989,48 @@ def render_content_generator_page():
             st.subheader("Prompt de Pochette d'Album Généré")
             st.text_area("Copiez ce prompt pour votre générateur d'images :", st.session_state.generated_album_art_prompt, height=300, key="displayed_generated_album_art_prompt")
 
+    # --- Génération d'un Lot de Morceaux ---
+    elif content_type == "Lot de Morceaux (Catalogue)":
+        st.subheader("Générer un Lot de Morceaux pour le Catalogue")
+        st.write("Une ligne par morceau : l'Oracle génère les paroles, le prompt audio et un titre pour chacun, puis ajoute les morceaux complets à `MORCEAUX_GENERES` en une seule écriture.")
+
+        batch_template = pd.DataFrame(columns=go.BATCH_REQUIRED_FIELDS + ['langue_paroles', 'mots_cles_generation', 'duree_estimee', 'id_artiste_ia'])
+        batch_df = st.data_editor(
+            batch_template, num_rows="dynamic", use_container_width=True, key="batch_items_editor",
+            column_config={
+                'genre_musical': st.column_config.SelectboxColumn("Genre Musical", options=reference_dfs["STYLES_MUSICAUX_GALACTIQUES"]['ID_Style_Musical'].tolist(), required=True),
+                'mood_principal': st.column_config.SelectboxColumn("Mood", options=reference_dfs["MOODS_ET_EMOTIONS"]['ID_Mood'].tolist(), required=True),
+                'theme_lyrique_principal': st.column_config.SelectboxColumn("Thème", options=reference_dfs["THEMES_CONSTELLES"]['ID_Theme'].tolist(), required=True),
+                'style_lyrique': st.column_config.SelectboxColumn("Style Lyrique", options=reference_dfs["STYLES_LYRIQUES_UNIVERS"]['ID_Style_Lyrique'].tolist(), required=True),
+                'structure_chanson': st.column_config.SelectboxColumn("Structure", options=reference_dfs["STRUCTURES_SONG_UNIVERSELLES"]['ID_Structure'].tolist(), required=True),
+                'langue_paroles': st.column_config.SelectboxColumn("Langue", options=["Français", "Anglais", "Espagnol"]),
+                'mots_cles_generation': st.column_config.TextColumn("Mots-clés"),
+                'duree_estimee': st.column_config.TextColumn("Durée Estimée"),
+                'id_artiste_ia': st.column_config.SelectboxColumn("Artiste IA", options=reference_dfs["ARTISTES_IA_COSMIQUES"]['ID_Artiste_IA'].tolist()),
+            }
+        )
+        batch_concurrency = st.slider("Morceaux générés en parallèle", min_value=1, max_value=BATCH_MAX_CONCURRENCY, value=BATCH_MAX_CONCURRENCY, key="batch_concurrency")
+
+        if st.button("Générer le Lot", key="generate_batch_button"):
+            if batch_df.empty:
+                st.warning("Ajoutez au moins un morceau au lot.")
+            else:
+                progress_bar = st.progress(0.0, text=f"0 / {len(batch_df)} morceaux")
+                def report_batch_progress(done: int, total: int, report_row: dict):
+                    progress_bar.progress(done / total, text=f"{done} / {total} morceaux (dernier : {report_row['Titre_Morceau'] or report_row['Statut']})")
+                batch_report = go.generate_catalogue_batch(batch_df, max_concurrency=batch_concurrency, progress_callback=report_batch_progress)
+                st.session_state['batch_report'] = batch_report
+                saved_count = int((batch_report['Statut'] == 'sauvegardé').sum())
+                if saved_count == len(batch_report):
+                    st.success(f"{saved_count} morceaux générés et ajoutés au catalogue !")
+                else:
+                    st.warning(f"{saved_count} morceaux sur {len(batch_report)} ajoutés au catalogue. Consultez le rapport ci-dessous.")
+
+        if st.session_state.get('batch_report') is not None:
+            st.markdown("---")
+            st.subheader("Rapport du Dernier Lot")
+            display_dataframe(st.session_state['batch_report'], key="batch_report_display")
+
 def render_copilot_creative_page():
     st.header("💡 Co-pilote Créatif de l'Oracle (Beta)")
     st.write("Laissez l'Oracle vous accompagner en temps réel pour l'écriture de paroles, la composition harmonique ou rythmique.")
@@ -1099,6 +1188,10 @@ def render_multimodal_creation_page():
             st.selectbox("Artiste IA Associé", [''] + artistes_ia_list, key="multi_artiste_ia_name") # Removed 'required=True'
             
         st.text_input("Longueur Estimée du Morceau (ex: '03:45')", key="multi_longueur_morceau") # Removed 'required=True'
+        st.toggle(
+            "Générer les trois prompts en parallèle", key="multi_parallel_mode",
+            help="Un appel par section, lancés en même temps : plus rapide, et une section en échec est relancée seule."
+        )
 
         submit_multimodal_button = st.form_submit_button("Générer les Prompts Multimodaux")
 
@@ -1119,17 +1212,37 @@ def render_multimodal_creation_page():
                     all_multimodal_fields_filled = False
                     break
 
-            if all_multimodal_fields_filled:
-                with st.spinner("L'Oracle orchestre votre création multimodale..."):
-                    multimodal_prompts = go.generate_multimodal_content_prompts(
+            if all_multimodal_fields_filled and st.session_state.get('multi_parallel_mode'):
+                with st.spinner("L'Oracle orchestre votre création multimodale (trois sections en parallèle)..."):
+                    multimodal_prompts, section_timings = go.generate_multimodal_content_prompts_parallel(
                         main_theme=st.session_state.multi_main_theme,
                         main_genre=st.session_state.multi_main_genre,
                         main_mood=st.session_state.multi_main_mood,
                         longueur_morceau=st.session_state.multi_longueur_morceau,
                         artiste_ia_name=st.session_state.multi_artiste_ia_name
                     )
-                    st.session_state['multimodal_prompts'] = multimodal_prompts
+                st.session_state['multimodal_prompts'] = multimodal_prompts
+                st.session_state['multimodal_section_timings'] = section_timings
+                if (section_timings['Statut'] == 'échec').any():
+                    st.warning("Certaines sections n'ont pas pu être générées : relancez-les ci-dessous.")
+                else:
                     st.success("Prompts multimodaux générés avec succès !")
+            elif all_multimodal_fields_filled:
+                st.session_state.pop('multimodal_section_timings', None)
+                # Réponse brute affichée au fil de la génération, puis découpée en trois prompts
+                stream_placeholder = st.empty()
+                with stream_placeholder.container():
+                    st.caption("L'Oracle orchestre votre création multimodale...")
+                    response_text = st.write_stream(go.stream_multimodal_content_prompts(
+                        main_theme=st.session_state.multi_main_theme,
+                        main_genre=st.session_state.multi_main_genre,
+                        main_mood=st.session_state.multi_main_mood,
+                        longueur_morceau=st.session_state.multi_longueur_morceau,
+                        artiste_ia_name=st.session_state.multi_artiste_ia_name
+                    ))
+                stream_placeholder.empty()
+                st.session_state['multimodal_prompts'] = go.parse_multimodal_response(response_text)
+                st.success("Prompts multimodaux générés avec succès !")
                 # else: validation message is handled by the loop above
 
     if 'multimodal_prompts' in st.session_state and st.session_state.multimodal_prompts:
@@ -1145,11 +1258,34 @@ def render_multimodal_creation_page():
         st.write("### Prompt pour l'Image de Pochette (Midjourney/DALL-E) :")
         st.text_area("Copiez pour votre générateur d'images :", st.session_state.multimodal_prompts.get("image_prompt", ""), height=250, key="multi_image_output")
 
+        section_timings = st.session_state.get('multimodal_section_timings')
+        if section_timings is not None:
+            with st.expander("Durée de génération par section"):
+                display_dataframe(section_timings, key="multimodal_section_timings_display")
+            failed_sections = section_timings.loc[section_timings['Statut'] == 'échec', 'Section'].tolist()
+            if failed_sections and st.button(f"Relancer les sections en échec ({len(failed_sections)})", key="retry_multimodal_sections_button"):
+                with st.spinner("L'Oracle relance les sections en échec..."):
+                    retried_prompts, retried_timings = go.generate_multimodal_content_prompts_parallel(
+                        main_theme=st.session_state.multi_main_theme,
+                        main_genre=st.session_state.multi_main_genre,
+                        main_mood=st.session_state.multi_main_mood,
+                        longueur_morceau=st.session_state.multi_longueur_morceau,
+                        artiste_ia_name=st.session_state.multi_artiste_ia_name,
+                        sections=failed_sections
+                    )
+                # Les sections déjà réussies sont conservées telles quelles
+                st.session_state['multimodal_prompts'] = {**st.session_state.multimodal_prompts, **retried_prompts}
+                st.session_state['multimodal_section_timings'] = pd.concat(
+                    [section_timings[~section_timings['Section'].isin(failed_sections)], retried_timings], ignore_index=True
+                ).sort_values('Section', key=lambda sections: sections.map(go.MULTIMODAL_SECTION_KEYS.index)).reset_index(drop=True)
+                st.rerun()
+
 def render_my_tracks_page():
     st.header("🎶 Mes Morceaux Générés")
     st.write("Gérez et consultez toutes vos créations musicales, qu'elles soient entièrement générées par l'IA ou co-créées.")
 
-    morceaux_df = sc.get_all_morceaux()
+    # Vue catalogue : noms des artistes, albums, styles, moods... à côté des identifiants (recherche comprise)
+    morceaux_df = sc.get_catalogue_view().drop(columns=CATALOGUE_DESCRIPTION_COLUMNS)
     
     tab1, tab2, tab3 = st.tabs(["Voir/Rechercher Morceaux", "Ajouter un Nouveau Morceau", "Mettre à Jour/Supprimer Morceau"])
 
@@ -1248,7 +1384,7 @@ def render_audio_player_page():
     st.header("🎵 Lecteur Audios de l'Architecte Ω")
     st.write("Écoutez vos morceaux générés par l'IA, visualisez leurs paroles et marquez vos favoris. Une expérience immersive pour vos créations.")
 
-    morceaux_df_player = sc.get_all_morceaux()
+    morceaux_df_player = sc.get_catalogue_view()
     paroles_existantes_df_player = sc.get_all_paroles_existantes()
 
     if not morceaux_df_player.empty:
@@ -1257,22 +1393,27 @@ def render_audio_player_page():
         
         with col_filter_track:
             st.subheader("Filtres")
-            st.selectbox("Filtrer par Genre", ['Tous'] + morceaux_df_player['ID_Style_Musical_Principal'].unique().tolist(), key="player_filter_genre")
-            st.selectbox("Filtrer par Artiste IA", ['Tous'] + morceaux_df_player['ID_Artiste_IA'].unique().tolist(), key="player_filter_artist")
+            # Les filtres portent sur les identifiants, affichés par leur nom (vue catalogue)
+            genre_names = dict(zip(morceaux_df_player['ID_Style_Musical_Principal'], morceaux_df_player['Nom_Style_Musical']))
+            artist_names = dict(zip(morceaux_df_player['ID_Artiste_IA'], morceaux_df_player['Nom_Artiste_IA']))
+            st.selectbox("Filtrer par Genre", ['Tous'] + list(genre_names), format_func=lambda value: genre_names.get(value, value), key="player_filter_genre")
+            st.selectbox("Filtrer par Artiste IA", ['Tous'] + list(artist_names), format_func=lambda value: artist_names.get(value, value), key="player_filter_artist")
             st.selectbox("Filtrer par Statut", ['Tous'] + morceaux_df_player['Statut_Production'].unique().tolist(), key="player_filter_status")
 
-        filtered_morceaux_player = morceaux_df_player.copy()
+        # Filtres appliqués directement sur la vue catalogue, déjà en mémoire
+        player_mask = pd.Series(True, index=morceaux_df_player.index)
         if st.session_state.player_filter_genre != 'Tous':
-            filtered_morceaux_player = filtered_morceaux_player[filtered_morceaux_player['ID_Style_Musical_Principal'] == st.session_state.player_filter_genre]
+            player_mask &= morceaux_df_player['ID_Style_Musical_Principal'] == st.session_state.player_filter_genre
         if st.session_state.player_filter_artist != 'Tous':
-            filtered_morceaux_player = filtered_morceaux_player[filtered_morceaux_player['ID_Artiste_IA'] == st.session_state.player_filter_artist]
+            player_mask &= morceaux_df_player['ID_Artiste_IA'] == st.session_state.player_filter_artist
         if st.session_state.player_filter_status != 'Tous':
-            filtered_morceaux_player = filtered_morceaux_player[filtered_morceaux_player['Statut_Production'] == st.session_state.player_filter_status]
+            player_mask &= morceaux_df_player['Statut_Production'] == st.session_state.player_filter_status
+        filtered_morceaux_player = morceaux_df_player[player_mask]
 
         with col_select_track:
             st.subheader("Sélection du Morceau")
             if not filtered_morceaux_player.empty:
-                track_options = filtered_morceaux_player.apply(lambda row: f"{row['Titre_Morceau']} ({row['ID_Morceau']}) - {row['ID_Artiste_IA']}", axis=1).tolist()
+                track_options = (filtered_morceaux_player['Titre_Morceau'] + " (" + filtered_morceaux_player['ID_Morceau'] + ") - " + filtered_morceaux_player['Nom_Artiste_IA']).tolist()
                 selected_track_display = st.selectbox("Choisissez un morceau à écouter", track_options, key="player_select_track")
 
                 selected_morceau_id = selected_track_display.split('(')[1].split(')')[0] if selected_track_display else None
@@ -1299,8 +1440,12 @@ def render_audio_player_page():
                 else:
                     st.image("https://via.placeholder.com/200?text=Pas+de+Cover", caption="Aucune image de cover", use_column_width=True)
                 
-                st.markdown(f"**Artiste IA :** {current_morceau['ID_Artiste_IA']}")
-                st.markdown(f"**Genre :** {current_morceau['ID_Style_Musical_Principal']}")
+                st.markdown(f"**Artiste IA :** {current_morceau['Nom_Artiste_IA']}")
+                st.markdown(f"**Genre :** {current_morceau['Nom_Style_Musical']}")
+                if current_morceau['Nom_Album']:
+                    st.markdown(f"**Album :** {current_morceau['Nom_Album']}")
+                if current_morceau['Nom_Mood']:
+                    st.markdown(f"**Mood :** {current_morceau['Nom_Mood']}")
                 st.markdown(f"**Durée Estimée :** {current_morceau['Durée_Estimee']}")
                 st.markdown(f"**Statut :** {current_morceau['Statut_Production']}")
 
@@ -1540,7 +1685,7 @@ def render_stats_trends_sim_page():
     st.header("📊 Stats & Tendances d'Écoute Simulées")
     st.write("Visualisez des statistiques d'écoute simulées pour vos morceaux, identifiez les tendances et suivez les performances virtuelles.")
 
-    morceaux_pour_stats_df = sc.get_all_morceaux()
+    morceaux_pour_stats_df = sc.get_columns_from_sheet("MORCEAUX_GENERES", ['ID_Morceau', 'Titre_Morceau'])
     
     with st.form("stats_simulation_form"):
         st.subheader("Paramètres de Simulation")
@@ -1591,6 +1736,45 @@ def render_stats_trends_sim_page():
         else:
             st.info("Données insuffisantes ou format incorrect pour la visualisation.")
 
+    st.markdown("---")
+    st.subheader("Projection Monte Carlo (Médiane et Bandes P10 / P90)")
+    st.write("Simulez des milliers de scénarios par morceau pour visualiser la tendance médiane et l'incertitude. Ces projections ne sont pas enregistrées dans la feuille de calcul.")
+    with st.form("stats_monte_carlo_form"):
+        morceaux_pour_projection = st.multiselect(
+            "Sélectionnez les Morceaux à Projeter",
+            morceaux_options_stats[1:] if not morceaux_pour_stats_df.empty else [],
+            key="stats_morceaux_a_projeter"
+        )
+        nombre_mois_projection = st.number_input("Nombre de Mois à Projeter", min_value=1, max_value=36, value=12, step=1, key="stats_nombre_mois_projection")
+        nombre_trajectoires = st.number_input("Nombre de Scénarios par Morceau", min_value=100, max_value=20000, value=2000, step=100, key="stats_nombre_trajectoires")
+        graine_simulation = st.number_input("Graine Aléatoire (0 = aléatoire)", min_value=0, value=0, step=1, key="stats_graine_simulation")
+        submit_monte_carlo = st.form_submit_button("Lancer la Projection")
+
+        if submit_monte_carlo:
+            if morceaux_pour_projection:
+                selected_projection_ids = [_get_id_from_display_string(s) for s in morceaux_pour_projection]
+                with st.spinner("L'Oracle explore les futurs possibles..."):
+                    st.session_state['monte_carlo_bands_df'] = go.simulate_streaming_bands(
+                        selected_projection_ids,
+                        int(nombre_mois_projection),
+                        num_trajectories=int(nombre_trajectoires),
+                        seed=int(graine_simulation) or None
+                    )
+            else:
+                st.warning("Veuillez sélectionner au moins un morceau.")
+
+    if 'monte_carlo_bands_df' in st.session_state and not st.session_state.monte_carlo_bands_df.empty:
+        bands_df = st.session_state.monte_carlo_bands_df
+        col_metrique, col_morceau = st.columns(2)
+        with col_metrique:
+            metrique_projection = st.selectbox("Métrique", go.SIMULATED_METRICS, key="stats_metrique_projection")
+        with col_morceau:
+            morceau_projection = st.selectbox("Morceau", bands_df['ID_Morceau'].unique().tolist(), key="stats_morceau_projection")
+        # Les mois sont déjà dans l'ordre chronologique dans le résultat de la simulation
+        band_plot_df = bands_df[(bands_df['Metrique'] == metrique_projection) & (bands_df['ID_Morceau'] == morceau_projection)]
+        st.line_chart(band_plot_df.set_index('Mois_Annee_Stat')[['P10', 'Mediane', 'P90']])
+        display_dataframe(band_plot_df, key="monte_carlo_bands_display")
+
 def render_strategic_directives_page():
     st.header("🎯 Directives Stratégiques de l'Oracle")
     st.write("Recevez des conseils stratégiques de l'Oracle pour optimiser vos créations et votre présence musicale.")
@@ -1647,7 +1831,7 @@ def render_viral_potential_niches_page():
     st.header("📈 Analyse du Potentiel Viral et des Niches")
     st.write("Identifiez les éléments de vos morceaux qui pourraient attirer un large public et explorez les niches musicales potentielles.")
     
-    morceaux_all_viral = sc.get_all_morceaux()
+    morceaux_all_viral = sc.get_columns_from_sheet("MORCEAUX_GENERES", ['ID_Morceau', 'Titre_Morceau'])
     public_cible_list = sc.get_all_public_cible()['ID_Public'].tolist()
 
     with st.form("viral_potential_form"):
@@ -1667,7 +1851,7 @@ def render_viral_potential_niches_page():
         if submit_viral_analysis:
             # Manual validation
             if morceau_to_analyze_id and st.session_state.viral_public_cible:
-                selected_morceau_data = morceaux_all_viral[morceaux_all_viral['ID_Morceau'] == morceau_to_analyze_id].iloc[0].to_dict()
+                selected_morceau_data = sc.get_catalogue_entry(morceau_to_analyze_id) # Noms du genre, du mood et du thème déjà résolus
                 with st.spinner("L'Oracle analyse le potentiel viral..."):
                     viral_analysis_result = go.analyze_viral_potential_and_niche_recommendations(
                         morceau_data=selected_morceau_data,
@@ -2219,21 +2403,61 @@ def render_oracle_history_page():
     st.header("📚 Historique de l'Oracle")
     st.write("Consultez l'historique de toutes vos interactions avec l'Oracle Architecte et évaluez ses générations.")
 
-    historique_df = sc.get_all_historique_generations()
+    # Seules les dernières générations sont lues : le temps de chargement ne dépend pas de la taille de l'historique
+    historique_df = sc.get_recent_historique_generations(TAIL_WINDOW_ROWS)
+    st.caption(f"Affichage des {TAIL_WINDOW_ROWS} dernières générations.")
 
     tab_historique_view, tab_historique_feedback, tab_style_agent = st.tabs(["Voir Historique", "Donner du Feedback", "Agent de Style Personnel"])
 
     with tab_historique_view:
         st.subheader("Historique des Générations")
-        if not historique_df.empty:
+        # Au-delà de la fenêtre récente, l'archive mensuelle n'est lue que pour les mois de la période choisie
+        periode_hist = st.selectbox(
+            "Période",
+            ["Dernières générations", "30 derniers jours", "12 derniers mois", "Période personnalisée", "Tout l'historique (archives comprises)"],
+            key="historique_periode"
+        )
+        if periode_hist == "Dernières générations":
+            view_hist_df = historique_df
+        elif periode_hist == "30 derniers jours":
+            view_hist_df = sc.get_historique_generations(start_date=datetime.now().date() - timedelta(days=30))
+        elif periode_hist == "12 derniers mois":
+            view_hist_df = sc.get_historique_generations(start_date=datetime.now().date() - timedelta(days=365))
+        elif periode_hist == "Période personnalisée":
+            dates_hist = st.date_input(
+                "Du ... au ...",
+                value=(datetime.now().date() - timedelta(days=HISTORY_HOT_WINDOW_DAYS), datetime.now().date()),
+                key="historique_dates"
+            )
+            if len(dates_hist) == 2:
+                view_hist_df = sc.get_historique_generations(start_date=dates_hist[0], end_date=dates_hist[1])
+            else:
+                view_hist_df = historique_df.iloc[0:0] # Seconde date pas encore choisie
+        else:
+            view_hist_df = sc.get_full_history_with_archive()
+
+        if not view_hist_df.empty:
             search_hist_query = st.text_input("Rechercher dans l'historique", key="search_historique")
             if search_hist_query:
-                filtered_hist_df = historique_df[historique_df.apply(lambda row: search_hist_query.lower() in row.astype(str).str.lower().to_string(), axis=1)]
+                filtered_hist_df = view_hist_df[view_hist_df.apply(lambda row: search_hist_query.lower() in row.astype(str).str.lower().to_string(), axis=1)]
             else:
-                filtered_hist_df = historique_df
+                filtered_hist_df = view_hist_df
             display_dataframe(ut.format_dataframe_for_display(filtered_hist_df), key="historique_display")
         else:
-            st.info("Aucun historique de génération pour le moment.")
+            st.info("Aucune génération pour cette période.")
+
+        archive_summary = sc.get_history_archive_summary()
+        if archive_summary['enabled']:
+            with st.expander("Archives de l'historique"):
+                st.caption(
+                    (f"Les générations de plus de {HISTORY_HOT_WINDOW_DAYS} jours sont déplacées chaque jour de la feuille vers des archives mensuelles partagées. "
+                     if archive_summary['rotation_enabled'] else "Archives en consultation seule : la rotation automatique n'est pas activée. ")
+                    + (f"{len(archive_summary['months'])} mois archivés, jusqu'au {archive_summary['archived_until']}." if archive_summary['months'] else "Aucune génération archivée pour le moment.")
+                )
+                if archive_summary['rotation_enabled'] and st.button("Archiver maintenant", key="archive_historique_now"):
+                    with st.spinner("Archivage des anciennes générations..."):
+                        nb_archivees = sc.rotate_historique_generations()
+                    st.success(f"{nb_archivees} génération(s) archivée(s).")
 
     with tab_historique_feedback:
         st.subheader("Donner du Feedback à l'Oracle")
@@ -2282,10 +2506,20 @@ def render_oracle_history_page():
     with tab_style_agent:
         st.subheader("Agent de Style Personnel de l'Oracle")
         st.write("L'Oracle analyse vos préférences basées sur votre historique de feedback positif pour vous suggérer de nouvelles directions créatives.")
+        periode_style = st.selectbox("Période analysée", ["3 derniers mois", "12 derniers mois", "Tout l'historique"], key="style_agent_periode")
+        style_start_date = {
+            "3 derniers mois": datetime.now().date() - timedelta(days=90),
+            "12 derniers mois": datetime.now().date() - timedelta(days=365),
+        }.get(periode_style)
         if not historique_df.empty:
             if st.button("Demander une Suggestion de Style à l'Oracle", key="ask_style_agent"):
                 with st.spinner("L'Oracle analyse votre style personnel..."):
-                    style_suggestion = go.analyze_and_suggest_personal_style(historique_df)
+                    # Seules les colonnes utilisées par l'agent sont lues, archives comprises si la période les couvre
+                    style_historique_df = sc.get_historique_generations(
+                        start_date=style_start_date,
+                        columns=['ID_GenLog', 'Type_Generation', 'Prompt_Envoye_Full', 'Evaluation_Manuelle', 'Tags_Feedback']
+                    )
+                    style_suggestion = go.analyze_and_suggest_personal_style(style_historique_df)
                     st.session_state['personal_style_suggestion'] = style_suggestion
                     st.success("Suggestion de style personnel générée !")
             
@@ -2323,8 +2557,35 @@ page_render_functions = {
     'Lecteur Audios': render_audio_player_page
 }
 
+# --- Onglets lus par chaque page, préchargés en parallèle à la première visite de la page ---
+# (pages lisant un seul onglet non listées : rien à paralléliser)
+PAGE_PREFETCH_TABS = {
+    'Générateur de Contenu': CONTENT_GENERATOR_REFERENCE_TABS + ["MORCEAUX_GENERES"],
+    'Co-pilote Créatif': ["STYLES_MUSICAUX_GALACTIQUES", "MOODS_ET_EMOTIONS", "THEMES_CONSTELLES"],
+    'Création Multimodale': ["THEMES_CONSTELLES", "STYLES_MUSICAUX_GALACTIQUES", "MOODS_ET_EMOTIONS", "ARTISTES_IA_COSMIQUES"],
+    'Mes Morceaux': [
+        "MORCEAUX_GENERES", "ALBUMS_PLANETAIRES", "ARTISTES_IA_COSMIQUES", "STYLES_MUSICAUX_GALACTIQUES",
+        "STYLES_LYRIQUES_UNIVERS", "THEMES_CONSTELLES", "MOODS_ET_EMOTIONS", "VOIX_ET_STYLES_VOCAUX",
+        "STRUCTURES_SONG_UNIVERSELLES"
+    ],
+    'Mes Albums': ["ALBUMS_PLANETAIRES", "ARTISTES_IA_COSMIQUES", "STYLES_MUSICAUX_GALACTIQUES"],
+    'Mes Artistes IA': ["ARTISTES_IA_COSMIQUES", "STYLES_MUSICAUX_GALACTIQUES"],
+    'Directives Stratégiques': ["ARTISTES_IA_COSMIQUES", "STYLES_MUSICAUX_GALACTIQUES"],
+    'Potentiel Viral & Niches': ["MORCEAUX_GENERES", "PUBLIC_CIBLE_DEMOGRAPHIQUE"],
+    'Instruments & Voix': ["INSTRUMENTS_ORCHESTRAUX", "VOIX_ET_STYLES_VOCAUX"],
+    'Lecteur Audios': ["MORCEAUX_GENERES", "PAROLES_EXISTANTES"]
+}
+
+if st.session_state.get('prefetched_page') != st.session_state['current_page']:
+    st.session_state['prefetch_timings'] = sc.prefetch_tabs(PAGE_PREFETCH_TABS.get(st.session_state['current_page'], []))
+    st.session_state['prefetched_page'] = st.session_state['current_page']
+
 # --- Affichage du contenu de la page actuelle ---
-if st.session_state['current_page'] in page_render_functions:
-    page_render_functions[st.session_state['current_page']]()
-else:
-    st.error("Page non trouvée.")
+try:
+    if st.session_state['current_page'] in page_render_functions:
+        page_render_functions[st.session_state['current_page']]()
+    else:
+        st.error("Page non trouvée.")
+finally:
+    # File d'écriture différée vidée si un seuil est atteint, et lignes en échec signalées (même après st.stop())
+    sc.flush_write_behind_at_run_end()
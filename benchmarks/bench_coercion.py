@@ -0,0 +1,73 @@
+# benchmarks/bench_coercion.py
+#
+# Compare la conversion de types historique (apply cellule par cellule) et la conversion
+# vectorisée pilotée par config.COLUMN_TYPES, sur un onglet synthétique de 100 000 lignes.
+# Lancement depuis la racine du projet : python benchmarks/bench_coercion.py [nombre_de_lignes]
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import COLUMN_TYPES, DATE_INPUT_FORMATS, EXPECTED_COLUMNS, WORKSHEET_NAMES
+from utils import coerce_dataframe_types, parse_boolean_string, safe_cast_to_float, safe_cast_to_int
+
+NUM_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+BENCH_SHEETS = ["STATISTIQUES_ORBITALES_SIMULEES", "MORCEAUX_GENERES", "PROJETS_EN_COURS"]
+
+
+def build_raw_tab(sheet_name: str, num_rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Construit un onglet de texte brut, tel que renvoyé par get_all_values."""
+    columns = EXPECTED_COLUMNS[WORKSHEET_NAMES[sheet_name]]
+    column_types = COLUMN_TYPES.get(WORKSHEET_NAMES[sheet_name], {})
+    data = {}
+    for col in columns:
+        col_type = column_types.get(col, 'str')
+        if col_type == 'int':
+            data[col] = rng.integers(0, 2_000_000, num_rows).astype(str)
+        elif col_type == 'float':
+            values = rng.uniform(0, 10_000, num_rows).round(2).astype(str)
+            data[col] = np.where(rng.random(num_rows) < 0.2, np.char.replace(values, '.', ','), values)
+        elif col_type == 'bool':
+            data[col] = rng.choice(['VRAI', 'FAUX', ''], num_rows)
+        elif col_type == 'date':
+            days = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 700, num_rows), unit='D')
+            data[col] = days.strftime('%Y-%m-%d')
+        else:
+            data[col] = np.full(num_rows, f"texte {col}")
+    return pd.DataFrame(data)
+
+
+def legacy_coercion(df: pd.DataFrame, column_types: dict) -> pd.DataFrame:
+    """Reproduit la conversion d'origine : un appel Python par cellule et des dates à format déduit."""
+    for col, col_type in column_types.items():
+        if col_type == 'int':
+            df[col] = df[col].apply(safe_cast_to_int)
+        elif col_type == 'float':
+            df[col] = df[col].apply(safe_cast_to_float)
+        elif col_type == 'bool':
+            df[col] = df[col].apply(parse_boolean_string)
+        elif col_type == 'date':
+            df[col] = pd.to_datetime(df[col], errors='coerce').dt.strftime('%Y-%m-%d').fillna('')
+    return df
+
+
+def time_call(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(42)
+    print(f"Conversion de types sur {NUM_ROWS} lignes")
+    for sheet_name in BENCH_SHEETS:
+        raw_df = build_raw_tab(sheet_name, NUM_ROWS, rng)
+        column_types = COLUMN_TYPES.get(WORKSHEET_NAMES[sheet_name], {})
+        legacy_seconds = time_call(legacy_coercion, raw_df.copy(), column_types)
+        vectorized_seconds = time_call(coerce_dataframe_types, raw_df.copy(), column_types, DATE_INPUT_FORMATS)
+        print(f"{sheet_name:<35} apply: {legacy_seconds:7.3f}s   vectorisé: {vectorized_seconds:7.3f}s   x{legacy_seconds / vectorized_seconds:5.1f}")
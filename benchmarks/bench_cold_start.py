@@ -0,0 +1,48 @@
+# benchmarks/bench_cold_start.py
+#
+# Temps pour obtenir le DataFrame converti d'un onglet dans un processus qui vient de démarrer,
+# selon la source : valeurs brutes à convertir (lecture réseau non comptée) ou réplica SQLite rouvert.
+# Lancement depuis la racine du projet : python benchmarks/bench_cold_start.py [nombre_de_lignes]
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_coercion import BENCH_SHEETS, build_raw_tab
+from config import COLUMN_TYPES, DATE_INPUT_FORMATS, WORKSHEET_NAMES
+from sqlite_replica import SheetsReplica, hash_tab_values
+from utils import coerce_dataframe_types
+
+NUM_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+
+
+def time_call(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(42)
+    print(f"Premier chargement d'un onglet de {NUM_ROWS} lignes")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        replica_path = os.path.join(tmp_dir, "replica.sqlite3")
+        replica = SheetsReplica(replica_path)
+        for sheet_name in BENCH_SHEETS:
+            raw_df = build_raw_tab(sheet_name, NUM_ROWS, rng)
+            column_types = COLUMN_TYPES.get(WORKSHEET_NAMES[sheet_name], {})
+            data = [list(raw_df.columns)] + raw_df.values.tolist()
+            coerced_df = coerce_dataframe_types(raw_df.copy(), column_types, DATE_INPUT_FORMATS)
+            replica.replace_tab(sheet_name, coerced_df, hash_tab_values(data))
+
+            # Le réplica est rouvert, comme au démarrage d'un nouveau processus
+            reopened = SheetsReplica(replica_path)
+            coercion_seconds = time_call(coerce_dataframe_types, raw_df.copy(), column_types, DATE_INPUT_FORMATS)
+            replica_seconds = time_call(reopened.read_tab, sheet_name)
+            print(f"{sheet_name:<35} conversion: {coercion_seconds * 1000:8.1f} ms   réplica: {replica_seconds * 1000:8.1f} ms")
@@ -0,0 +1,61 @@
+# benchmarks/bench_connector.py
+#
+# Mesure les fonctions de sheets_connector sans réseau ni identifiants, sur le stockage en mémoire
+# (config.STORAGE_BACKEND = 'memory') pré-rempli avec des onglets synthétiques.
+# Lancement depuis la racine du projet : python benchmarks/bench_connector.py [nombre_de_lignes] [latence_en_secondes]
+# La latence simulée par appel (0 par défaut) permet d'approcher le comportement face à Google Sheets.
+
+import os
+import sys
+import time
+
+os.environ["STORAGE_BACKEND"] = "memory"
+if len(sys.argv) > 2:
+    os.environ["MEMORY_BACKEND_LATENCY_SECONDS"] = sys.argv[2]
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sheets_connector as sc
+from config import EXPECTED_COLUMNS, WORKSHEET_NAMES
+
+NUM_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+
+def build_rows(sheet_name: str, num_rows: int) -> list:
+    """Onglet synthétique (en-têtes compris) : identifiants uniques, autres cellules textuelles."""
+    columns = EXPECTED_COLUMNS[WORKSHEET_NAMES[sheet_name]]
+    rows = [columns]
+    for i in range(num_rows):
+        rows.append([f"ID{i:07d}" if col_pos == 0 else f"{col}_{i % 50}" for col_pos, col in enumerate(columns)])
+    return rows
+
+
+def timed(label: str, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    print(f"{label:<45} {(time.perf_counter() - start) * 1000:>10.1f} ms")
+    return result
+
+
+if __name__ == "__main__":
+    backend = sc._get_storage_backend()
+    backend.load_tab("MORCEAUX_GENERES", build_rows("MORCEAUX_GENERES", NUM_ROWS))
+    backend.load_tab("HISTORIQUE_GENERATIONS", build_rows("HISTORIQUE_GENERATIONS", NUM_ROWS))
+    id_col = EXPECTED_COLUMNS[WORKSHEET_NAMES["MORCEAUX_GENERES"]][0]
+    filter_col = EXPECTED_COLUMNS[WORKSHEET_NAMES["MORCEAUX_GENERES"]][1]
+
+    print(f"Stockage : {type(backend).__name__}, {NUM_ROWS} lignes par onglet")
+    timed("get_dataframe_from_sheet (froid)", sc.get_dataframe_from_sheet, "MORCEAUX_GENERES")
+    timed("get_dataframe_from_sheet (cache)", sc.get_dataframe_from_sheet, "MORCEAUX_GENERES")
+    timed("get_workbook_snapshot", sc.get_workbook_snapshot)
+    timed("query_sheet (1 filtre)", sc.query_sheet, "MORCEAUX_GENERES", {filter_col: f"{filter_col}_7"})
+    timed("update_row_in_sheet (dernière ligne)", sc.update_row_in_sheet,
+          "MORCEAUX_GENERES", id_col, f"ID{NUM_ROWS - 1:07d}", {filter_col: "modifié"})
+    timed("append_row_to_sheet", sc.append_row_to_sheet,
+          "MORCEAUX_GENERES", {id_col: "NOUVEAU", filter_col: "ajouté"})
+    new_rows = pd.DataFrame({id_col: [f"LOT{i:05d}" for i in range(1_000)], filter_col: "lot"})
+    timed("append_dataframe_to_sheet (1 000 lignes)", sc.append_dataframe_to_sheet, "MORCEAUX_GENERES", new_rows)
+    timed("delete_row_from_sheet", sc.delete_row_from_sheet, "MORCEAUX_GENERES", id_col, "NOUVEAU")
+    timed("get_dataframe_from_sheet (après écritures)", sc.get_dataframe_from_sheet, "MORCEAUX_GENERES")
@@ -0,0 +1,84 @@
+# benchmarks/bench_gemini_limiter.py
+#
+# Plusieurs sessions simulées (threads) appellent en même temps un modèle factice local (FakeGenerativeModel,
+# avec une part d'erreurs 429/503) à travers le limiteur Gemini partagé : débit obtenu, respect du plafond
+# d'appels simultanés, attente en file et nouvelles tentatives par type de génération.
+# Lancement depuis la racine du projet :
+# python benchmarks/bench_gemini_limiter.py [sessions] [appels_par_session] [requetes_par_minute] [taux_erreur]
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEMINI_BACKEND", "fake")
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+import pandas as pd
+
+from fake_gemini import FakeGenerativeModel
+from gemini_oracle import _is_gemini_quota_error, _is_retryable_gemini_error
+from rate_limiting import ModelRateLimiter, TokenBucket
+
+NUM_SESSIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+CALLS_PER_SESSION = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+REQUESTS_PER_MINUTE = int(sys.argv[3]) if len(sys.argv) > 3 else 600
+ERROR_RATE = float(sys.argv[4]) if len(sys.argv) > 4 else 0.2
+MAX_CONCURRENT = 4
+CATEGORIES = ["Paroles de Chanson", "Prompt Audio", "Idées de Titres"]
+
+
+class ConcurrencyProbe:
+    """Enveloppe le modèle factice pour mesurer le nombre maximal d'appels simultanés."""
+
+    def __init__(self, model):
+        self.model = model
+        self.model_name = model.model_name
+        self._lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def generate_content(self, prompt, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            return self.model.generate_content(prompt, **kwargs)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+if __name__ == "__main__":
+    model = ConcurrencyProbe(FakeGenerativeModel("fake-gemini-1.5-pro", latency_seconds=0.1, error_rate=ERROR_RATE, seed=42))
+    limiter = ModelRateLimiter(
+        requests_bucket=TokenBucket(REQUESTS_PER_MINUTE, REQUESTS_PER_MINUTE / 60),
+        tokens_bucket=TokenBucket(1_000_000, 1_000_000 / 60),
+        max_concurrent_per_model=MAX_CONCURRENT,
+        is_retryable=_is_retryable_gemini_error,
+        is_throttled=_is_gemini_quota_error,
+        max_retries=6,
+        base_delay=0.1,
+        max_delay=2.0
+    )
+    failures = []
+
+    def session(session_number: int):
+        for call_number in range(CALLS_PER_SESSION):
+            category = CATEGORIES[(session_number + call_number) % len(CATEGORIES)]
+            try:
+                limiter.call(model.model_name, category, model.generate_content, f"Prompt {session_number}-{call_number}", estimated_tokens=500)
+            except Exception as e:
+                failures.append(e)
+
+    print(f"{NUM_SESSIONS} sessions x {CALLS_PER_SESSION} appels, {REQUESTS_PER_MINUTE} requêtes/minute, "
+          f"{MAX_CONCURRENT} appels simultanés, {ERROR_RATE:.0%} d'erreurs 429/503 simulées")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=NUM_SESSIONS) as pool:
+        list(pool.map(session, range(NUM_SESSIONS)))
+    elapsed = time.perf_counter() - start
+    print(f"Durée : {elapsed:.2f} s - {model.model.call_count} appels au modèle ({model.model.call_count / elapsed * 60:.0f} par minute)")
+    print(f"Appels simultanés au maximum : {model.peak} (plafond {MAX_CONCURRENT}) - échecs définitifs : {len(failures)}")
+    print(pd.DataFrame(limiter.stats()).to_string(index=False))
@@ -0,0 +1,47 @@
+# catalogue_view.py
+
+import pandas as pd
+
+# Références de MORCEAUX_GENERES vers les bibliothèques :
+# (colonne du morceau, onglet référencé, colonne identifiant de l'onglet, {colonne de l'onglet: colonne ajoutée à la vue}).
+# La première colonne ajoutée est le nom affiché ; si la référence est introuvable, elle reprend la valeur brute du morceau.
+CATALOGUE_JOINS = [
+    ('ID_Artiste_IA', 'ARTISTES_IA_COSMIQUES', 'ID_Artiste_IA', {'Nom_Artiste_IA': 'Nom_Artiste_IA', 'Description_Artiste': 'Description_Artiste'}),
+    ('ID_Album_Associe', 'ALBUMS_PLANETAIRES', 'ID_Album', {'Nom_Album': 'Nom_Album'}),
+    ('ID_Style_Musical_Principal', 'STYLES_MUSICAUX_GALACTIQUES', 'ID_Style_Musical', {'Nom_Style_Musical': 'Nom_Style_Musical', 'Description_Detaillee': 'Description_Style_Musical'}),
+    ('ID_Style_Lyrique_Principal', 'STYLES_LYRIQUES_UNIVERS', 'ID_Style_Lyrique', {'Nom_Style_Lyrique': 'Nom_Style_Lyrique', 'Description_Detaillee': 'Description_Style_Lyrique'}),
+    ('Ambiance_Sonore_Specifique', 'MOODS_ET_EMOTIONS', 'ID_Mood', {'Nom_Mood': 'Nom_Mood', 'Description_Nuance': 'Description_Mood'}),
+    ('Theme_Principal_Lyrique', 'THEMES_CONSTELLES', 'ID_Theme', {'Nom_Theme': 'Nom_Theme', 'Description_Conceptuelle': 'Description_Theme'}),
+    ('Structure_Chanson_Specifique', 'STRUCTURES_SONG_UNIVERSELLES', 'ID_Structure', {'Nom_Structure': 'Nom_Structure', 'Schema_Detaille': 'Schema_Structure'}),
+]
+
+# Colonnes ajoutées par la vue : noms affichés, puis descriptions (longs textes)
+CATALOGUE_NAME_COLUMNS = [list(added_cols.values())[0] for _, _, _, added_cols in CATALOGUE_JOINS]
+CATALOGUE_DESCRIPTION_COLUMNS = [view_col for _, _, _, added_cols in CATALOGUE_JOINS for view_col in list(added_cols.values())[1:]]
+
+# Onglets dont dépend la vue : elle est reconstruite dès que l'un d'eux change
+CATALOGUE_SOURCE_TABS = ['MORCEAUX_GENERES'] + list(dict.fromkeys(sheet_name for _, sheet_name, _, _ in CATALOGUE_JOINS))
+
+def build_catalogue_view(morceaux_df: pd.DataFrame, reference_dfs: dict) -> pd.DataFrame:
+    """
+    Vue dénormalisée du catalogue : chaque morceau (dans l'ordre de l'onglet) avec le nom et la description
+    de son artiste, album, styles, mood, thème et structure, joints par `merge` (une jointure par référence).
+    Un identifiant présent plusieurs fois dans une bibliothèque est résolu vers sa première ligne.
+    """
+    view_df = morceaux_df.reset_index(drop=True)
+    for fk_col, sheet_name, key_col, added_cols in CATALOGUE_JOINS:
+        reference_df = reference_dfs[sheet_name]
+        if fk_col not in view_df.columns:
+            view_df[fk_col] = ''
+        if key_col in reference_df.columns:
+            lookup_df = reference_df[reference_df[key_col].astype(str) != ''].drop_duplicates(key_col)
+            lookup_df = pd.DataFrame({fk_col: lookup_df[key_col].astype(str)} | {
+                view_col: lookup_df[ref_col] if ref_col in lookup_df.columns else ''
+                for ref_col, view_col in added_cols.items()
+            })
+            view_df = view_df.merge(lookup_df, on=fk_col, how='left', validate='many_to_one')
+        name_col, *description_cols = added_cols.values()
+        view_df[name_col] = view_df[name_col].fillna(view_df[fk_col]) if name_col in view_df.columns else view_df[fk_col]
+        for description_col in description_cols:
+            view_df[description_col] = view_df[description_col].fillna('') if description_col in view_df.columns else ''
+    return view_df
@@ -20,6 +20,154 @@ GENERATED_TEXTS_DIR = os.path.join(ASSETS_DIR, "texts_generated") # Pour les par
 # GEMINI_API_KEY="AIzaSy...vHk"
 GEMINI_API_KEY_NAME = "GEMINI_API_KEY"
 
+# --- Cache des lectures Google Sheets ---
+# Durée de vie (en secondes) d'un onglet en cache avant relecture depuis Google Sheets
+SHEETS_CACHE_TTL_SECONDS = 600
+
+# --- Rafraîchissement des onglets en arrière-plan (stale-while-revalidate) ---
+# Intervalle de fraîcheur par onglet (secondes), à la place de SHEETS_CACHE_TTL_SECONDS.
+# Un onglet en cache est relu en arrière-plan peu avant la fin de son intervalle ; une fois l'intervalle
+# dépassé, les lecteurs reçoivent encore l'ancienne version pendant la relecture, sans jamais l'attendre.
+TAB_REFRESH_INTERVALS_SECONDS = {
+    "MORCEAUX_GENERES": 60,
+    "HISTORIQUE_GENERATIONS": 60,
+    "SESSIONS_CREATIVES_ORACLE": 120,
+    "STATISTIQUES_ORBITALES_SIMULEES": 300,
+    "PROJETS_EN_COURS": 300,
+    # Bibliothèques de référence, rarement modifiées
+    "STYLES_MUSICAUX_GALACTIQUES": 3600,
+    "STYLES_LYRIQUES_UNIVERS": 3600,
+    "THEMES_CONSTELLES": 3600,
+    "INSTRUMENTS_ORCHESTRAUX": 3600,
+    "STRUCTURES_SONG_UNIVERSELLES": 3600,
+    "VOIX_ET_STYLES_VOCAUX": 3600,
+    "MOODS_ET_EMOTIONS": 3600,
+    "REFERENCES_SONORES_DETAILLES": 3600,
+    "PUBLIC_CIBLE_DEMOGRAPHIQUE": 3600,
+    "PROMPTS_TYPES_ET_GUIDES": 3600,
+    "OUTILS_IA_REFERENCEMENT": 3600,
+    "TIMELINE_EVENEMENTS_CULTURELS": 3600,
+}
+TAB_REFRESH_LEAD_SECONDS = 15 # Relecture lancée ce délai avant la fin de l'intervalle
+TAB_REFRESH_CHECK_INTERVAL_SECONDS = 5 # Fréquence à laquelle le thread cherche les onglets à relire
+# Limite absolue : une copie (cache ou réplica) plus vieille que ce nombre d'intervalles de fraîcheur n'est plus
+# servie, même si le rafraîchissement échoue ; l'onglet est relu depuis le stockage, ou une erreur est affichée.
+TAB_MAX_STALENESS_FACTOR = 3
+# Première synchronisation complète des onglets retardée après le démarrage du processus : les premières pages
+# ne lisent que leurs propres onglets, sans rafale de lectures au démarrage.
+TAB_REFRESH_INITIAL_SYNC_DELAY_SECONDS = 120
+
+# Nombre maximal d'onglets lus en parallèle lors du préchargement des onglets d'une page
+PREFETCH_MAX_WORKERS = 8
+
+# --- Lectures par fenêtre des onglets qui ne font que grandir ---
+# Ces onglets sont lus par la fin (dernières lignes, lignes ajoutées depuis la dernière lecture)
+# et ne font pas partie de la resynchronisation complète périodique.
+TAIL_READ_TABS = ["HISTORIQUE_GENERATIONS"]
+TAIL_WINDOW_ROWS = 200 # Nombre de dernières lignes conservées (et affichées par défaut)
+
+# --- Archivage de l'historique des générations ---
+# Les générations plus anciennes que HISTORY_HOT_WINDOW_DAYS sont retirées de l'onglet HISTORIQUE_GENERATIONS
+# et rangées dans des partitions Parquet mensuelles (une par mois, compressées), consultables depuis l'application.
+# L'archive est la seule copie de ces lignes : elle doit être sur un stockage durable et partagé par toutes les instances
+# (volume réseau monté, répertoire synchronisé avec un bucket...), jamais sur le disque d'un déploiement, perdu au redéploiement.
+# Désactivé par défaut. Activation explicite par variables d'environnement : HISTORY_ARCHIVE_DIR (consultation de l'archive)
+# et HISTORY_ROTATION_ENABLED=1 (déplacement des anciennes lignes, supprimées de l'onglet partagé).
+HISTORY_HOT_WINDOW_DAYS = 90
+HISTORY_ROTATION_INTERVAL_SECONDS = 24 * 3600 # Rotation lancée au plus une fois par intervalle, en arrière-plan
+
+# --- Écriture différée (write-behind) ---
+# Onglets en ajout seul dont les nouvelles lignes (écrites via queue_row_for_append) sont regroupées et envoyées en arrière-plan.
+# Les lignes restent en file d'une exécution du script à l'autre jusqu'à l'un des deux seuils ci-dessous ; la file est
+# aussi vidée à l'arrêt du processus, mais un arrêt brutal peut perdre jusqu'à WRITE_BEHIND_FLUSH_INTERVAL_SECONDS de lignes.
+WRITE_BEHIND_TABS = ["HISTORIQUE_GENERATIONS"]
+WRITE_BEHIND_BATCH_SIZE = 20 # Vidage dès que ce nombre de lignes est en attente
+WRITE_BEHIND_FLUSH_INTERVAL_SECONDS = 5 # ... ou au plus tard après ce délai
+WRITE_BEHIND_MAX_QUEUE_SIZE = 1000 # Au-delà, l'appelant écrit lui-même (pas de perte de lignes)
+
+# Nombre maximal de lignes envoyées par appel `append_rows` lors des ajouts groupés
+SHEETS_APPEND_CHUNK_SIZE = 500
+
+# --- Quota de l'API Google Sheets ---
+# Tous les appels passent par un seau à jetons partagé (quota Google : 60 requêtes par minute et par utilisateur)
+SHEETS_QUOTA_REQUESTS_PER_MINUTE = 60
+SHEETS_QUOTA_INTERACTIVE_RESERVE = 10 # Requêtes réservées aux actions de l'utilisateur, jamais consommées en arrière-plan
+# Nouvelles tentatives sur les erreurs 429 et 5xx (backoff exponentiel avec gigue)
+SHEETS_MAX_RETRIES = 5
+SHEETS_BACKOFF_BASE_SECONDS = 1.0
+SHEETS_BACKOFF_MAX_SECONDS = 32.0
+
+# --- Quota de l'API Gemini ---
+# Limiteur partagé par toutes les sessions du processus (à ajuster au niveau de quota du projet Google AI)
+GEMINI_QUOTA_REQUESTS_PER_MINUTE = 60
+GEMINI_QUOTA_TOKENS_PER_MINUTE = 1_000_000 # Tokens estimés avant l'appel (prompt / 4 caractères + max_output_tokens)
+GEMINI_QUOTA_INTERACTIVE_RESERVE = 5 # Requêtes réservées aux générations demandées une à une (les lots passent après)
+GEMINI_MAX_CONCURRENT_REQUESTS_PER_MODEL = 4
+GEMINI_INTERACTIVE_CONCURRENCY_RESERVE = 1 # Appels simultanés réservés aux générations demandées une à une
+# Nouvelles tentatives sur les erreurs 429, 500, 503 et 504 (backoff exponentiel avec gigue)
+GEMINI_MAX_RETRIES = 4
+GEMINI_BACKOFF_BASE_SECONDS = 2.0
+GEMINI_BACKOFF_MAX_SECONDS = 60.0
+# 'google' (par défaut) ou 'fake' : modèle factice local, sans clé ni réseau, pour les tests de charge hors ligne.
+# Se choisit sans modifier le code via la variable d'environnement GEMINI_BACKEND.
+GEMINI_BACKEND = os.environ.get("GEMINI_BACKEND", "google")
+FAKE_GEMINI_LATENCY_SECONDS = float(os.environ.get("FAKE_GEMINI_LATENCY_SECONDS", "0.5")) # Latence simulée par appel
+FAKE_GEMINI_ERROR_RATE = float(os.environ.get("FAKE_GEMINI_ERROR_RATE", "0")) # Part d'appels en erreur 429/503 simulée
+
+# --- Stockage des onglets ---
+# 'google_sheets' (par défaut), 'sqlite' (fichier local) ou 'memory' (en mémoire, pour les tests de charge hors ligne).
+# Se choisit sans modifier le code via la variable d'environnement STORAGE_BACKEND.
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "google_sheets")
+LOCAL_CACHE_DIR = ".cache"
+SQLITE_BACKEND_PATH = os.path.join(LOCAL_CACHE_DIR, "storage.sqlite3")
+MEMORY_BACKEND_LATENCY_SECONDS = float(os.environ.get("MEMORY_BACKEND_LATENCY_SECONDS", "0")) # Latence simulée par appel
+
+# --- Réplica SQLite local ---
+# Copie locale de tous les onglets, servie aux lectures (dès le démarrage du processus) et resynchronisée en arrière-plan.
+# Seule copie persistante des onglets : les écritures y sont répercutées, sinon l'onglet y est marqué périmé.
+# Un fichier par stockage ; le stockage en mémoire a un réplica en mémoire (rien ne survit au processus).
+SQLITE_REPLICA_PATH = ":memory:" if STORAGE_BACKEND == "memory" else os.path.join(LOCAL_CACHE_DIR, f"sheets_replica_{STORAGE_BACKEND}.sqlite3")
+SQLITE_REPLICA_SYNC_INTERVAL_SECONDS = 300 # Les modifications faites directement dans le Sheet apparaissent après au plus ce délai
+
+# Partitions mensuelles de l'historique archivé (voir HISTORY_HOT_WINDOW_DAYS) : aucune archive par défaut
+HISTORY_ARCHIVE_DIR = os.environ.get("HISTORY_ARCHIVE_DIR") or None
+HISTORY_ROTATION_ENABLED = HISTORY_ARCHIVE_DIR is not None and os.environ.get("HISTORY_ROTATION_ENABLED") == "1"
+
+# --- Cache des réponses de l'Oracle (Gemini) ---
+# Une requête identique (même modèle, même prompt final, même température, même max_output_tokens) reçoit
+# la réponse en cache au lieu d'un nouvel appel ; les réponses servies ainsi sont loggées dans l'historique
+# avec le suffixe " (cache)" dans Type_Generation (voir oracle_cache.CACHE_HIT_SUFFIX).
+ORACLE_CACHE_MAX_MEMORY_BYTES = 16 * 1024 * 1024 # Niveau mémoire (LRU)
+ORACLE_CACHE_MAX_DISK_ENTRIES = 5000 # Niveau disque, conservé entre les redémarrages (désactivé pour le stockage en mémoire)
+ORACLE_CACHE_PATH = None if STORAGE_BACKEND == "memory" else os.path.join(LOCAL_CACHE_DIR, "oracle_responses.sqlite3")
+# Au-delà de cette température, la variété des réponses est recherchée : pas de mise en cache
+ORACLE_CACHE_MAX_TEMPERATURE = 0.7
+ORACLE_CACHE_DEFAULT_TTL_SECONDS = 24 * 3600
+# Durée de vie par type de génération (Type_Generation de l'historique) ; 0 = jamais en cache
+ORACLE_CACHE_TTL_BY_TYPE = {
+    "Affinement Mood": 7 * 24 * 3600, # Ne dépend que de la fiche du mood
+    "Idées de Titres": 24 * 3600,
+    "Prompt Audio": 24 * 3600,
+    "Description Marketing": 24 * 3600,
+    "Paroles de Chanson": 0, # Chaque demande de paroles doit produire un nouveau texte
+}
+
+# --- Création multimodale en parallèle ---
+# Les prompts paroles, audio et image sont demandés en parallèle, chacun à partir du même cœur de création ;
+# une section en échec est relancée seule (backoff exponentiel avec gigue), sans régénérer les autres.
+MULTIMODAL_SECTION_MAX_RETRIES = 2
+MULTIMODAL_SECTION_BACKOFF_BASE_SECONDS = 1.0
+MULTIMODAL_SECTION_BACKOFF_MAX_SECONDS = 8.0
+
+# --- Génération de catalogue par lots ---
+# Morceaux générés en même temps (chacun enchaîne paroles, prompt audio et idées de titres) : au plus les
+# appels simultanés que le limiteur Gemini laisse aux tâches d'arrière-plan
+BATCH_MAX_CONCURRENCY = GEMINI_MAX_CONCURRENT_REQUESTS_PER_MODEL - GEMINI_INTERACTIVE_CONCURRENCY_RESERVE
+# Nouvelles tentatives par étape d'un morceau ; les étapes déjà réussies ne sont pas régénérées
+BATCH_ITEM_MAX_RETRIES = 2
+BATCH_BACKOFF_BASE_SECONDS = 2.0
+BATCH_BACKOFF_MAX_SECONDS = 16.0
+
 # --- Noms des Onglets de ton Google Sheet (DOIVENT correspondre EXACTEMENT) ---
 WORKSHEET_NAMES = {
     "MORCEAUX_GENERES": "MORCEAUX_GENERES",
@@ -150,3 +298,27 @@ EXPECTED_COLUMNS = {
         'ID_Regle_Appliquee_Auto'
     ]
 }
+
+# --- Schéma de types des colonnes ---
+# Type de chaque colonne des onglets de EXPECTED_COLUMNS. Toute colonne non listée ici est du texte ('str').
+# 'int' / 'float' : nombres, format français accepté ("1.234,5", "1 234,5")
+# 'bool' : VRAI / FAUX
+# 'date' : lue avec DATE_INPUT_FORMATS puis normalisée en AAAA-MM-JJ (chaîne vide si illisible)
+COLUMN_TYPES = {
+    WORKSHEET_NAMES["MORCEAUX_GENERES"]: {'Date_Creation': 'date', 'Date_Mise_A_Jour': 'date', 'Favori': 'bool'},
+    WORKSHEET_NAMES["ALBUMS_PLANETAIRES"]: {'Date_Sortie_Prevue': 'date'},
+    WORKSHEET_NAMES["SESSIONS_CREATIVES_ORACLE"]: {'Date_Session': 'date'},
+    WORKSHEET_NAMES["STATISTIQUES_ORBITALES_SIMULEES"]: {
+        'Ecoutes_Totales': 'int', 'J_aimes_Recus': 'int', 'Partages_Simules': 'int', 'Revenus_Simules_Streaming': 'float'
+    },
+    WORKSHEET_NAMES["CONSEILS_STRATEGIQUES_ORACLE"]: {'Date_Conseil': 'date'},
+    WORKSHEET_NAMES["REGLES_DE_GENERATION_ORACLE"]: {'Statut_Actif': 'bool'},
+    WORKSHEET_NAMES["MOODS_ET_EMOTIONS"]: {'Niveau_Intensite': 'int'},
+    WORKSHEET_NAMES["PROJETS_EN_COURS"]: {'Date_Debut': 'date', 'Date_Cible_Fin': 'date', 'Budget_Estime': 'float'},
+    WORKSHEET_NAMES["OUTILS_IA_REFERENCEMENT"]: {'Compatibilite_API': 'bool', 'Evaluation_Gardien': 'int'},
+    WORKSHEET_NAMES["TIMELINE_EVENEMENTS_CULTURELS"]: {'Date_Debut': 'date', 'Date_Fin': 'date'},
+    WORKSHEET_NAMES["HISTORIQUE_GENERATIONS"]: {'Date_Heure': 'date'},
+}
+
+# Formats de date acceptés en lecture, essayés dans l'ordre
+DATE_INPUT_FORMATS = ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y', '%d/%m/%Y %H:%M:%S', '%d-%m-%Y']
@@ -0,0 +1,58 @@
+# fake_gemini.py
+
+import enum
+import itertools
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from google.api_core import exceptions as google_exceptions
+
+class FinishReason(enum.Enum):
+    FINISH_REASON_UNSPECIFIED = 0
+    STOP = 1
+
+class FakeGenerativeModel:
+    """
+    Modèle factice local au comportement de genai.GenerativeModel (generate_content, avec ou sans stream=True) :
+    réponse simulée après `latency_seconds`, et une part `error_rate` d'appels en erreur transitoire 429 ou 503,
+    comme l'API réelle sous charge. Sans clé ni réseau : sert aux tests de charge hors ligne (GEMINI_BACKEND=fake).
+    """
+
+    def __init__(self, model_name: str, latency_seconds: float = 0.5, error_rate: float = 0.0, seed=None):
+        self.model_name = model_name
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+        self.call_count = 0
+
+    def _response(self, text: str, finish_reason: FinishReason, total_token_count: int):
+        candidate = SimpleNamespace(content=SimpleNamespace(parts=[SimpleNamespace(text=text)]), finish_reason=finish_reason)
+        return SimpleNamespace(
+            candidates=[candidate], text=text,
+            prompt_feedback=SimpleNamespace(block_reason=None),
+            usage_metadata=SimpleNamespace(total_token_count=total_token_count)
+        )
+
+    def generate_content(self, prompt: str, generation_config=None, stream: bool = False, **kwargs):
+        with self._lock:
+            self.call_count += 1
+            response_number = next(self._counter)
+            failure = self._random.random() < self.error_rate
+            error_class = self._random.choice([google_exceptions.ResourceExhausted, google_exceptions.ServiceUnavailable])
+        time.sleep(self.latency_seconds)
+        if failure:
+            raise error_class(f"Erreur simulée par {self.model_name}")
+        lines = [f"Réponse simulée n°{response_number} de {self.model_name}"] + [f"{i}. Proposition simulée {i}" for i in range(1, 6)]
+        prompt_tokens = len(prompt) // 4
+        if not stream:
+            text = "\n".join(lines)
+            return self._response(text, FinishReason.STOP, prompt_tokens + len(text) // 4)
+        chunks = [line + "\n" for line in lines]
+        return iter([
+            self._response(chunk, FinishReason.STOP if position == len(chunks) - 1 else FinishReason.FINISH_REASON_UNSPECIFIED, prompt_tokens + len(chunk) // 4)
+            for position, chunk in enumerate(chunks)
+        ])
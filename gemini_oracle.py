@@ -3,48 +3,168 @@
 import streamlit as st
 import google.generativeai as genai
 import pandas as pd
-import random
+import numpy as np
 from datetime import datetime
 import base64
 import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from google.api_core import exceptions as google_exceptions
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # Importation des configurations et du connecteur Sheets
-from config import GEMINI_API_KEY_NAME, WORKSHEET_NAMES
+from config import (
+    GEMINI_API_KEY_NAME, WORKSHEET_NAMES,
+    ORACLE_CACHE_MAX_MEMORY_BYTES, ORACLE_CACHE_MAX_DISK_ENTRIES, ORACLE_CACHE_PATH,
+    ORACLE_CACHE_MAX_TEMPERATURE, ORACLE_CACHE_DEFAULT_TTL_SECONDS, ORACLE_CACHE_TTL_BY_TYPE,
+    MULTIMODAL_SECTION_MAX_RETRIES, MULTIMODAL_SECTION_BACKOFF_BASE_SECONDS, MULTIMODAL_SECTION_BACKOFF_MAX_SECONDS,
+    BATCH_MAX_CONCURRENCY, BATCH_ITEM_MAX_RETRIES, BATCH_BACKOFF_BASE_SECONDS, BATCH_BACKOFF_MAX_SECONDS,
+    GEMINI_QUOTA_REQUESTS_PER_MINUTE, GEMINI_QUOTA_TOKENS_PER_MINUTE, GEMINI_QUOTA_INTERACTIVE_RESERVE,
+    GEMINI_MAX_CONCURRENT_REQUESTS_PER_MODEL, GEMINI_INTERACTIVE_CONCURRENCY_RESERVE, GEMINI_MAX_RETRIES, GEMINI_BACKOFF_BASE_SECONDS, GEMINI_BACKOFF_MAX_SECONDS,
+    GEMINI_BACKEND, FAKE_GEMINI_LATENCY_SECONDS, FAKE_GEMINI_ERROR_RATE
+)
+from oracle_cache import OracleResponseCache, make_cache_key, CACHE_HIT_SUFFIX
+from rate_limiting import backoff_delay, TokenBucket, ModelRateLimiter, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from fake_gemini import FakeGenerativeModel
 # Nous importons les fonctions spécifiques du connecteur Sheets
 # via une importation locale dans _log_gemini_interaction pour éviter les dépendances circulaires
 # lors de l'initialisation du module, tout en permettant leur utilisation.
 # get_dataframe_from_sheet est importé directement car nécessaire à l'initialisation des prompts.
-from sheets_connector import get_dataframe_from_sheet
+from sheets_connector import get_dataframe_from_sheet, get_reference_table, get_reference_tables, add_morceaux_generes
+from utils import generate_unique_id
 
 # --- Initialisation de la Connexion à l'API Gemini ---
-# Ce bloc est conçu pour être résilient face aux problèmes de clé API et de service
-gemini_api_key = st.secrets.get(GEMINI_API_KEY_NAME)
+# Les modèles sont créés par init_gemini(), appelée par app.py à chaque exécution du script (et par les points
+# d'entrée hors interface, ex: generate_catalogue_batch) : importer ce module ne touche pas à st.session_state.
+_ORACLE_UNAVAILABLE_MESSAGE = "L'Oracle est indisponible. Vérifiez la configuration de l'API Gemini."
+_text_model = None
+_creative_model = None
+_gemini_error = _ORACLE_UNAVAILABLE_MESSAGE
+_gemini_init_lock = threading.Lock()
 
-if gemini_api_key:
+def _create_gemini_models():
+    """Crée les modèles Gemini (ou le modèle factice local). Retourne (modele_texte, modele_creatif, message_d_erreur)."""
+    if GEMINI_BACKEND == "fake":
+        # Modèle factice local (tests de charge hors ligne) : aucune clé ni aucun appel réseau
+        fake_model = FakeGenerativeModel('fake-gemini-1.5-pro', FAKE_GEMINI_LATENCY_SECONDS, FAKE_GEMINI_ERROR_RATE)
+        return fake_model, fake_model, None
+    try:
+        gemini_api_key = st.secrets.get(GEMINI_API_KEY_NAME)
+    except Exception: # Aucun fichier de secrets (ex: exécution hors ligne avec un stockage local)
+        gemini_api_key = None
+    if not gemini_api_key:
+        return None, None, f"La clé API Gemini '{GEMINI_API_KEY_NAME}' est manquante dans les secrets de votre application Streamlit Cloud. Veuillez la configurer."
     try:
         genai.configure(api_key=gemini_api_key)
         # Modèles principaux utilisés, TOUS PASSÉS À GEMINI-2.5-PRO
-        _text_model = genai.GenerativeModel('gemini-1.5-pro') # Changé de flash à pro
-        _creative_model = genai.GenerativeModel('gemini-1.5-pro') # Changé de flash à pro
-        st.session_state['gemini_initialized'] = True
-        st.session_state['gemini_error'] = None # Réinitialiser l'erreur si l'initialisation réussit
+        return genai.GenerativeModel('gemini-1.5-pro'), genai.GenerativeModel('gemini-1.5-pro'), None # Changé de flash à pro
     except Exception as e:
-        st.session_state['gemini_initialized'] = False
-        st.session_state['gemini_error'] = f"Échec d'initialisation Gemini : {e}. Vérifiez votre clé API dans les secrets Streamlit Cloud."
-        _text_model = None
-        _creative_model = None # Fallback pour éviter les erreurs d'objets None
-else:
-    st.session_state['gemini_initialized'] = False
-    st.session_state['gemini_error'] = f"La clé API Gemini '{GEMINI_API_KEY_NAME}' est manquante dans les secrets de votre application Streamlit Cloud. Veuillez la configurer."
-    _text_model = None
-    _creative_model = None
+        return None, None, f"Échec d'initialisation Gemini : {e}. Vérifiez votre clé API dans les secrets Streamlit Cloud."
+
+def init_gemini() -> bool:
+    """
+    Initialise la connexion à Gemini une seule fois par processus (nouvelle tentative tant qu'elle échoue).
+    Dans une exécution du script Streamlit, reporte l'état dans st.session_state['gemini_initialized'] et
+    st.session_state['gemini_error'] pour l'affichage. Retourne True si l'Oracle est disponible.
+    """
+    global _text_model, _creative_model, _gemini_error
+    with _gemini_init_lock:
+        if _text_model is None or _creative_model is None:
+            _text_model, _creative_model, _gemini_error = _create_gemini_models()
+        initialized = _text_model is not None and _creative_model is not None
+    if get_script_run_ctx() is not None:
+        st.session_state['gemini_initialized'] = initialized
+        st.session_state['gemini_error'] = _gemini_error
+    return initialized
 
 # --- Fonctions Utilitaires Internes pour l'Oracle ---
 
+@st.cache_resource # Un seul cache de réponses par processus, partagé par toutes les sessions
+def _get_oracle_cache() -> OracleResponseCache:
+    return OracleResponseCache(ORACLE_CACHE_MAX_MEMORY_BYTES, ORACLE_CACHE_PATH, ORACLE_CACHE_MAX_DISK_ENTRIES)
+
+def _cache_ttl(type_generation: str, temperature: float, use_cache: bool) -> float:
+    """Durée de vie en cache d'une réponse (config.ORACLE_CACHE_TTL_BY_TYPE), ou 0 si elle ne doit pas être mise en cache."""
+    if not use_cache or temperature > ORACLE_CACHE_MAX_TEMPERATURE:
+        return 0
+    return ORACLE_CACHE_TTL_BY_TYPE.get(type_generation, ORACLE_CACHE_DEFAULT_TTL_SECONDS)
+
+def _is_retryable_gemini_error(exc: Exception) -> bool:
+    """Erreurs transitoires qui méritent une nouvelle tentative : quota dépassé (429) et erreurs serveur (500, 503, 504)."""
+    return isinstance(exc, (
+        google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests, google_exceptions.InternalServerError,
+        google_exceptions.ServiceUnavailable, google_exceptions.DeadlineExceeded, google_exceptions.GatewayTimeout
+    ))
+
+def _is_gemini_quota_error(exc: Exception) -> bool:
+    return isinstance(exc, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests))
+
+@st.cache_resource # Un seul limiteur par processus : toutes les sessions se partagent le quota Gemini
+def _get_gemini_rate_limiter() -> ModelRateLimiter:
+    return ModelRateLimiter(
+        requests_bucket=TokenBucket(
+            capacity=GEMINI_QUOTA_REQUESTS_PER_MINUTE,
+            refill_per_second=GEMINI_QUOTA_REQUESTS_PER_MINUTE / 60,
+            interactive_reserve=GEMINI_QUOTA_INTERACTIVE_RESERVE
+        ),
+        tokens_bucket=TokenBucket(capacity=GEMINI_QUOTA_TOKENS_PER_MINUTE, refill_per_second=GEMINI_QUOTA_TOKENS_PER_MINUTE / 60),
+        max_concurrent_per_model=GEMINI_MAX_CONCURRENT_REQUESTS_PER_MODEL,
+        is_retryable=_is_retryable_gemini_error,
+        is_throttled=_is_gemini_quota_error,
+        max_retries=GEMINI_MAX_RETRIES,
+        base_delay=GEMINI_BACKOFF_BASE_SECONDS,
+        max_delay=GEMINI_BACKOFF_MAX_SECONDS,
+        interactive_concurrency_reserve=GEMINI_INTERACTIVE_CONCURRENCY_RESERVE
+    )
+
+def _response_token_count(response):
+    usage_metadata = getattr(response, 'usage_metadata', None)
+    return getattr(usage_metadata, 'total_token_count', None) or None
+
+def _call_model(model, final_prompt: str, type_generation: str, temperature: float, max_output_tokens: int, stream: bool = False, priority: int = PRIORITY_INTERACTIVE):
+    """
+    model.generate_content à travers le limiteur partagé (requêtes et tokens par minute, appels simultanés par modèle),
+    avec nouvelles tentatives sur les erreurs transitoires. En flux, retourne un générateur de morceaux qui garde sa
+    place d'appel simultané jusqu'à la fin de la lecture ; une erreur avant le premier morceau est rejouée, une erreur
+    en cours de flux est relevée (le texte déjà affiché ne peut pas être repris).
+    """
+    limiter = _get_gemini_rate_limiter()
+    model_name = getattr(model, 'model_name', type(model).__name__)
+    generation_config = _generation_config(temperature, max_output_tokens)
+    estimated_tokens = len(final_prompt) // 4 + max_output_tokens
+    if stream:
+        return limiter.stream(
+            model_name, type_generation, model.generate_content, final_prompt,
+            generation_config=generation_config, stream=True, estimated_tokens=estimated_tokens, priority=priority
+        )
+    return limiter.call(
+        model_name, type_generation, model.generate_content, final_prompt,
+        generation_config=generation_config,
+        estimated_tokens=estimated_tokens,
+        token_usage=_response_token_count,
+        priority=priority
+    )
+
+def get_gemini_limiter_stats() -> pd.DataFrame:
+    """Par type de génération : appels à Gemini, attente moyenne et maximale en file, nouvelles tentatives, échecs."""
+    return pd.DataFrame(
+        _get_gemini_rate_limiter().stats(),
+        columns=['Categorie', 'Appels', 'Attente_Moyenne_ms', 'Attente_Max_ms', 'Nouvelles_Tentatives', 'Echecs']
+    )
+
+def get_oracle_cache_stats() -> dict:
+    """Hits, misses et occupation du cache des réponses de l'Oracle."""
+    return _get_oracle_cache().stats()
+
+def clear_oracle_cache():
+    _get_oracle_cache().clear()
+
 def _log_gemini_interaction(type_generation: str, prompt_sent: str, response_received: str, associated_id: str = "", evaluation: str = "", comment: str = "", tags: str = "", regle_auto: str = ""):
     """
     Fonction interne pour logger chaque interaction avec Gemini dans l'historique.
-    Utilise append_row_to_sheet via le wrapper add_historique_generation pour éviter une dépendance directe et garantir la bonne initialisation de sheets_connector.
+    Utilise le wrapper add_historique_generation pour éviter une dépendance directe et garantir la bonne initialisation de sheets_connector.
+    La ligne part dans la file d'écriture différée : le texte généré est rendu sans attendre Google Sheets.
     """
     log_data = {
         'Type_Generation': type_generation,
@@ -65,39 +185,64 @@ def _log_gemini_interaction(type_generation: str, prompt_sent: str, response_rec
         st.warning("L'historique de l'Oracle pourrait ne pas être complet. Vérifiez votre `sheets_connector.py`.")
 
 
-def _generate_content(model, prompt: str, type_generation: str = "Contenu Général", associated_id: str = "", temperature: float = 0.1, max_output_tokens: int = 1024) -> str:
+# Instructions de sécurité explicites injectées dans CHAQUE prompt.
+_SAFETY_INSTRUCTIONS = """
+    Votre réponse doit être absolument sûre, appropriée, respectueuse, et ne doit jamais inclure de contenu violent, haineux, sexuellement explicite, illégal, ou dangereux, même implicitement. Évitez tout sujet controversé, discriminatoire ou incitant à la violence. Si vous ne pouvez pas générer un contenu conforme à ces règles pour la requête donnée, veuillez répondre par un message clair indiquant que la génération est impossible pour des raisons de conformité, sans donner de détails sur le motif précis du blocage. Votre objectif est d'être utile et inoffensif.
+    """
+
+# Raisons d'arrêt d'un candidat qui signifient que la suite de la réponse a été retenue par les filtres
+_BLOCKING_FINISH_REASONS = {'SAFETY', 'RECITATION', 'BLOCKLIST', 'PROHIBITED_CONTENT', 'SPII'}
+
+def _generation_config(temperature: float, max_output_tokens: int):
+    return genai.types.GenerationConfig(
+        candidate_count=1,
+        temperature=temperature,
+        max_output_tokens=max_output_tokens
+    )
+
+def _prepare_request(model, prompt: str, type_generation: str, temperature: float, max_output_tokens: int, use_cache: bool) -> tuple:
+    """Prompt final (instructions de sécurité au début), durée de vie en cache et clé de cache (None si la réponse n'est pas mise en cache)."""
+    final_prompt = _SAFETY_INSTRUCTIONS + "\n\n" + prompt
+    cache_ttl = _cache_ttl(type_generation, temperature, use_cache)
+    cache_key = make_cache_key(getattr(model, 'model_name', type(model).__name__), final_prompt, temperature, max_output_tokens) if cache_ttl else None
+    return final_prompt, cache_ttl, cache_key
+
+def _cached_response(cache_key, type_generation: str, final_prompt: str, associated_id: str):
+    """Réponse en cache pour cette requête (l'interaction est loggée comme servie par le cache), ou None."""
+    if cache_key is None:
+        return None
+    cached_text = _get_oracle_cache().get(cache_key)
+    if cached_text is not None:
+        _log_gemini_interaction(type_generation + CACHE_HIT_SUFFIX, final_prompt, cached_text, associated_id)
+    return cached_text
+
+def _generate_content(model, prompt: str, type_generation: str = "Contenu Général", associated_id: str = "", temperature: float = 0.1, max_output_tokens: int = 1024, use_cache: bool = True) -> str:
     """
     Fonction interne robuste pour générer du contenu avec Gemini et logger l'interaction.
     Anticipe les blocages de sécurité et les échecs de génération.
+    Une requête identique à une requête récente reçoit la réponse en cache (voir config.ORACLE_CACHE_TTL_BY_TYPE),
+    sauf au-delà de ORACLE_CACHE_MAX_TEMPERATURE ou avec `use_cache=False`. Seules les réponses complètes sont mises en cache.
     """
-    if not st.session_state.get('gemini_initialized', False) or model is None:
-        return st.session_state.get('gemini_error', "L'Oracle est indisponible. Vérifiez la configuration de l'API Gemini.")
-        
-    # Instructions de sécurité explicites injectées dans CHAQUE prompt.
-    safety_instructions = """
-    Votre réponse doit être absolument sûre, appropriée, respectueuse, et ne doit jamais inclure de contenu violent, haineux, sexuellement explicite, illégal, ou dangereux, même implicitement. Évitez tout sujet controversé, discriminatoire ou incitant à la violence. Si vous ne pouvez pas générer un contenu conforme à ces règles pour la requête donnée, veuillez répondre par un message clair indiquant que la génération est impossible pour des raisons de conformité, sans donner de détails sur le motif précis du blocage. Votre objectif est d'être utile et inoffensif.
-    """
-    
-    final_prompt = safety_instructions + "\n\n" + prompt # Injecte les instructions au début
+    if model is None:
+        return _gemini_error or _ORACLE_UNAVAILABLE_MESSAGE
+
+    final_prompt, cache_ttl, cache_key = _prepare_request(model, prompt, type_generation, temperature, max_output_tokens, use_cache)
+    cached_text = _cached_response(cache_key, type_generation, final_prompt, associated_id)
+    if cached_text is not None:
+        return cached_text
     
     try:
-        response = model.generate_content(
-            final_prompt, # Envoie le prompt modifié avec les instructions de sécurité
-            generation_config=genai.types.GenerationConfig(
-                candidate_count=1,
-                temperature=temperature,
-                max_output_tokens=max_output_tokens
-            ),
-            # Pour gemini-1.5-pro, il est recommandé de laisser les safety_settings par défaut
-            # ou de les assouplir si vous savez ce que vous faites et que vous gérez le contenu.
-            # L'injection de prompt est souvent plus efficace pour guider l'IA.
-            # safety_settings=[
-            #    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-            #    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-            #    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-            #    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-            # ]
-        )
+        # Pour gemini-1.5-pro, il est recommandé de laisser les safety_settings par défaut
+        # ou de les assouplir si vous savez ce que vous faites et que vous gérez le contenu.
+        # L'injection de prompt est souvent plus efficace pour guider l'IA.
+        # safety_settings=[
+        #    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+        #    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+        #    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+        #    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+        # ]
+        # Envoie le prompt modifié avec les instructions de sécurité, dans la limite du quota partagé
+        response = _call_model(model, final_prompt, type_generation, temperature, max_output_tokens)
         
         # Gestion des réponses vides ou bloquées par l'API
         if not response.candidates:
@@ -111,6 +256,8 @@ def _generate_content(model, prompt: str, type_generation: str = "Contenu Géné
             return "Désolé, la génération de contenu a été bloquée pour des raisons de conformité. Essayez une requête plus simple ou différente."
             
         generated_text = response.text
+        if cache_key is not None:
+            _get_oracle_cache().put(cache_key, generated_text, cache_ttl)
         
         _log_gemini_interaction(type_generation, final_prompt, generated_text, associated_id)
         
@@ -123,31 +270,89 @@ def _generate_content(model, prompt: str, type_generation: str = "Contenu Géné
         st.warning(f"La génération s'est arrêtée prématurément. Raison: {e.response.candidates[0].finish_reason}. Le contenu pourrait être incomplet.")
         _log_gemini_interaction(type_generation, final_prompt, f"Génération Incomplète: {e.response.candidates[0].finish_reason}", associated_id)
         return e.response.text if e.response.text else "La génération est incomplète. Veuillez réessayer ou simplifier la demande."
+    except (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests) as e:
+        st.error(f"Le quota de l'API Gemini est épuisé malgré plusieurs tentatives : {e}. Réessayez dans une minute.")
+        _log_gemini_interaction(type_generation, final_prompt, f"QUOTA ÉPUISÉ: {e}", associated_id)
+        return "L'Oracle est très sollicité en ce moment. Veuillez réessayer dans une minute."
     except Exception as e:
         st.error(f"Une erreur inattendue est survenue lors de la communication avec l'API Gemini: {e}. Vérifiez votre connexion internet ou la configuration de votre clé API.")
         _log_gemini_interaction(type_generation, final_prompt, f"ERREUR API: {e}", associated_id)
         return f"Désolé, une erreur de communication est survenue: {e}"
 
+def _stream_content(model, prompt: str, type_generation: str = "Contenu Général", associated_id: str = "", temperature: float = 0.1, max_output_tokens: int = 1024, use_cache: bool = True):
+    """
+    Variante en flux de _generate_content : générateur qui renvoie le texte au fur et à mesure de la génération
+    (`generate_content(stream=True)`), à afficher avec st.write_stream. Le texte complet est assemblé puis loggé
+    (et mis en cache) à la fin, comme avec _generate_content.
+    Si les filtres de sécurité interrompent la réponse en cours de route, le texte déjà reçu est conservé, suivi
+    d'un avertissement ; la réponse partielle est loggée comme bloquée et n'est pas mise en cache.
+    """
+    if model is None:
+        yield _gemini_error or _ORACLE_UNAVAILABLE_MESSAGE
+        return
+
+    final_prompt, cache_ttl, cache_key = _prepare_request(model, prompt, type_generation, temperature, max_output_tokens, use_cache)
+    cached_text = _cached_response(cache_key, type_generation, final_prompt, associated_id)
+    if cached_text is not None:
+        yield cached_text
+        return
+
+    chunks = []
+    try:
+        response = _call_model(model, final_prompt, type_generation, temperature, max_output_tokens, stream=True)
+        for chunk in response:
+            candidate = chunk.candidates[0] if chunk.candidates else None
+            if candidate is None:
+                continue
+            chunk_text = "".join(part.text for part in candidate.content.parts)
+            if chunk_text:
+                chunks.append(chunk_text)
+                yield chunk_text
+            if candidate.finish_reason.name in _BLOCKING_FINISH_REASONS:
+                st.warning(f"La génération a été interrompue par les filtres de sécurité de l'Oracle (raison : {candidate.finish_reason.name}). Le contenu est incomplet.")
+                _log_gemini_interaction(type_generation, final_prompt, f"BLOQUÉ EN COURS ({candidate.finish_reason.name}): {''.join(chunks)}", associated_id)
+                yield "\n\n[Génération interrompue pour des raisons de conformité.]"
+                return
+    except genai.types.BlockedPromptException as e:
+        st.error(f"Votre prompt a été bloqué par les filtres de sécurité de l'API Gemini. Raisons : {e.response.prompt_feedback.block_reason_messages}. Veuillez reformuler.")
+        _log_gemini_interaction(type_generation, final_prompt, f"PROMPT BLOQUÉ: {e.response.prompt_feedback.block_reason_messages}", associated_id)
+        yield "Votre requête a été bloquée pour des raisons de sécurité. Veuillez essayer un prompt différent."
+        return
+    except (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests) as e:
+        st.error(f"Le quota de l'API Gemini est épuisé malgré plusieurs tentatives : {e}. Réessayez dans une minute.")
+        _log_gemini_interaction(type_generation, final_prompt, f"QUOTA ÉPUISÉ: {e} (reçu avant l'erreur : {''.join(chunks)})", associated_id)
+        yield "\n\nL'Oracle est très sollicité en ce moment. Veuillez réessayer dans une minute."
+        return
+    except Exception as e:
+        st.error(f"Une erreur inattendue est survenue lors de la communication avec l'API Gemini: {e}. Vérifiez votre connexion internet ou la configuration de votre clé API.")
+        _log_gemini_interaction(type_generation, final_prompt, f"ERREUR API: {e} (reçu avant l'erreur : {''.join(chunks)})", associated_id)
+        yield f"\n\nDésolé, une erreur de communication est survenue: {e}"
+        return
+
+    generated_text = "".join(chunks)
+    if not generated_text:
+        _log_gemini_interaction(type_generation, final_prompt, "BLOCKED: réponse vide", associated_id)
+        yield "Désolé, la génération de contenu a été bloquée pour des raisons de conformité. Essayez une requête plus simple ou différente."
+        return
+    if cache_key is not None:
+        _get_oracle_cache().put(cache_key, generated_text, cache_ttl)
+    _log_gemini_interaction(type_generation, final_prompt, generated_text, associated_id)
+
 # --- Fonctions de Génération de Contenu Spécifiques ---
 
-def generate_song_lyrics(
+def _song_lyrics_prompt(
     genre_musical: str, mood_principal: str, theme_lyrique_principal: str,
     style_lyrique: str, mots_cles_generation: str, structure_chanSONG: str,
     langue_paroles: str, niveau_langage_paroles: str, imagerie_texte: str
 ) -> str:
-    """Génère des paroles de chanson complètes."""
     
-    # Récupérer les descriptions détaillées pour un meilleur prompt, avec gestion des valeurs manquantes
-    # Assurez-vous que les DataFrames ne sont pas vides avant d'y accéder.
-    styles_lyriques_df = get_dataframe_from_sheet(WORKSHEET_NAMES["STYLES_LYRIQUES_UNIVERS"])
-    themes_df = get_dataframe_from_sheet(WORKSHEET_NAMES["THEMES_CONSTELLES"])
-    moods_df = get_dataframe_from_sheet(WORKSHEET_NAMES["MOODS_ET_EMOTIONS"])
-    structures_df = get_dataframe_from_sheet(WORKSHEET_NAMES["STRUCTURES_SONG_UNIVERSELLES"])
-
-    style_lyrique_desc = styles_lyriques_df[styles_lyriques_df['ID_Style_Lyrique'] == style_lyrique]['Description_Detaillee'].iloc[0] if style_lyrique and not styles_lyriques_df.empty and style_lyrique in styles_lyriques_df['ID_Style_Lyrique'].values else style_lyrique
-    theme_desc = themes_df[themes_df['ID_Theme'] == theme_lyrique_principal]['Description_Conceptuelle'].iloc[0] if theme_lyrique_principal and not themes_df.empty and theme_lyrique_principal in themes_df['ID_Theme'].values else theme_lyrique_principal
-    mood_desc = moods_df[moods_df['ID_Mood'] == mood_principal]['Description_Nuance'].iloc[0] if mood_principal and not moods_df.empty and mood_principal in moods_df['ID_Mood'].values else mood_principal
-    structure_schema = structures_df[structures_df['ID_Structure'] == structure_chanSONG]['Schema_Detaille'].iloc[0] if structure_chanSONG and not structures_df.empty and structure_chanSONG in structures_df['ID_Structure'].values else structure_chanSONG
+    # Descriptions détaillées pour un meilleur prompt (l'identifiant lui-même si la description est introuvable).
+    # Bibliothèques indexées par identifiant ; les onglets absents du cache sont lus en une seule requête groupée
+    references = get_reference_tables(["STYLES_LYRIQUES_UNIVERS", "THEMES_CONSTELLES", "MOODS_ET_EMOTIONS", "STRUCTURES_SONG_UNIVERSELLES"])
+    style_lyrique_desc = references["STYLES_LYRIQUES_UNIVERS"].field(style_lyrique, 'Description_Detaillee', default=style_lyrique)
+    theme_desc = references["THEMES_CONSTELLES"].field(theme_lyrique_principal, 'Description_Conceptuelle', default=theme_lyrique_principal)
+    mood_desc = references["MOODS_ET_EMOTIONS"].field(mood_principal, 'Description_Nuance', default=mood_principal)
+    structure_schema = references["STRUCTURES_SONG_UNIVERSELLES"].field(structure_chanSONG, 'Schema_Detaille', default=structure_chanSONG)
     
     prompt = f"""En tant que parolier expert, poétique et sensible, crée des paroles complètes et originales.
     Génère des paroles pour une chanson dans le genre **{genre_musical}**.
@@ -162,29 +367,50 @@ def generate_song_lyrics(
     Respecte scrupuleusement la structure demandée (Intro, Couplet, Refrain, Pont, Outro etc. si applicable). Chaque section doit être clairement identifiée (par exemple, "COUPLET 1:", "REFRAIN:", "PONT:").
     N'incluez pas de notes explicatives sur la structure dans la réponse finale, seulement les paroles.
     """
+    return prompt
+
+def generate_song_lyrics(
+    genre_musical: str, mood_principal: str, theme_lyrique_principal: str,
+    style_lyrique: str, mots_cles_generation: str, structure_chanSONG: str,
+    langue_paroles: str, niveau_langage_paroles: str, imagerie_texte: str
+) -> str:
+    """Génère des paroles de chanson complètes."""
+    prompt = _song_lyrics_prompt(
+        genre_musical, mood_principal, theme_lyrique_principal, style_lyrique, mots_cles_generation,
+        structure_chanSONG, langue_paroles, niveau_langage_paroles, imagerie_texte
+    )
     return _generate_content(_creative_model, prompt, type_generation="Paroles de Chanson", temperature=0.7, max_output_tokens=2000)
 
-def generate_audio_prompt(
+def stream_song_lyrics(
+    genre_musical: str, mood_principal: str, theme_lyrique_principal: str,
+    style_lyrique: str, mots_cles_generation: str, structure_chanSONG: str,
+    langue_paroles: str, niveau_langage_paroles: str, imagerie_texte: str
+):
+    """Comme generate_song_lyrics, mais renvoie les paroles au fil de la génération (générateur pour st.write_stream)."""
+    prompt = _song_lyrics_prompt(
+        genre_musical, mood_principal, theme_lyrique_principal, style_lyrique, mots_cles_generation,
+        structure_chanSONG, langue_paroles, niveau_langage_paroles, imagerie_texte
+    )
+    return _stream_content(_creative_model, prompt, type_generation="Paroles de Chanson", temperature=0.7, max_output_tokens=2000)
+
+def _audio_prompt(
     genre_musical: str, mood_principal: str, duree_estimee: str,
     instrumentation_principale: str, ambiance_sonore_specifique: str,
     effets_production_dominants: str, type_voix_desiree: str = "N/A",
     style_vocal_desire: str = "N/A", caractere_voix_desire: str = "N/A",
     structure_song: str = "N/A"
 ) -> str:
-    """Génère un prompt textuel détaillé pour la génération audio (optimisé pour SUNO)."""
     
-    moods_df = get_dataframe_from_sheet(WORKSHEET_NAMES["MOODS_ET_EMOTIONS"])
-    mood_desc = moods_df[moods_df['ID_Mood'] == mood_principal]['Description_Nuance'].iloc[0] if mood_principal and not moods_df.empty and mood_principal in moods_df['ID_Mood'].values else mood_principal
+    mood_desc = get_reference_table("MOODS_ET_EMOTIONS").field(mood_principal, 'Description_Nuance', default=mood_principal)
 
     vocal_details = ""
     if type_voix_desiree and type_voix_desiree != "N/A":
         # Tentative d'obtenir le style et le caractère vocal si disponibles
-        voix_styles_df = get_dataframe_from_sheet(WORKSHEET_NAMES["VOIX_ET_STYLES_VOCAUX"])
-        vocal_row = voix_styles_df[voix_styles_df['Type_Vocal_General'] == type_voix_desiree]
+        vocal_row = get_reference_table("VOIX_ET_STYLES_VOCAUX").find('Type_Vocal_General', type_voix_desiree)
         
-        if not vocal_row.empty:
-            actual_style_vocal = vocal_row['Style_Vocal_Detaille'].iloc[0] if 'Style_Vocal_Detaille' in vocal_row.columns else (style_vocal_desire if style_vocal_desire else 'neutre')
-            actual_caractere_voix = vocal_row['Caractere_Expressif'].iloc[0] if 'Caractere_Expressif' in vocal_row.columns else (caractere_voix_desire if caractere_voix_desire else 'approprié')
+        if vocal_row is not None:
+            actual_style_vocal = vocal_row.get('Style_Vocal_Detaille', style_vocal_desire if style_vocal_desire else 'neutre')
+            actual_caractere_voix = vocal_row.get('Caractere_Expressif', caractere_voix_desire if caractere_voix_desire else 'approprié')
             vocal_details = f"Avec une voix {type_voix_desiree} de style {actual_style_vocal} et de caractère {actual_caractere_voix}. "
         else:
             vocal_details = f"Avec une voix {type_voix_desiree} de style {style_vocal_desire if style_vocal_desire else 'neutre'} et de caractère {caractere_voix_desire if caractere_voix_desire else 'approprié'}. "
@@ -203,22 +429,38 @@ def generate_audio_prompt(
     Format de sortie strict pour SUNO :
     [Genre] | [Mood] | [Instrumentation] | [Ambiance] | [Effets] | [Détails vocaux, si applicable] | [Structure]
     """
+    return prompt
+
+def generate_audio_prompt(
+    genre_musical: str, mood_principal: str, duree_estimee: str,
+    instrumentation_principale: str, ambiance_sonore_specifique: str,
+    effets_production_dominants: str, type_voix_desiree: str = "N/A",
+    style_vocal_desire: str = "N/A", caractere_voix_desire: str = "N/A",
+    structure_song: str = "N/A"
+) -> str:
+    """Génère un prompt textuel détaillé pour la génération audio (optimisé pour SUNO)."""
+    prompt = _audio_prompt(
+        genre_musical, mood_principal, duree_estimee, instrumentation_principale, ambiance_sonore_specifique,
+        effets_production_dominants, type_voix_desiree, style_vocal_desire, caractere_voix_desire, structure_song
+    )
     return _generate_content(_text_model, prompt, type_generation="Prompt Audio", temperature=0.6, max_output_tokens=500)
 
-def generate_title_ideas(theme_principal: str, genre_musical: str, paroles_extrait: str = "") -> str:
-    """Propose plusieurs idées de titres de chansons."""
-    prompt = f"""Génère 10 idées de titres de chansons accrocheurs et pertinents.
+def _title_ideas_prompt(theme_principal: str, genre_musical: str, paroles_extrait: str = "") -> str:
+    return f"""Génère 10 idées de titres de chansons accrocheurs et pertinents.
     Le thème principal est **{theme_principal}**.
     Le genre musical est **{genre_musical}**.
     Si des paroles sont fournies, inspire-toi-en : "{paroles_extrait}"
     Présente les titres sous forme de liste numérotée, sans aucun texte introductif ni explicatif.
     """
+
+def generate_title_ideas(theme_principal: str, genre_musical: str, paroles_extrait: str = "") -> str:
+    """Propose plusieurs idées de titres de chansons."""
+    prompt = _title_ideas_prompt(theme_principal, genre_musical, paroles_extrait)
     return _generate_content(_text_model, prompt, type_generation="Idées de Titres", temperature=0.7)
 
 def generate_marketing_copy(titre_morceau: str, genre_musical: str, mood_principal: str, public_cible: str, point_fort_principal: str) -> str:
     """Génère un texte de description marketing court."""
-    public_cible_df = get_dataframe_from_sheet(WORKSHEET_NAMES["PUBLIC_CIBLE_DEMOGRAPHIQUE"])
-    public_desc = public_cible_df[public_cible_df['ID_Public'] == public_cible]['Notes_Comportement'].iloc[0] if public_cible and not public_cible_df.empty and public_cible in public_cible_df['ID_Public'].values else public_cible
+    public_desc = get_reference_table("PUBLIC_CIBLE_DEMOGRAPHIQUE").field(public_cible, 'Notes_Comportement', default=public_cible)
 
     prompt = f"""Rédige une description marketing courte (maximum 60 mots) et percutante pour le morceau ou l'album '{titre_morceau}'.
     Genre: {genre_musical}. Mood: {mood_principal}.
@@ -229,8 +471,7 @@ def generate_marketing_copy(titre_morceau: str, genre_musical: str, mood_princip
 
 def generate_album_art_prompt(nom_album: str, genre_dominant_album: str, description_concept_album: str, mood_principal: str, mots_cles_visuels_suppl: str) -> str:
     """Crée un prompt détaillé pour une IA génératrice d'images (Midjourney/DALL-E)."""
-    moods_df = get_dataframe_from_sheet(WORKSHEET_NAMES["MOODS_ET_EMOTIONS"])
-    mood_desc = moods_df[moods_df['ID_Mood'] == mood_principal]['Description_Nuance'].iloc[0] if mood_principal and not moods_df.empty and mood_principal in moods_df['ID_Mood'].values else mood_principal
+    mood_desc = get_reference_table("MOODS_ET_EMOTIONS").field(mood_principal, 'Description_Nuance', default=mood_principal)
 
     prompt = f"""Crée un prompt visuel détaillé et évocateur pour une IA génératrice d'images (comme Midjourney ou DALL-E) pour la pochette de l'album '{nom_album}'.
     Le genre dominant est **{genre_dominant_album}**.
@@ -241,72 +482,112 @@ def generate_album_art_prompt(nom_album: str, genre_dominant_album: str, descrip
     """
     return _generate_content(_creative_model, prompt, type_generation="Prompt Pochette Album", temperature=0.8, max_output_tokens=1000)
 
-def simulate_streaming_stats(morceau_ids: list, num_months: int) -> pd.DataFrame:
-    """Simule des statistiques d'écoute pour un ou plusieurs morceaux et les ajoute à la feuille de calcul."""
-    
-    morceaux_df = get_dataframe_from_sheet(WORKSHEET_NAMES["MORCEAUX_GENERES"])
-    
-    sim_data = []
-    current_date = datetime.now()
+# --- Moteur de Simulation Monte Carlo (vectorisé) ---
+
+# Bornes de croissance mensuelle des écoutes selon le genre musical
+_GROWTH_BOUNDS_DEFAULT = (-0.05, 0.1) # Fluctuation par défaut
+_GROWTH_BOUNDS_BY_GENRE = {
+    "SM-POP-CHART-TOP": (0.01, 0.15), # Potentiel de croissance plus fort
+    "SM-EDM": (0.01, 0.15),
+    "SM-TRAP": (0.01, 0.15),
+    "SM-AMBIENT": (-0.02, 0.03), # Croissance plus stable/lente
+    "SM-CLASSICAL-MODERN": (-0.02, 0.03),
+}
+SIMULATED_METRICS = ['Ecoutes_Totales', 'J_aimes_Recus', 'Partages_Simules', 'Revenus_Simules_Streaming']
+
+def run_streaming_monte_carlo(genres: list, num_months: int, num_trajectories: int = 1000, seed=None) -> dict:
+    """
+    Tire en une seule fois toutes les trajectoires (morceaux × mois × trajectoires) avec un générateur NumPy.
+    Retourne un dictionnaire {métrique: tableau de forme (len(genres), num_months, num_trajectories)}.
+    Un `seed` fixe rend la simulation reproductible.
+    """
+    rng = np.random.default_rng(seed)
+    shape = (len(genres), num_months, num_trajectories)
+    bounds = np.array([_GROWTH_BOUNDS_BY_GENRE.get(genre, _GROWTH_BOUNDS_DEFAULT) for genre in genres], dtype=float).reshape(len(genres), 2)
 
+    growth = 1 + rng.uniform(bounds[:, 0, None, None], bounds[:, 1, None, None], size=shape)
+    base_listens = rng.integers(1000, 10000, size=(len(genres), 1, num_trajectories), endpoint=True)
+    listens = np.floor(base_listens * np.cumprod(growth, axis=1))
+
+    return {
+        'Ecoutes_Totales': listens,
+        'J_aimes_Recus': np.floor(listens * rng.uniform(0.04, 0.08, size=shape)),
+        'Partages_Simules': np.floor(listens * rng.uniform(0.005, 0.012, size=shape)),
+        # Revenus simulés (ex: 0.004 € par écoute, simplifié)
+        'Revenus_Simules_Streaming': np.round(listens * rng.uniform(0.003, 0.005, size=shape), 2),
+    }
+
+def _get_simulation_targets(morceau_ids: list) -> tuple:
+    """Retourne les IDs de morceaux trouvés et leur genre principal, en signalant les IDs introuvables."""
+    morceaux_df = get_dataframe_from_sheet(WORKSHEET_NAMES["MORCEAUX_GENERES"])
+    morceaux_by_id = morceaux_df.drop_duplicates('ID_Morceau').set_index('ID_Morceau')
+    found_ids = []
     for morceau_id in morceau_ids:
-        morceau = morceaux_df[morceaux_df['ID_Morceau'] == morceau_id]
-        if morceau.empty:
+        if morceau_id not in morceaux_by_id.index:
             st.warning(f"Morceau avec ID {morceau_id} introuvable pour la simulation. Ignoré.")
             continue
+        found_ids.append(morceau_id)
+    if 'ID_Style_Musical_Principal' in morceaux_by_id.columns:
+        genres = morceaux_by_id.loc[found_ids, 'ID_Style_Musical_Principal'].tolist()
+    else:
+        genres = ['Non Spécifié'] * len(found_ids)
+    return found_ids, genres
 
-        genre_musical = morceau['ID_Style_Musical_Principal'].iloc[0] if 'ID_Style_Musical_Principal' in morceau.columns else 'Non Spécifié'
-        
-        # Pour une base d'écoutes plus réaliste, on pourrait la lier au "succès" passé ou à des valeurs initiales par défaut
-        # Pour l'exemple, utilisons une base aléatoire pour la première simulation du morceau.
-        base_ecoutes_initial = random.randint(1000, 10000)    
+def _get_simulation_months(num_months: int) -> list:
+    """Retourne les libellés 'MM-AAAA' des mois simulés, à partir du mois courant."""
+    first_month = pd.Timestamp(datetime.now().replace(day=1)).normalize()
+    return pd.date_range(first_month, periods=num_months, freq='MS').strftime('%m-%Y').tolist()
 
-        current_listens = base_ecoutes_initial
-        
-        for i in range(num_months):
-            month_year = (current_date.replace(day=1) + pd.DateOffset(months=i)).strftime('%m-%Y')
-            
-            # Variations aléatoires basées sur le genre et le mood (simplifié)
-            listen_growth_factor = 1 + random.uniform(-0.05, 0.1) # Fluctuation par défaut
-            if genre_musical in ["SM-POP-CHART-TOP", "SM-EDM", "SM-TRAP"]:
-                listen_growth_factor = 1 + random.uniform(0.01, 0.15) # Potentiel de croissance plus fort
-            elif genre_musical in ["SM-AMBIENT", "SM-CLASSICAL-MODERN"]:
-                listen_growth_factor = 1 + random.uniform(-0.02, 0.03) # Croissance plus stable/lente
-
-            current_listens = int(current_listens * listen_growth_factor)
-            
-            j_aimes = int(current_listens * random.uniform(0.04, 0.08))
-            partages = int(current_listens * random.uniform(0.005, 0.012))
-            
-            # Revenus simulés (ex: 0.004 € par écoute, simplifié)
-            revenus = round(current_listens * random.uniform(0.003, 0.005), 2)
-
-            sim_data.append({
-                'ID_Stat_Simulee': generate_unique_id('SS'),
-                'ID_Morceau': morceau_id,
-                'Mois_Annee_Stat': month_year,
-                'Plateforme_Simulee': 'Simulée', # Peut être paramétré par l'utilisateur si on complexifie
-                'Ecoutes_Totales': current_listens,
-                'J_aimes_Recus': j_aimes,
-                'Partages_Simules': partages,
-                'Revenus_Simules_Streaming': revenus,
-                'Audience_Cible_Demographique': 'Mixte Simulé' # Peut être paramétré
-            })
+def simulate_streaming_bands(morceau_ids: list, num_months: int, num_trajectories: int = 1000, seed=None) -> pd.DataFrame:
+    """
+    Simule `num_trajectories` scénarios par morceau et retourne, pour chaque morceau, mois et métrique,
+    la médiane et les bandes P10/P90. Ces projections ne sont pas enregistrées dans la feuille de calcul.
+    """
+    found_ids, genres = _get_simulation_targets(morceau_ids)
+    if not found_ids:
+        return pd.DataFrame(columns=['ID_Morceau', 'Mois_Annee_Stat', 'Metrique', 'P10', 'Mediane', 'P90'])
+    months = _get_simulation_months(num_months)
+    trajectories = run_streaming_monte_carlo(genres, num_months, num_trajectories, seed)
+
+    band_frames = []
+    for metric in SIMULATED_METRICS:
+        p10, median, p90 = np.percentile(trajectories[metric], [10, 50, 90], axis=2)
+        band_frames.append(pd.DataFrame({
+            'ID_Morceau': np.repeat(found_ids, num_months),
+            'Mois_Annee_Stat': np.tile(months, len(found_ids)),
+            'Metrique': metric,
+            'P10': p10.ravel(),
+            'Mediane': median.ravel(),
+            'P90': p90.ravel(),
+        }))
+    return pd.concat(band_frames, ignore_index=True)
+
+def simulate_streaming_stats(morceau_ids: list, num_months: int) -> pd.DataFrame:
+    """Simule des statistiques d'écoute pour un ou plusieurs morceaux et les ajoute à la feuille de calcul."""
     
-    sim_df = pd.DataFrame(sim_data)
+    found_ids, genres = _get_simulation_targets(morceau_ids)
+    months = _get_simulation_months(num_months)
+    # Une seule trajectoire par morceau : c'est le scénario enregistré dans la feuille
+    trajectories = run_streaming_monte_carlo(genres, num_months, num_trajectories=1)
+    num_rows = len(found_ids) * num_months
+
+    sim_df = pd.DataFrame({
+        'ID_Stat_Simulee': [generate_unique_id('SS') for _ in range(num_rows)],
+        'ID_Morceau': np.repeat(found_ids, num_months),
+        'Mois_Annee_Stat': np.tile(months, len(found_ids)),
+        'Plateforme_Simulee': 'Simulée', # Peut être paramétré par l'utilisateur si on complexifie
+        'Ecoutes_Totales': trajectories['Ecoutes_Totales'].ravel().astype(int),
+        'J_aimes_Recus': trajectories['J_aimes_Recus'].ravel().astype(int),
+        'Partages_Simules': trajectories['Partages_Simules'].ravel().astype(int),
+        'Revenus_Simules_Streaming': trajectories['Revenus_Simules_Streaming'].ravel(),
+        'Audience_Cible_Demographique': 'Mixte Simulé' # Peut être paramétré
+    })
     
-    # Ajouter les données à la feuille STATISTIQUES_ORBITALES_SIMULEES
+    # Ajouter les données à la feuille STATISTIQUES_ORBITALES_SIMULEES en quelques appels groupés
     try:
-        from sheets_connector import append_row_to_sheet # Importation locale
-        for _, row in sim_df.iterrows():
-            # Convertir les valeurs numériques au bon format si elles ne le sont pas déjà
-            row_dict = row.to_dict()
-            row_dict['Ecoutes_Totales'] = str(int(row_dict['Ecoutes_Totales']))
-            row_dict['J_aimes_Recus'] = str(int(row_dict['J_aimes_Recus']))
-            row_dict['Partages_Simules'] = str(int(row_dict['Partages_Simules']))
-            row_dict['Revenus_Simules_Streaming'] = str(float(row_dict['Revenus_Simules_Streaming']))
-            
-            append_row_to_sheet(WORKSHEET_NAMES["STATISTIQUES_ORBITALES_SIMULEES"], row_dict)
+        from sheets_connector import append_dataframe_to_sheet # Importation locale
+        if not append_dataframe_to_sheet(WORKSHEET_NAMES["STATISTIQUES_ORBITALES_SIMULEES"], sim_df):
+            st.warning("Les statistiques ont été générées mais pas entièrement sauvegardées.")
     except Exception as e:
         st.error(f"Erreur lors de l'enregistrement des statistiques simulées dans Google Sheets: {e}")
         st.warning("Les statistiques ont été générées mais pas sauvegardées. Vérifiez votre `sheets_connector.py`.")
@@ -339,15 +620,14 @@ def generate_ai_artist_bio(nom_artiste_ia: str, genres_predilection: str, concep
 
 def refine_mood_with_questions(selected_mood_id: str) -> str:
     """Pose des questions pour affiner l'émotion d'un mood sélectionné."""
-    moods_df = get_dataframe_from_sheet(WORKSHEET_NAMES["MOODS_ET_EMOTIONS"])
-    mood_info = moods_df[moods_df['ID_Mood'] == selected_mood_id]
+    mood_info = get_reference_table("MOODS_ET_EMOTIONS").get(selected_mood_id)
     
-    if mood_info.empty:
+    if mood_info is None:
         return f"Mood '{selected_mood_id}' inconnu. Veuillez en sélectionner un existant."
     
-    nom_mood = mood_info['Nom_Mood'].iloc[0] if 'Nom_Mood' in mood_info.columns else selected_mood_id
-    desc_nuance = mood_info['Description_Nuance'].iloc[0] if 'Description_Nuance' in mood_info.columns else "sans description détaillée."
-    niveau_intensite = mood_info['Niveau_Intensite'].iloc[0] if 'Niveau_Intensite' in mood_info.columns else "intensité non spécifiée."
+    nom_mood = mood_info.get('Nom_Mood', selected_mood_id)
+    desc_nuance = mood_info.get('Description_Nuance', "sans description détaillée.")
+    niveau_intensite = mood_info.get('Niveau_Intensite', "intensité non spécifiée.")
     
     prompt = f"""Tu es un expert en émotion musicale et en psychologie de l'art. Le Gardien a choisi le mood '{nom_mood}' ({desc_nuance}, niveau d'intensité {niveau_intensite}/5).
     Pose 3-4 questions précises et stimulantes pour l'aider à affiner cette émotion pour une composition musicale.
@@ -364,8 +644,7 @@ def generate_complex_harmonic_structure(genre_musical: str, mood_principal: str,
     Demande à l'Oracle de créer une progression harmonique détaillée.
     """
     
-    moods_df = get_dataframe_from_sheet(WORKSHEET_NAMES["MOODS_ET_EMOTIONS"])
-    mood_desc = moods_df[moods_df['ID_Mood'] == mood_principal]['Description_Nuance'].iloc[0] if mood_principal and not moods_df.empty and mood_principal in moods_df['ID_Mood'].values else mood_principal
+    mood_desc = get_reference_table("MOODS_ET_EMOTIONS").field(mood_principal, 'Description_Nuance', default=mood_principal)
 
     prompt = f"""En tant que théoricien musical et compositeur IA expert, génère une structure harmonique complexe et innovante pour un morceau de genre **{genre_musical}**.
     Le mood visé est **{mood_principal} ({mood_desc})**.
@@ -431,7 +710,7 @@ def analyze_and_suggest_personal_style(user_feedback_history_df: pd.DataFrame) -
             
         # Inclure aussi les types de génération réussis si pertinents
         if row['Type_Generation']:
-            all_tags.append(str(row['Type_Generation']).lower().replace(' ', '_'))
+            all_tags.append(str(row['Type_Generation']).removesuffix(CACHE_HIT_SUFFIX).lower().replace(' ', '_'))
             
     
     if not all_tags:
@@ -458,28 +737,25 @@ def analyze_and_suggest_personal_style(user_feedback_history_df: pd.DataFrame) -
     return _generate_content(_creative_model, prompt, type_generation="Agent de Style - Suggestion Personnalisée", temperature=0.9, max_output_tokens=500)
 
 
-def generate_multimodal_content_prompts(
-    main_theme: str, main_genre: str, main_mood: str,
-    longueur_morceau: str, artiste_ia_name: str
-) -> dict:
-    """
-    Génère des prompts cohérents pour paroles, audio (SUNO), et visuels (Midjourney/DALL-E)
-    en s'assurant d'une cohérence thématique et émotionnelle.
-    """
-    moods_df = get_dataframe_from_sheet(WORKSHEET_NAMES["MOODS_ET_EMOTIONS"])
-    mood_desc = moods_df[moods_df['ID_Mood'] == main_mood]['Description_Nuance'].iloc[0] if main_mood and not moods_df.empty and main_mood in moods_df['ID_Mood'].values else main_mood
+def _multimodal_context(main_theme: str, main_genre: str, main_mood: str, longueur_morceau: str, artiste_ia_name: str) -> str:
+    """Cœur de la création multimodale, commun au prompt unique et aux trois prompts de section."""
+    mood_desc = get_reference_table("MOODS_ET_EMOTIONS").field(main_mood, 'Description_Nuance', default=main_mood)
+    return f"""Le cœur de la création est :
+    -   **Thème Principal : {main_theme}**
+    -   **Genre Musical : {main_genre}**
+    -   **Mood Général : {main_mood} ({mood_desc})**
+    -   **Longueur Estimée du Morceau : {longueur_morceau}**
+    -   **Artiste IA concerné : {artiste_ia_name}**"""
+
+def _multimodal_prompt(main_theme: str, main_genre: str, main_mood: str, longueur_morceau: str, artiste_ia_name: str) -> str:
+    context = _multimodal_context(main_theme, main_genre, main_mood, longueur_morceau, artiste_ia_name)
 
     prompt = f"""En tant qu'Architecte Multimodal ultime, ton objectif est de générer trois prompts distincts mais parfaitement cohérents et synchronisés pour une création artistique complète :
     1.  **Prompt #1: Paroles de Chanson** (pour un parolier humain ou une IA de texte)
     2.  **Prompt #2: Génération Audio** (optimisé pour un outil comme SUNO ou autre générateur de musique AI)
     3.  **Prompt #3: Image pour Pochette d'Album** (optimisé pour un outil comme Midjourney/DALL-E, pour la pochette d'album ou une image d'accompagnement)
 
-    Le cœur de la création est :
-    -   **Thème Principal : {main_theme}**
-    -   **Genre Musical : {main_genre}**
-    -   **Mood Général : {main_mood} ({mood_desc})**
-    -   **Longueur Estimée du Morceau : {longueur_morceau}**
-    -   **Artiste IA concerné : {artiste_ia_name}**
+    {context}
 
     Pour chaque prompt, sois extrêmement précis, créatif et descriptif. Utilise des termes évocateurs et assure-toi que le langage, les images, les sonorités et les concepts visuels se renforcent mutuellement pour créer une œuvre cohérente et immersive.
 
@@ -495,9 +771,164 @@ def generate_multimodal_content_prompts(
     **Prompt #3: Image pour Pochette d'Album**
     [Détails pour l'image: Style artistique (ex: art numérique, photographie surréaliste, illustration rétro-futuriste), palette de couleurs dominante, composition (gros plan, plan large, perspective), éclairage, éléments clés visuels spécifiques, et des ratios d'image (ex: --ar 1:1 pour une pochette carrée, --ar 16:9 pour un visuel de clip). L'image doit capturer l'essence du thème et du mood.]
     """
+    return prompt
 
+def generate_multimodal_content_prompts(
+    main_theme: str, main_genre: str, main_mood: str,
+    longueur_morceau: str, artiste_ia_name: str
+) -> dict:
+    """
+    Génère des prompts cohérents pour paroles, audio (SUNO), et visuels (Midjourney/DALL-E)
+    en s'assurant d'une cohérence thématique et émotionnelle.
+    """
+    prompt = _multimodal_prompt(main_theme, main_genre, main_mood, longueur_morceau, artiste_ia_name)
     response_text = _generate_content(_creative_model, prompt, type_generation="Création Multimodale Synchronisée", temperature=0.9, max_output_tokens=3000)
+    return parse_multimodal_response(response_text)
 
+def stream_multimodal_content_prompts(
+    main_theme: str, main_genre: str, main_mood: str,
+    longueur_morceau: str, artiste_ia_name: str
+):
+    """
+    Comme generate_multimodal_content_prompts, mais renvoie la réponse brute au fil de la génération
+    (générateur pour st.write_stream) ; le texte complet se découpe ensuite avec parse_multimodal_response.
+    """
+    prompt = _multimodal_prompt(main_theme, main_genre, main_mood, longueur_morceau, artiste_ia_name)
+    return _stream_content(_creative_model, prompt, type_generation="Création Multimodale Synchronisée", temperature=0.9, max_output_tokens=3000)
+
+# Sections de la création multimodale en parallèle : (clé de prompts_dict, titre, consignes, max_output_tokens)
+_MULTIMODAL_SECTIONS = [
+    ("paroles_prompt", "Paroles de Chanson",
+     "Détails pour les paroles: style lyrique, mots-clés spécifiques, imagerie textuelle, ton émotionnel, structure souhaitée (ex: Intro, Couplet, Refrain, Pont, Outro). Donne un exemple d'une phrase d'accroche. Ce prompt s'adresse à un parolier humain ou une IA de texte.",
+     1200),
+    ("audio_suno_prompt", "Génération Audio (SUNO)",
+     "Détails pour l'audio: Format SUNO strict: Genre | Mood | Instrumentation clé | Ambiance sonore | Effets de production | Détails vocaux (type, style, caractère) | Structure du morceau. Ajoute des spécificités comme le tempo (BPM) ou des textures sonores (ex: \"vinyle crackle\").",
+     800),
+    ("image_prompt", "Image pour Pochette d'Album",
+     "Détails pour l'image: Style artistique (ex: art numérique, photographie surréaliste, illustration rétro-futuriste), palette de couleurs dominante, composition (gros plan, plan large, perspective), éclairage, éléments clés visuels spécifiques, et des ratios d'image (ex: --ar 1:1 pour une pochette carrée, --ar 16:9 pour un visuel de clip). L'image doit capturer l'essence du thème et du mood.",
+     1000),
+]
+MULTIMODAL_SECTION_KEYS = [section_key for section_key, _, _, _ in _MULTIMODAL_SECTIONS]
+
+def _multimodal_section_prompt(context: str, title: str, instructions: str) -> str:
+    return f"""En tant qu'Architecte Multimodal ultime, tu participes à une création artistique complète dont les paroles, l'audio et la pochette sont conçus séparément à partir du même cœur de création, et doivent se renforcer mutuellement pour former une œuvre cohérente et immersive.
+
+    {context}
+
+    Rédige uniquement le **Prompt : {title}**. Sois extrêmement précis, créatif et descriptif, avec des termes évocateurs fidèles au thème et au mood.
+    {instructions}
+
+    Réponds avec le prompt seul, sans titre, sans séparateur et sans commentaire.
+    """
+
+def _request_text(model, final_prompt: str, type_generation: str, temperature: float, max_output_tokens: int, priority: int = PRIORITY_INTERACTIVE) -> str:
+    """Un appel à Gemini (via le limiteur partagé) sans affichage ni log : lève une exception si la réponse est bloquée, vide ou en erreur."""
+    response = _call_model(model, final_prompt, type_generation, temperature, max_output_tokens, priority=priority)
+    if not response.candidates:
+        block_reason = response.prompt_feedback.block_reason.name if response.prompt_feedback and response.prompt_feedback.block_reason else "Raison inconnue."
+        raise ValueError(f"génération bloquée ({block_reason})")
+    generated_text = response.text
+    if not generated_text.strip():
+        raise ValueError("réponse vide")
+    return generated_text
+
+def _request_text_with_retries(model, final_prompt: str, type_generation: str, temperature: float, max_output_tokens: int, max_retries: int, base_delay: float, max_delay: float, priority: int = PRIORITY_INTERACTIVE) -> dict:
+    """
+    _request_text rejoué jusqu'à `max_retries` fois (backoff exponentiel avec gigue), sans affichage ni log.
+    Les erreurs transitoires sont déjà rejouées par le limiteur : ces tentatives couvrent aussi les réponses bloquées ou vides.
+    Retourne {'text': texte ou None si tous les essais ont échoué, 'attempts', 'errors', 'duration_ms'}.
+    """
+    start = time.perf_counter()
+    errors = []
+    for attempt in range(max_retries + 1):
+        try:
+            generated_text = _request_text(model, final_prompt, type_generation, temperature, max_output_tokens, priority)
+            return {'text': generated_text, 'attempts': attempt + 1, 'errors': errors, 'duration_ms': round((time.perf_counter() - start) * 1000, 1)}
+        except Exception as e:
+            errors.append(str(e))
+            if attempt < max_retries:
+                time.sleep(backoff_delay(attempt, base_delay, max_delay))
+    return {'text': None, 'attempts': max_retries + 1, 'errors': errors, 'duration_ms': round((time.perf_counter() - start) * 1000, 1)}
+
+def generate_multimodal_content_prompts_parallel(
+    main_theme: str, main_genre: str, main_mood: str,
+    longueur_morceau: str, artiste_ia_name: str,
+    sections: list = None, max_retries: int = MULTIMODAL_SECTION_MAX_RETRIES
+) -> tuple:
+    """
+    Variante de generate_multimodal_content_prompts : les trois prompts (paroles, audio, image) sont demandés
+    en parallèle (pool de threads), chacun par son propre appel à partir du même cœur de création. L'attente est
+    celle de la section la plus lente, et non plus celle d'une réponse unique de 3000 tokens ; un séparateur mal
+    formé ne fait plus perdre les trois prompts. Une section en échec est relancée seule jusqu'à `max_retries` fois.
+    `sections` (clés de MULTIMODAL_SECTION_KEYS) limite la génération à certaines sections, ex: pour relancer
+    celles restées en échec sans régénérer les autres.
+    Retourne (prompts_dict, timings) : prompts_dict avec une entrée par section demandée (message d'erreur si
+    elle a échoué), timings : DataFrame (Section, Statut, Tentatives, Duree_ms, Erreur).
+    """
+    requested_sections = [section for section in _MULTIMODAL_SECTIONS if sections is None or section[0] in sections]
+    if _creative_model is None:
+        unavailable_message = _gemini_error or _ORACLE_UNAVAILABLE_MESSAGE
+        timings = pd.DataFrame([
+            {'Section': section_key, 'Statut': 'indisponible', 'Tentatives': 0, 'Duree_ms': 0.0, 'Erreur': unavailable_message}
+            for section_key, _, _, _ in requested_sections
+        ], columns=['Section', 'Statut', 'Tentatives', 'Duree_ms', 'Erreur'])
+        return {section_key: unavailable_message for section_key, _, _, _ in requested_sections}, timings
+
+    model = _creative_model
+    temperature = 0.9
+    context = _multimodal_context(main_theme, main_genre, main_mood, longueur_morceau, artiste_ia_name)
+    requests = {}
+    for section_key, title, instructions, max_output_tokens in requested_sections:
+        type_generation = f"Création Multimodale Synchronisée - {title}"
+        final_prompt, cache_ttl, cache_key = _prepare_request(model, _multimodal_section_prompt(context, title, instructions), type_generation, temperature, max_output_tokens, True)
+        requests[section_key] = (type_generation, final_prompt, cache_ttl, cache_key, max_output_tokens)
+
+    script_run_ctx = get_script_run_ctx() # Propagé aux threads du pool (limiteur partagé, avertissements Streamlit éventuels)
+
+    def generate_section(section_key: str) -> dict:
+        # Appels à Gemini seulement : l'affichage, le cache et l'historique restent dans le thread du script
+        if script_run_ctx is not None:
+            add_script_run_ctx(threading.current_thread(), script_run_ctx)
+        type_generation, final_prompt, _, _, max_output_tokens = requests[section_key]
+        return _request_text_with_retries(
+            model, final_prompt, type_generation, temperature, max_output_tokens,
+            max_retries, MULTIMODAL_SECTION_BACKOFF_BASE_SECONDS, MULTIMODAL_SECTION_BACKOFF_MAX_SECONDS
+        )
+
+    prompts_dict = {}
+    timings = []
+    pending_sections = []
+    for section_key, (type_generation, final_prompt, _, cache_key, _) in requests.items():
+        cached_text = _cached_response(cache_key, type_generation, final_prompt, "")
+        if cached_text is not None:
+            prompts_dict[section_key] = cached_text
+            timings.append({'Section': section_key, 'Statut': 'cache', 'Tentatives': 0, 'Duree_ms': 0.0, 'Erreur': ''})
+        else:
+            pending_sections.append(section_key)
+
+    if pending_sections:
+        with ThreadPoolExecutor(max_workers=len(pending_sections), thread_name_prefix="oracle-multimodal") as pool:
+            results = dict(zip(pending_sections, pool.map(generate_section, pending_sections)))
+        for section_key, result in results.items():
+            type_generation, final_prompt, cache_ttl, cache_key, _ = requests[section_key]
+            if result['text'] is not None:
+                prompts_dict[section_key] = result['text']
+                if cache_key is not None:
+                    _get_oracle_cache().put(cache_key, result['text'], cache_ttl)
+                _log_gemini_interaction(type_generation, final_prompt, result['text'])
+            else:
+                prompts_dict[section_key] = f"La génération de cette section a échoué après {result['attempts']} tentatives : {result['errors'][-1]}"
+                _log_gemini_interaction(type_generation, final_prompt, f"ERREUR API ({result['attempts']} tentatives): {result['errors'][-1]}")
+            timings.append({
+                'Section': section_key, 'Statut': 'ok' if result['text'] is not None else 'échec',
+                'Tentatives': result['attempts'], 'Duree_ms': result['duration_ms'], 'Erreur': result['errors'][-1] if result['errors'] else ''
+            })
+
+    timings.sort(key=lambda timing: MULTIMODAL_SECTION_KEYS.index(timing['Section']))
+    return prompts_dict, pd.DataFrame(timings, columns=['Section', 'Statut', 'Tentatives', 'Duree_ms', 'Erreur'])
+
+def parse_multimodal_response(response_text: str) -> dict:
+    """Découpe la réponse de l'Architecte Multimodal en ses trois prompts (paroles, audio SUNO, image)."""
     # Tenter de parser la réponse en prompts individuels
     prompts_dict = {
         "paroles_prompt": "Prompt des paroles non trouvé. Vérifiez le format de la réponse de l'IA.",
@@ -522,11 +953,8 @@ def analyze_viral_potential_and_niche_recommendations(morceau_data: dict, public
     Analyse le potentiel viral d'un morceau et recommande des niches de marché.
     C'est l'implémentation de la Détection de Potentiel Viral.
     """
-    # Récupérer les données complètes des onglets pour enrichir le prompt
-    public_cible_df = get_dataframe_from_sheet(WORKSHEET_NAMES["PUBLIC_CIBLE_DEMOGRAPHIQUE"])
-    moods_df = get_dataframe_from_sheet(WORKSHEET_NAMES["MOODS_ET_EMOTIONS"])
-    themes_df = get_dataframe_from_sheet(WORKSHEET_NAMES["THEMES_CONSTELLES"])
-    styles_musicaux_df = get_dataframe_from_sheet(WORKSHEET_NAMES["STYLES_MUSICAUX_GALACTIQUES"])
+    # Bibliothèques indexées par identifiant pour enrichir le prompt
+    references = get_reference_tables(["PUBLIC_CIBLE_DEMOGRAPHIQUE", "MOODS_ET_EMOTIONS", "THEMES_CONSTELLES", "STYLES_MUSICAUX_GALACTIQUES"])
 
 
     # Extraction sécurisée des données du morceau
@@ -537,12 +965,12 @@ def analyze_viral_potential_and_niche_recommendations(morceau_data: dict, public
     theme_id = morceau_data.get('Theme_Principal_Lyrique', 'Non Spécifié')
     instrumentation = morceau_data.get('Instrumentation_Principale', 'Non Spécifiée')
     
-    # Traduire les IDs en noms pour l'IA
-    public_desc = public_cible_df[public_cible_df['ID_Public'] == public_cible_id]['Notes_Comportement'].iloc[0] if public_cible_id and not public_cible_df.empty and public_cible_id in public_cible_df['ID_Public'].values else public_cible_id
-    genre_name = styles_musicaux_df[styles_musicaux_df['ID_Style_Musical'] == genre_id]['Nom_Style_Musical'].iloc[0] if genre_id and not styles_musicaux_df.empty and genre_id in styles_musicaux_df['ID_Style_Musical'].values else genre_id
+    # Traduire les IDs en noms pour l'IA (déjà faits si morceau_data vient de la vue catalogue)
+    public_desc = references["PUBLIC_CIBLE_DEMOGRAPHIQUE"].field(public_cible_id, 'Notes_Comportement', default=public_cible_id)
+    genre_name = morceau_data.get('Nom_Style_Musical') or references["STYLES_MUSICAUX_GALACTIQUES"].field(genre_id, 'Nom_Style_Musical', default=genre_id)
     # Utilisation directe du mood_name_from_morceau, ou tentative de le trouver par ID si nécessaire
-    mood_name = moods_df[moods_df['ID_Mood'] == mood_name_from_morceau]['Nom_Mood'].iloc[0] if mood_name_from_morceau and not moods_df.empty and mood_name_from_morceau in moods_df['ID_Mood'].values else mood_name_from_morceau
-    theme_name = themes_df[themes_df['ID_Theme'] == theme_id]['Nom_Theme'].iloc[0] if theme_id and not themes_df.empty and theme_id in themes_df['ID_Theme'].values else theme_id
+    mood_name = morceau_data.get('Nom_Mood') or references["MOODS_ET_EMOTIONS"].field(mood_name_from_morceau, 'Nom_Mood', default=mood_name_from_morceau)
+    theme_name = morceau_data.get('Nom_Theme') or references["THEMES_CONSTELLES"].field(theme_id, 'Nom_Theme', default=theme_id)
 
     prompt = f"""En tant qu'analyste de marché musical expert et visionnaire en détection de tendances virales, évalue le potentiel de résonance et de viralité du morceau suivant, puis propose des recommandations de niche de marché.
 
@@ -565,3 +993,188 @@ def analyze_viral_potential_and_niche_recommendations(morceau_data: dict, public
     Présente l'analyse de manière claire et concise.
     """
     return _generate_content(_creative_model, prompt, type_generation="Analyse Potentiel Viral", temperature=0.9, max_output_tokens=1000)
+
+# --- Génération de Catalogue par Lots ---
+
+# Paramètres d'un morceau du lot (noms des paramètres de generate_song_lyrics / generate_audio_prompt)
+BATCH_REQUIRED_FIELDS = ['genre_musical', 'mood_principal', 'theme_lyrique_principal', 'style_lyrique', 'structure_chanson']
+BATCH_OPTIONAL_FIELDS = {
+    'mots_cles_generation': '', 'langue_paroles': 'Français', 'niveau_langage_paroles': 'Courant', 'imagerie_texte': '',
+    'duree_estimee': '', 'instrumentation_principale': '', 'ambiance_sonore_specifique': '', 'effets_production_dominants': '',
+    'type_voix_desiree': 'N/A', 'style_vocal_desire': 'N/A', 'caractere_voix_desire': 'N/A',
+    'id_artiste_ia': '', 'id_album_associe': '',
+}
+BATCH_REPORT_COLUMNS = ['Ligne', 'ID_Morceau', 'Titre_Morceau', 'Statut', 'Appels', 'Tentatives', 'Duree_ms', 'Erreur']
+
+def _normalize_batch_items(items) -> list:
+    """Lignes du lot (liste de dictionnaires ou DataFrame) sous forme de dictionnaires complets, valeurs vides remplacées par les défauts."""
+    records = items.to_dict('records') if isinstance(items, pd.DataFrame) else [dict(item) for item in items]
+    normalized = []
+    for record in records:
+        item = {}
+        for field in BATCH_REQUIRED_FIELDS + list(BATCH_OPTIONAL_FIELDS):
+            value = record.get(field)
+            item[field] = BATCH_OPTIONAL_FIELDS.get(field, '') if value is None or (isinstance(value, float) and pd.isna(value)) or value == '' else str(value)
+        normalized.append(item)
+    return normalized
+
+def _first_title(title_ideas: str) -> str:
+    """Premier titre d'une liste numérotée renvoyée par l'Oracle ('1. "Titre"' -> 'Titre')."""
+    for line in title_ideas.splitlines():
+        title = line.strip().lstrip('0123456789.)-•* ').strip().strip('"«»*').strip()
+        if title:
+            return title
+    return ""
+
+def _batch_morceau_row(item: dict, texts: dict) -> dict:
+    """Ligne de MORCEAUX_GENERES pour un morceau du lot dont les trois étapes ont réussi."""
+    return {
+        'Titre_Morceau': _first_title(texts['titres']) or f"Nouveau Morceau - {item['genre_musical']}",
+        'Statut_Production': 'Prompt Audio Généré',
+        'Prompt_Generation_Paroles': texts['paroles'],
+        'Prompt_Generation_Audio': texts['audio'],
+        'ID_Style_Musical_Principal': item['genre_musical'],
+        'ID_Style_Lyrique_Principal': item['style_lyrique'],
+        'Theme_Principal_Lyrique': item['theme_lyrique_principal'],
+        'Structure_Chanson_Specifique': item['structure_chanson'],
+        'Ambiance_Sonore_Specifique': item['mood_principal'],
+        'Mots_Cles_Generation': item['mots_cles_generation'],
+        'Langue_Paroles': item['langue_paroles'],
+        'Niveau_Langage_Paroles': item['niveau_langage_paroles'],
+        'Imagerie_Texte': item['imagerie_texte'],
+        'Durée_Estimee': item['duree_estimee'],
+        'Instrumentation_Principale': item['instrumentation_principale'],
+        'Effets_Production_Domination': item['effets_production_dominants'],
+        'Type_Voix_Desiree': '' if item['type_voix_desiree'] == 'N/A' else item['type_voix_desiree'],
+        'Style_Vocal_Desire': '' if item['style_vocal_desire'] == 'N/A' else item['style_vocal_desire'],
+        'Caractere_Voix_Desire': '' if item['caractere_voix_desire'] == 'N/A' else item['caractere_voix_desire'],
+        'ID_Artiste_IA': item['id_artiste_ia'],
+        'ID_Album_Associe': item['id_album_associe'],
+        'Favori': False,
+    }
+
+def generate_catalogue_batch(
+    items, max_concurrency: int = BATCH_MAX_CONCURRENCY, max_retries: int = BATCH_ITEM_MAX_RETRIES,
+    progress_callback=None, save: bool = True
+) -> pd.DataFrame:
+    """
+    Génère un lot de morceaux : pour chaque ligne de `items` (liste de dictionnaires ou DataFrame, colonnes
+    BATCH_REQUIRED_FIELDS et, au besoin, BATCH_OPTIONAL_FIELDS), les paroles, le prompt audio puis les idées de titres,
+    avec les mêmes prompts, modèles et températures que generate_song_lyrics, generate_audio_prompt et generate_title_ideas.
+    Au plus `max_concurrency` morceaux (plafonné à BATCH_MAX_CONCURRENCY, pour laisser des appels simultanés aux générations
+    demandées une à une) sont générés en même temps (pool de threads) ; chaque étape en échec est relancée
+    jusqu'à `max_retries` fois sans régénérer les étapes déjà réussies du morceau.
+    `progress_callback(termines, total, ligne_du_rapport)` est appelé dans le thread de l'appelant après chaque morceau.
+    Les morceaux complets sont ajoutés à MORCEAUX_GENERES en une seule écriture groupée (sauf `save=False`) ;
+    le premier titre proposé devient le titre du morceau.
+    Retourne le rapport : DataFrame (Ligne, ID_Morceau, Titre_Morceau, Statut, Appels, Tentatives, Duree_ms, Erreur).
+    """
+    batch_items = _normalize_batch_items(items)
+    report = [
+        {'Ligne': position, 'ID_Morceau': '', 'Titre_Morceau': '', 'Statut': 'en attente', 'Appels': 0, 'Tentatives': 0, 'Duree_ms': 0.0, 'Erreur': ''}
+        for position in range(len(batch_items))
+    ]
+    if not batch_items:
+        return pd.DataFrame(report, columns=BATCH_REPORT_COLUMNS)
+    if not init_gemini():
+        unavailable_message = _gemini_error or _ORACLE_UNAVAILABLE_MESSAGE
+        st.error(unavailable_message)
+        for report_row in report:
+            report_row.update({'Statut': 'indisponible', 'Erreur': unavailable_message})
+        return pd.DataFrame(report, columns=BATCH_REPORT_COLUMNS)
+
+    # Prompts des paroles et de l'audio préparés dans le thread du script (bibliothèques de référence) ;
+    # celui des titres dépend des paroles et est construit par le worker
+    pending_positions = []
+    base_prompts = {}
+    for position, item in enumerate(batch_items):
+        missing_fields = [field for field in BATCH_REQUIRED_FIELDS if not item[field]]
+        if missing_fields:
+            report[position].update({'Statut': 'invalide', 'Erreur': f"Champs obligatoires manquants : {', '.join(missing_fields)}"})
+            continue
+        base_prompts[position] = {
+            'paroles': _song_lyrics_prompt(
+                item['genre_musical'], item['mood_principal'], item['theme_lyrique_principal'], item['style_lyrique'],
+                item['mots_cles_generation'], item['structure_chanson'], item['langue_paroles'],
+                item['niveau_langage_paroles'], item['imagerie_texte']
+            ),
+            'audio': _audio_prompt(
+                item['genre_musical'], item['mood_principal'], item['duree_estimee'], item['instrumentation_principale'],
+                item['ambiance_sonore_specifique'], item['effets_production_dominants'], item['type_voix_desiree'],
+                item['style_vocal_desire'], item['caractere_voix_desire'], item['structure_chanson']
+            ),
+        }
+        pending_positions.append(position)
+
+    # Étapes d'un morceau : (clé, type de génération, modèle, température, max_output_tokens), comme les fonctions unitaires
+    steps = [
+        ('paroles', "Paroles de Chanson", _creative_model, 0.7, 2000),
+        ('audio', "Prompt Audio", _text_model, 0.6, 500),
+        ('titres', "Idées de Titres", _text_model, 0.7, 1024),
+    ]
+    oracle_cache = _get_oracle_cache()
+    script_run_ctx = get_script_run_ctx() # Propagé aux threads du pool (limiteur partagé, avertissements Streamlit éventuels)
+
+    def generate_item(position: int) -> list:
+        # Appels à Gemini (et lectures du cache) seulement : l'historique et l'affichage restent dans le thread du script
+        if script_run_ctx is not None:
+            add_script_run_ctx(threading.current_thread(), script_run_ctx)
+        item = batch_items[position]
+        outcomes = []
+        for step_key, type_generation, model, temperature, max_output_tokens in steps:
+            if step_key == 'titres':
+                prompt = _title_ideas_prompt(item['theme_lyrique_principal'], item['genre_musical'], outcomes[0]['text'][:500])
+            else:
+                prompt = base_prompts[position][step_key]
+            final_prompt, cache_ttl, cache_key = _prepare_request(model, prompt, type_generation, temperature, max_output_tokens, True)
+            outcome = {'step': step_key, 'type_generation': type_generation, 'final_prompt': final_prompt, 'cache_ttl': cache_ttl, 'cache_key': cache_key}
+            cached_text = oracle_cache.get(cache_key) if cache_key is not None else None
+            if cached_text is not None:
+                outcome.update({'text': cached_text, 'cached': True, 'attempts': 0, 'errors': [], 'duration_ms': 0.0})
+            else:
+                outcome.update(_request_text_with_retries(
+                    model, final_prompt, type_generation, temperature, max_output_tokens,
+                    max_retries, BATCH_BACKOFF_BASE_SECONDS, BATCH_BACKOFF_MAX_SECONDS,
+                    priority=PRIORITY_BACKGROUND # Les générations demandées une à une passent avant le lot
+                ), cached=False)
+            outcomes.append(outcome)
+            if outcome['text'] is None:
+                break # Morceau incomplet : inutile de consommer des appels pour les étapes suivantes
+        return outcomes
+
+    morceau_rows = {}
+    done = len(batch_items) - len(pending_positions)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, BATCH_MAX_CONCURRENCY, len(pending_positions))), thread_name_prefix="oracle-batch") as pool:
+        futures = {pool.submit(generate_item, position): position for position in pending_positions}
+        for future in as_completed(futures):
+            position = futures[future]
+            outcomes = future.result()
+            for outcome in outcomes:
+                if outcome['cached']:
+                    _log_gemini_interaction(outcome['type_generation'] + CACHE_HIT_SUFFIX, outcome['final_prompt'], outcome['text'])
+                elif outcome['text'] is not None:
+                    if outcome['cache_key'] is not None:
+                        oracle_cache.put(outcome['cache_key'], outcome['text'], outcome['cache_ttl'])
+                    _log_gemini_interaction(outcome['type_generation'], outcome['final_prompt'], outcome['text'])
+                else:
+                    _log_gemini_interaction(outcome['type_generation'], outcome['final_prompt'], f"ERREUR API ({outcome['attempts']} tentatives): {outcome['errors'][-1]}")
+            failed = next((outcome for outcome in outcomes if outcome['text'] is None), None)
+            report[position].update({
+                'Appels': sum(outcome['attempts'] for outcome in outcomes),
+                'Tentatives': max(outcome['attempts'] for outcome in outcomes),
+                'Duree_ms': round(sum(outcome['duration_ms'] for outcome in outcomes), 1),
+            })
+            if failed is not None:
+                report[position].update({'Statut': 'échec', 'Erreur': f"{failed['type_generation']} : {failed['errors'][-1]}"})
+            else:
+                morceau_rows[position] = _batch_morceau_row(batch_items[position], {outcome['step']: outcome['text'] for outcome in outcomes})
+                report[position].update({'Statut': 'généré', 'Titre_Morceau': morceau_rows[position]['Titre_Morceau']})
+            done += 1
+            if progress_callback is not None:
+                progress_callback(done, len(batch_items), dict(report[position]))
+
+    if save and morceau_rows:
+        saved = add_morceaux_generes([morceau_rows[position] for position in sorted(morceau_rows)]) # Une seule écriture groupée pour tout le lot
+        for position, morceau_row in morceau_rows.items():
+            report[position].update({'ID_Morceau': morceau_row['ID_Morceau'], 'Statut': 'sauvegardé' if saved else 'non sauvegardé'})
+    return pd.DataFrame(report, columns=BATCH_REPORT_COLUMNS)
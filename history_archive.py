@@ -0,0 +1,131 @@
+# history_archive.py
+
+import json
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+_MANIFEST_FILE = "manifest.json"
+_PARTITION_PATTERN = re.compile(r"^(\d{4}-\d{2})\.parquet$")
+
+class HistoryArchive:
+    """
+    Archive locale de l'historique des générations : une partition Parquet compressée par mois
+    (`AAAA-MM.parquet`, d'après la colonne de date), pour les lignes retirées de l'onglet vivant.
+    Un manifeste JSON retient la date la plus récente archivée et l'instant de la dernière rotation,
+    ce qui permet de savoir sans rien lire si une période demandée touche l'archive.
+    Sans répertoire (`directory=None`), l'archive est désactivée : rien n'est archivé ni lu.
+    """
+
+    def __init__(self, directory, date_col: str, unique_id_col: str):
+        self.directory = directory
+        self.date_col = date_col
+        self.unique_id_col = unique_id_col
+        self._lock = threading.RLock()
+        self._manifest = {}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            try:
+                with open(os.path.join(directory, _MANIFEST_FILE), encoding='utf-8') as manifest_file:
+                    self._manifest = json.load(manifest_file)
+            except (OSError, ValueError):
+                self._manifest = {} # Les partitions restent lisibles sans manifeste : on les parcourt toutes
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def _path(self, month: str) -> str:
+        return os.path.join(self.directory, f"{month}.parquet")
+
+    def _write_manifest(self):
+        manifest_path = os.path.join(self.directory, _MANIFEST_FILE)
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump(self._manifest, manifest_file)
+        os.replace(tmp_path, manifest_path)
+
+    def months(self) -> list:
+        """Mois archivés ('AAAA-MM'), du plus ancien au plus récent."""
+        if not self.directory:
+            return []
+        with self._lock:
+            return sorted(match.group(1) for match in map(_PARTITION_PATTERN.match, os.listdir(self.directory)) if match)
+
+    def archived_until(self):
+        """Date ('AAAA-MM-JJ') de la ligne archivée la plus récente, ou None si l'archive est vide."""
+        with self._lock:
+            if 'archived_until' not in self._manifest and self.months():
+                return f"{self.months()[-1]}-31" # Manifeste perdu : borne prudente, fin du dernier mois archivé
+            return self._manifest.get('archived_until')
+
+    def last_rotation_at(self):
+        """Instant (time.time) de la dernière rotation, ou None."""
+        with self._lock:
+            return self._manifest.get('last_rotation_at')
+
+    def record_rotation(self, rotated_at: float = None):
+        if not self.directory:
+            return
+        with self._lock:
+            self._manifest['last_rotation_at'] = rotated_at or time.time()
+            self._write_manifest()
+
+    def append(self, df: pd.DataFrame):
+        """
+        Ajoute des lignes datées à leurs partitions mensuelles. Une ligne déjà archivée (même identifiant)
+        est remplacée : relancer une rotation interrompue ne crée pas de doublon.
+        """
+        if not self.directory or df.empty:
+            return
+        with self._lock:
+            for month, month_df in df.groupby(df[self.date_col].astype(str).str[:7], sort=True):
+                path = self._path(month)
+                if os.path.exists(path):
+                    archived_df = pd.read_parquet(path)
+                    archived_df = archived_df[~archived_df[self.unique_id_col].isin(month_df[self.unique_id_col])]
+                    month_df = pd.concat([archived_df, month_df], ignore_index=True)
+                month_df = month_df.sort_values(self.date_col, kind='stable').reset_index(drop=True)
+                month_df.to_parquet(path + ".tmp", index=False, compression='zstd')
+                os.replace(path + ".tmp", path)
+            newest = str(df[self.date_col].max())[:10]
+            if newest > (self._manifest.get('archived_until') or ''):
+                self._manifest['archived_until'] = newest
+            self._write_manifest()
+
+    def _columns(self) -> list:
+        """Colonnes des partitions (schéma de la plus récente, sans la lire), ou l'identifiant et la date si l'archive est vide."""
+        months = self.months()
+        if not months:
+            return [self.unique_id_col, self.date_col]
+        return pq.read_schema(self._path(months[-1])).names
+
+    def read(self, start_date: str = None, end_date: str = None, columns: list = None) -> pd.DataFrame:
+        """
+        Lignes archivées dont la date est comprise entre `start_date` et `end_date` ('AAAA-MM-JJ', bornes
+        incluses, None = sans borne), de la plus ancienne à la plus récente. Seules les partitions des mois
+        concernés sont ouvertes, et seules les colonnes `columns` y sont lues si fourni.
+        Si aucun mois archivé ne correspond, retourne un DataFrame vide avec les colonnes de l'archive.
+        """
+        months = [
+            month for month in self.months()
+            if (start_date is None or month >= start_date[:7]) and (end_date is None or month <= end_date[:7])
+        ]
+        read_columns = None if columns is None else list(dict.fromkeys(list(columns) + [self.date_col]))
+        with self._lock:
+            parts = [pd.read_parquet(self._path(month), columns=read_columns) for month in months]
+            if not parts:
+                return pd.DataFrame(columns=columns if columns is not None else self._columns())
+        archived_df = pd.concat(parts, ignore_index=True)
+        dates = archived_df[self.date_col].astype(str)
+        mask = pd.Series(True, index=archived_df.index)
+        if start_date is not None:
+            mask &= dates >= start_date
+        if end_date is not None:
+            mask &= dates.str[:10] <= end_date
+        archived_df = archived_df[mask].reset_index(drop=True)
+        return archived_df[columns] if columns is not None else archived_df
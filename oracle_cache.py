@@ -0,0 +1,133 @@
+# oracle_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Suffixe ajouté au Type_Generation des lignes d'historique servies depuis le cache (ex: "Paroles de Chanson (cache)")
+CACHE_HIT_SUFFIX = " (cache)"
+
+def make_cache_key(model_name: str, final_prompt: str, temperature: float, max_output_tokens: int) -> str:
+    """Empreinte d'une requête à Gemini : deux requêtes de même empreinte peuvent recevoir la même réponse."""
+    payload = json.dumps([model_name, hashlib.sha256(final_prompt.encode('utf-8')).hexdigest(), temperature, max_output_tokens])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class OracleResponseCache:
+    """
+    Cache des réponses de l'Oracle, en deux niveaux :
+    - en mémoire, LRU borné à `max_memory_bytes` (taille des textes) ;
+    - sur disque (SQLite), conservé entre les redémarrages, borné à `max_disk_entries`.
+    Chaque réponse expire après la durée de vie donnée à son ajout. Sans chemin (`db_path=None`), seul le niveau mémoire existe.
+    Une lecture n'écrit jamais sur disque : l'instant d'utilisation est noté en mémoire et reporté sur disque
+    par lots, juste avant la purge LRU du disque (à l'ajout d'une réponse) ou au-delà de `max_disk_entries` accès en attente.
+    """
+
+    def __init__(self, max_memory_bytes: int, db_path=None, max_disk_entries: int = 5000):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_entries = max_disk_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # clé -> (expire_le, texte, taille), de la moins à la plus récemment utilisée
+        self._memory_bytes = 0
+        self._pending_uses = {} # clé -> dernier instant d'utilisation pas encore reporté sur disque
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._conn = None
+        if db_path:
+            db_dir = os.path.dirname(db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS reponses (cle TEXT PRIMARY KEY, expire_le REAL, utilise_le REAL, texte TEXT)")
+            self._conn.commit()
+
+    def _remember(self, key: str, expires_at: float, text: str):
+        """Place une réponse en tête du niveau mémoire, en évinçant les moins récemment utilisées au-delà du plafond."""
+        size = len(text.encode('utf-8'))
+        if key in self._entries:
+            self._memory_bytes -= self._entries.pop(key)[2]
+        if size > self.max_memory_bytes:
+            return # Plus grande que tout le cache : disque uniquement
+        self._entries[key] = (expires_at, text, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            self._memory_bytes -= self._entries.popitem(last=False)[1][2]
+
+    def _record_use(self, key: str, now: float):
+        """Note l'utilisation d'une réponse (sans écriture disque), pour que la purge LRU du disque l'épargne."""
+        if self._conn is not None:
+            self._pending_uses[key] = now
+            if len(self._pending_uses) >= self.max_disk_entries:
+                self._write_pending_uses()
+
+    def _write_pending_uses(self):
+        """Reporte sur disque, en une transaction, les instants d'utilisation notés en mémoire."""
+        if self._conn is not None and self._pending_uses:
+            with self._conn:
+                self._conn.executemany("UPDATE reponses SET utilise_le = ? WHERE cle = ?", [(used_at, key) for key, used_at in self._pending_uses.items()])
+            self._pending_uses.clear()
+
+    def get(self, key: str):
+        """Texte de la réponse en cache et non expirée, ou None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._record_use(key, now)
+                    self._hits += 1
+                    return entry[1]
+                self._memory_bytes -= self._entries.pop(key)[2]
+            if self._conn is not None:
+                row = self._conn.execute("SELECT expire_le, texte FROM reponses WHERE cle = ?", (key,)).fetchone()
+                if row is not None and row[0] > now:
+                    self._record_use(key, now)
+                    self._remember(key, row[0], row[1])
+                    self._hits += 1
+                    self._disk_hits += 1
+                    return row[1]
+            self._misses += 1
+            return None
+
+    def put(self, key: str, text: str, ttl_seconds: float):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now + ttl_seconds, text)
+            if self._conn is not None:
+                self._pending_uses.pop(key, None)
+                self._write_pending_uses() # La purge ci-dessous doit voir les utilisations récentes
+                with self._conn:
+                    self._conn.execute("INSERT OR REPLACE INTO reponses (cle, expire_le, utilise_le, texte) VALUES (?, ?, ?, ?)", (key, now + ttl_seconds, now, text))
+                    # Purge : réponses expirées, puis les moins récemment utilisées au-delà du plafond
+                    self._conn.execute("DELETE FROM reponses WHERE expire_le <= ?", (now,))
+                    self._conn.execute(
+                        "DELETE FROM reponses WHERE cle IN (SELECT cle FROM reponses ORDER BY utilise_le DESC LIMIT -1 OFFSET ?)",
+                        (self.max_disk_entries,)
+                    )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+            self._pending_uses.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM reponses")
+
+    def stats(self) -> dict:
+        with self._lock:
+            disk_entries = self._conn.execute("SELECT COUNT(*) FROM reponses").fetchone()[0] if self._conn is not None else None
+            return {
+                'Hits': self._hits,
+                'Hits_Disque': self._disk_hits,
+                'Misses': self._misses,
+                'Reponses_En_Memoire': len(self._entries),
+                'Memoire_Ko': round(self._memory_bytes / 1024, 1),
+                'Reponses_Sur_Disque': disk_entries,
+            }
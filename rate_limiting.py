@@ -0,0 +1,297 @@
+# rate_limiting.py
+
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Priorités d'accès au quota : les actions de l'utilisateur passent avant les tâches d'arrière-plan
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+class TokenBucket:
+    """
+    Seau à jetons partagé entre threads : au plus `capacity` jetons, rechargés de `refill_per_second` par seconde.
+    Les demandes d'arrière-plan ne peuvent pas consommer les `interactive_reserve` derniers jetons
+    et attendent tant qu'une demande interactive est en cours.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float, interactive_reserve: float = 0):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.interactive_reserve = max(0.0, min(float(interactive_reserve), self.capacity - 1))
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._interactive_waiting = 0
+        self._condition = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.refill_per_second)
+        self._last_refill = now
+
+    def acquire(self, tokens: float = 1, priority: int = PRIORITY_INTERACTIVE, timeout: float = None) -> bool:
+        """Prend `tokens` jetons, en attendant si nécessaire. Retourne False si `timeout` expire avant."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interactive = priority == PRIORITY_INTERACTIVE
+        floor = 0.0 if interactive else self.interactive_reserve
+        tokens = min(float(tokens), self.capacity - floor) # Une demande plus grosse que le seau attend qu'il soit plein
+        with self._condition:
+            if interactive:
+                self._interactive_waiting += 1
+            try:
+                while True:
+                    self._refill()
+                    yields_to_interactive = not interactive and self._interactive_waiting > 0
+                    if not yields_to_interactive and self._tokens - tokens >= floor:
+                        self._tokens -= tokens
+                        return True
+                    # Attente jusqu'au prochain jeton utile, ou jusqu'à la fin des demandes interactives
+                    wait = None if yields_to_interactive else (tokens + floor - self._tokens) / self.refill_per_second
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._condition.wait(wait)
+            finally:
+                if interactive:
+                    self._interactive_waiting -= 1
+                    self._condition.notify_all()
+
+    def drain(self):
+        """Vide le seau (ex: après une erreur de quota côté serveur) pour ralentir tous les appelants."""
+        with self._condition:
+            self._refill()
+            self._tokens = 0.0
+
+    def refund(self, tokens: float):
+        """Rend des jetons pris en trop (ex: consommation estimée supérieure à la consommation réelle)."""
+        with self._condition:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + float(tokens))
+            self._condition.notify_all()
+
+    def remaining(self) -> int:
+        """Nombre de jetons disponibles immédiatement."""
+        with self._condition:
+            self._refill()
+            return int(self._tokens)
+
+class ConcurrencyLimit:
+    """
+    Au plus `capacity` appels simultanés. Les appels d'arrière-plan ne peuvent pas occuper les
+    `interactive_reserve` dernières places et attendent tant qu'un appel interactif attend une place.
+    """
+
+    def __init__(self, capacity: int, interactive_reserve: int = 0):
+        self.capacity = capacity
+        self.interactive_reserve = max(0, min(interactive_reserve, capacity - 1))
+        self._active = 0
+        self._interactive_waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, priority: int = PRIORITY_INTERACTIVE):
+        interactive = priority == PRIORITY_INTERACTIVE
+        limit = self.capacity if interactive else self.capacity - self.interactive_reserve
+        with self._condition:
+            if interactive:
+                self._interactive_waiting += 1
+            try:
+                while self._active >= limit or (not interactive and self._interactive_waiting > 0):
+                    self._condition.wait()
+                self._active += 1
+            finally:
+                if interactive:
+                    self._interactive_waiting -= 1
+                    self._condition.notify_all()
+
+    def release(self):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Délai avant la nouvelle tentative n° `attempt` (0-indexée) : backoff exponentiel avec gigue complète."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+class RateLimiter:
+    """
+    Fait passer des appels d'API par un TokenBucket et rejoue, avec backoff exponentiel et gigue,
+    ceux qui échouent sur une erreur transitoire (`is_retryable`). Une erreur de quota (`is_throttled`)
+    vide aussi le seau pour que les autres appelants ralentissent.
+    Un appel non idempotent (ajout, suppression de lignes) n'est rejoué que sur une erreur de quota, refusée
+    avant d'être appliquée : une erreur serveur peut arriver après l'écriture, la rejouer la ferait deux fois.
+    """
+
+    def __init__(self, bucket: TokenBucket, is_retryable, max_retries: int, base_delay: float, max_delay: float, is_throttled=None):
+        self.bucket = bucket
+        self.is_retryable = is_retryable
+        self.is_throttled = is_throttled or (lambda exc: False)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_count = 0
+        self._lock = threading.Lock()
+
+    def call(self, func, *args, priority: int = PRIORITY_INTERACTIVE, tokens: float = 1, idempotent: bool = True, **kwargs):
+        """
+        Exécute `func(*args, **kwargs)` dans la limite du quota. L'erreur est relevée une fois les essais épuisés.
+        Avec `idempotent=False`, seules les erreurs de quota (`is_throttled`) sont rejouées.
+        """
+        attempt = 0
+        while True:
+            self.bucket.acquire(tokens, priority)
+            try:
+                return func(*args, **kwargs)
+            except Exception as exc:
+                retryable = self.is_retryable(exc) if idempotent else self.is_throttled(exc)
+                if attempt >= self.max_retries or not retryable:
+                    raise
+                if self.is_throttled(exc):
+                    self.bucket.drain()
+                delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+                with self._lock:
+                    self.retry_count += 1
+                logger.warning("Appel %s en échec (%s), nouvel essai %d/%d dans %.1fs", getattr(func, '__name__', func), exc, attempt + 1, self.max_retries, delay)
+                time.sleep(delay)
+                attempt += 1
+
+    def remaining_budget(self) -> int:
+        """Nombre d'appels possibles immédiatement sans attendre."""
+        return self.bucket.remaining()
+
+class ModelRateLimiter:
+    """
+    Limiteur partagé des appels à un modèle d'IA : un seau de requêtes par minute, un seau de tokens par minute
+    (consommation estimée avant l'appel, l'excédent étant rendu une fois l'usage réel connu) et, par modèle,
+    une ConcurrencyLimit qui borne les appels simultanés en gardant `interactive_concurrency_reserve` places
+    aux appels interactifs. Les quotas sont pris avant la place : un appel d'arrière-plan qui attend le quota
+    n'empêche pas un appel interactif de passer. Les erreurs transitoires (`is_retryable`) sont rejouées avec
+    backoff exponentiel et gigue ; une erreur de quota (`is_throttled`) vide aussi le seau des requêtes.
+    Tient, par catégorie d'appel (ex: type de génération), l'attente en file et le nombre de nouvelles tentatives.
+    """
+
+    def __init__(self, requests_bucket: TokenBucket, tokens_bucket: TokenBucket, max_concurrent_per_model: int,
+                 is_retryable, max_retries: int, base_delay: float, max_delay: float, is_throttled=None,
+                 interactive_concurrency_reserve: int = 0):
+        self.requests_bucket = requests_bucket
+        self.tokens_bucket = tokens_bucket
+        self.max_concurrent_per_model = max_concurrent_per_model
+        self.interactive_concurrency_reserve = interactive_concurrency_reserve
+        self.is_retryable = is_retryable
+        self.is_throttled = is_throttled or (lambda exc: False)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._slots = {} # modèle -> ConcurrencyLimit
+        self._stats = {} # catégorie -> compteurs
+
+    def _model_slots(self, model_name: str) -> ConcurrencyLimit:
+        with self._lock:
+            if model_name not in self._slots:
+                self._slots[model_name] = ConcurrencyLimit(self.max_concurrent_per_model, self.interactive_concurrency_reserve)
+            return self._slots[model_name]
+
+    def _record(self, category: str, wait_seconds: float = None, retried: bool = False, failed: bool = False):
+        with self._lock:
+            stats = self._stats.setdefault(category, {'calls': 0, 'wait_total': 0.0, 'wait_max': 0.0, 'retries': 0, 'failures': 0})
+            if wait_seconds is not None:
+                stats['calls'] += 1
+                stats['wait_total'] += wait_seconds
+                stats['wait_max'] = max(stats['wait_max'], wait_seconds)
+            stats['retries'] += int(retried)
+            stats['failures'] += int(failed)
+
+    def _acquire(self, slots: ConcurrencyLimit, category: str, estimated_tokens: float, priority: int):
+        """Quotas puis place d'appel simultané ; l'attente totale est comptée pour la catégorie."""
+        wait_start = time.monotonic()
+        self.requests_bucket.acquire(1, priority)
+        if estimated_tokens:
+            self.tokens_bucket.acquire(estimated_tokens, priority)
+        slots.acquire(priority)
+        self._record(category, wait_seconds=time.monotonic() - wait_start)
+
+    def _wait_before_retry(self, model_name: str, category: str, attempt: int):
+        delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+        self._record(category, retried=True)
+        logger.warning("Appel au modèle %s (%s) en échec, nouvel essai %d/%d dans %.1fs", model_name, category, attempt + 1, self.max_retries, delay)
+        time.sleep(delay)
+
+    def call(self, model_name: str, category: str, func, *args, estimated_tokens: float = 0, token_usage=None,
+             priority: int = PRIORITY_INTERACTIVE, **kwargs):
+        """
+        Exécute `func(*args, **kwargs)` dans la limite des appels simultanés de `model_name` et des quotas.
+        `estimated_tokens` est pris au seau des tokens avant l'appel ; `token_usage(résultat)` peut donner la
+        consommation réelle (ou None) pour rendre l'excédent. L'erreur est relevée une fois les essais épuisés.
+        """
+        slots = self._model_slots(model_name)
+        attempt = 0
+        while True:
+            self._acquire(slots, category, estimated_tokens, priority)
+            try:
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as exc:
+                    if self.is_throttled(exc):
+                        self.requests_bucket.drain()
+                    if attempt >= self.max_retries or not self.is_retryable(exc):
+                        self._record(category, failed=True)
+                        raise
+                else:
+                    actual_tokens = token_usage(result) if token_usage is not None else None
+                    if actual_tokens is not None and actual_tokens < estimated_tokens:
+                        self.tokens_bucket.refund(estimated_tokens - actual_tokens)
+                    return result
+            finally:
+                slots.release() # Pas de place occupée pendant l'attente avant la nouvelle tentative
+            self._wait_before_retry(model_name, category, attempt)
+            attempt += 1
+
+    def stream(self, model_name: str, category: str, func, *args, estimated_tokens: float = 0,
+               priority: int = PRIORITY_INTERACTIVE, **kwargs):
+        """
+        Variante en flux de call : générateur des morceaux de l'itérable `func(*args, **kwargs)`. La place d'appel
+        simultané est gardée jusqu'à la fin de l'itération (ou l'abandon du générateur). Une erreur avant le premier
+        morceau est rejouée comme dans call ; après, le texte déjà rendu ne peut pas être repris : le flux compte
+        pour un échec et l'erreur est relevée.
+        """
+        slots = self._model_slots(model_name)
+        attempt = 0
+        while True:
+            self._acquire(slots, category, estimated_tokens, priority)
+            started = False
+            try:
+                try:
+                    for chunk in func(*args, **kwargs):
+                        started = True
+                        yield chunk
+                    return
+                except Exception as exc:
+                    if self.is_throttled(exc):
+                        self.requests_bucket.drain()
+                    if started or attempt >= self.max_retries or not self.is_retryable(exc):
+                        self._record(category, failed=True)
+                        raise
+            finally:
+                slots.release()
+            self._wait_before_retry(model_name, category, attempt)
+            attempt += 1
+
+    def stats(self) -> list:
+        """Par catégorie : appels (nouvelles tentatives comprises), attente moyenne et maximale en file, nouvelles tentatives, échecs."""
+        with self._lock:
+            return [
+                {
+                    'Categorie': category,
+                    'Appels': stats['calls'],
+                    'Attente_Moyenne_ms': round(stats['wait_total'] / stats['calls'] * 1000, 1) if stats['calls'] else 0.0,
+                    'Attente_Max_ms': round(stats['wait_max'] * 1000, 1),
+                    'Nouvelles_Tentatives': stats['retries'],
+                    'Echecs': stats['failures'],
+                }
+                for category, stats in sorted(self._stats.items())
+            ]
@@ -0,0 +1,56 @@
+# reference_data.py
+
+import threading
+
+import pandas as pd
+
+class ReferenceTable:
+    """
+    Une bibliothèque de référence (moods, thèmes, styles...) indexée par identifiant : accès en O(1)
+    à la ligne complète, avec les types de get_dataframe_from_sheet. Construite une fois par version
+    de l'onglet et partagée par toutes les fonctions de l'Oracle ; ne pas modifier les enregistrements.
+    Un identifiant présent plusieurs fois est résolu vers sa première ligne, comme `df[...].iloc[0]`.
+    """
+
+    def __init__(self, sheet_name: str, df: pd.DataFrame, id_col: str):
+        self.sheet_name = sheet_name
+        self.id_col = id_col
+        self.columns = list(df.columns)
+        self._records = df.to_dict('records')
+        self._lock = threading.Lock()
+        self._indexes = {} # colonne -> {valeur: enregistrement}
+        self._by_id = self._index(id_col)
+
+    def _index(self, column: str) -> dict:
+        with self._lock:
+            if column not in self._indexes:
+                index = {}
+                if column in self.columns:
+                    for record in self._records:
+                        index.setdefault(record[column], record)
+                self._indexes[column] = index
+            return self._indexes[column]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, record_id) -> bool:
+        return record_id in self._by_id
+
+    def get(self, record_id):
+        """Ligne de l'identifiant, sous forme de dictionnaire {colonne: valeur}, ou None."""
+        record = self._by_id.get(record_id) if record_id else None
+        return dict(record) if record is not None else None
+
+    def field(self, record_id, column: str, default=None):
+        """
+        Valeur de `column` pour l'identifiant, ou `default` s'il est vide, inconnu ou si la colonne manque.
+        Ex: moods.field(mood_id, 'Description_Nuance', default=mood_id).
+        """
+        record = self._by_id.get(record_id) if record_id else None
+        return record[column] if record is not None and column in record else default
+
+    def find(self, column: str, value):
+        """Première ligne dont `column` vaut `value` (index construit au premier appel pour cette colonne), ou None."""
+        record = self._index(column).get(value) if value else None
+        return dict(record) if record is not None else None
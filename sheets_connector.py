@@ -3,148 +3,1265 @@
 import streamlit as st
 import gspread
 import pandas as pd
-from config import SHEET_NAME, WORKSHEET_NAMES, EXPECTED_COLUMNS
-from datetime import datetime
-from utils import generate_unique_id, parse_boolean_string, safe_cast_to_int, safe_cast_to_float
-import base64
-import json # Nécessaire pour décoder le JSON de la clé
+import numpy as np
+from config import (
+    SHEET_NAME, WORKSHEET_NAMES, EXPECTED_COLUMNS, SHEETS_CACHE_TTL_SECONDS,
+    TAB_REFRESH_INTERVALS_SECONDS, TAB_REFRESH_LEAD_SECONDS, TAB_REFRESH_CHECK_INTERVAL_SECONDS, PREFETCH_MAX_WORKERS,
+    TAB_MAX_STALENESS_FACTOR, TAB_REFRESH_INITIAL_SYNC_DELAY_SECONDS,
+    TAIL_READ_TABS, TAIL_WINDOW_ROWS, HISTORY_HOT_WINDOW_DAYS, HISTORY_ROTATION_INTERVAL_SECONDS, HISTORY_ARCHIVE_DIR,
+    HISTORY_ROTATION_ENABLED,
+    WRITE_BEHIND_TABS, WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_FLUSH_INTERVAL_SECONDS, WRITE_BEHIND_MAX_QUEUE_SIZE,
+    SHEETS_APPEND_CHUNK_SIZE, COLUMN_TYPES, DATE_INPUT_FORMATS, SHEETS_QUOTA_INTERACTIVE_RESERVE,
+    STORAGE_BACKEND, SQLITE_REPLICA_PATH, SQLITE_REPLICA_SYNC_INTERVAL_SECONDS
+)
+from rate_limiting import PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from sqlite_replica import SheetsReplica, hash_tab_values
+from history_archive import HistoryArchive
+from catalogue_view import CATALOGUE_SOURCE_TABS, build_catalogue_view
+from reference_data import ReferenceTable
+from storage_backends import StorageBackend, TabNotFoundError, create_storage_backend, get_gspread_client
+from datetime import datetime, timedelta
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import atexit
+import logging
+import queue
+import threading
+import time
+from utils import generate_unique_id, coerce_dataframe_types
+
+logger = logging.getLogger(__name__) # Pour les erreurs des threads d'arrière-plan, sans contexte Streamlit
+
+# --- Stockage des onglets (Google Sheets, SQLite ou mémoire, selon config.STORAGE_BACKEND) ---
+
+@st.cache_resource # Un seul stockage par processus ; l'authentification Google n'a lieu qu'au premier appel
+def _get_storage_backend() -> StorageBackend:
+    return create_storage_backend(STORAGE_BACKEND)
+
+def get_sheets_quota_remaining():
+    """
+    Nombre de requêtes possibles immédiatement, pour différer un travail non urgent si le budget est bas.
+    None si le stockage n'a pas de quota (stockages locaux).
+    """
+    return _get_storage_backend().remaining_budget()
+
+# --- Cache des onglets, versionné par onglet ---
+
+class _TabCache:
+    """
+    Cache des DataFrames lus, avec un emplacement et un numéro de version par onglet.
+    Une écriture n'invalide que l'onglet modifié : les onglets de référence restent en cache.
+    Une entrée dont l'intervalle de fraîcheur est dépassé reste servie (stale-while-revalidate)
+    jusqu'à ce que _TabRefresher la remplace, mais jamais au-delà de `max_staleness_factor` intervalles :
+    elle compte alors comme absente. Compte les hits/misses par onglet pour le diagnostic.
+    """
+
+    def __init__(self, ttl_by_tab: dict, default_ttl_seconds: int, max_staleness_factor: float):
+        self.ttl_by_tab = ttl_by_tab
+        self.default_ttl_seconds = default_ttl_seconds
+        self.max_staleness_factor = max_staleness_factor
+        self._lock = threading.RLock()
+        self._entries = {} # onglet -> (version, instant de lecture, DataFrame)
+        self._projections = {} # (onglet, colonnes) -> (version, instant de lecture, DataFrame)
+        self._versions = defaultdict(int)
+        self._generations = defaultdict(int) # Changé à chaque nouveau contenu (lecture différente ou écriture)
+        self._hits = defaultdict(int)
+        self._stale_hits = defaultdict(int)
+        self._misses = defaultdict(int)
+
+    def ttl(self, sheet_name: str) -> int:
+        return self.ttl_by_tab.get(sheet_name, self.default_ttl_seconds)
+
+    def max_staleness(self, sheet_name: str) -> float:
+        """Âge au-delà duquel une copie de l'onglet n'est plus servie."""
+        return self.ttl(sheet_name) * self.max_staleness_factor
+
+    def _servable(self, sheet_name: str, entry, now: float) -> bool:
+        return entry is not None and entry[0] == self._versions[sheet_name] and now - entry[1] < self.max_staleness(sheet_name)
+
+    def version(self, sheet_name: str) -> int:
+        with self._lock:
+            return self._versions[sheet_name]
+
+    def current_entries(self, sheet_names: list) -> tuple:
+        """
+        DataFrames en cache à jour (None si absent) et générations des onglets, lus ensemble sous le verrou :
+        les générations décrivent exactement ces DataFrames. Pas de copie, ni de comptage des hits.
+        """
+        now = time.monotonic()
+        with self._lock:
+            dfs = {}
+            for sheet_name in sheet_names:
+                entry = self._entries.get(sheet_name)
+                dfs[sheet_name] = entry[2] if self._servable(sheet_name, entry, now) else None
+            return dfs, tuple(self._generations[sheet_name] for sheet_name in sheet_names)
+
+    def get(self, sheet_name: str):
+        """
+        Retourne le DataFrame en cache s'il correspond à la version courante de l'onglet, sinon None.
+        Une entrée expirée est quand même retournée (et comptée comme lecture périmée), jusqu'à la limite absolue.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(sheet_name)
+            if self._servable(sheet_name, entry, now):
+                version, fetched_at, df = entry
+                if now - fetched_at < self.ttl(sheet_name):
+                    self._hits[sheet_name] += 1
+                else:
+                    self._stale_hits[sheet_name] += 1
+                return df
+            self._misses[sheet_name] += 1
+            return None
+
+    def is_expired(self, sheet_name: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(sheet_name)
+            return entry is not None and time.monotonic() - entry[1] >= self.ttl(sheet_name)
+
+    def age(self, sheet_name: str):
+        """Secondes écoulées depuis la lecture de l'entrée en cache, ou None."""
+        with self._lock:
+            entry = self._entries.get(sheet_name)
+            return time.monotonic() - entry[1] if entry is not None else None
+
+    def due_for_refresh(self, lead_seconds: float) -> list:
+        """Onglets en cache dont l'intervalle de fraîcheur se termine dans moins de `lead_seconds`."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                sheet_name for sheet_name, (version, fetched_at, _) in self._entries.items()
+                if version == self._versions[sheet_name] and now - fetched_at >= self.ttl(sheet_name) - lead_seconds
+            ]
+
+    def put(self, sheet_name: str, df: pd.DataFrame, version: int, age_seconds: float = 0.0):
+        """
+        Stocke un DataFrame lu alors que l'onglet était à la version `version` (remplacement atomique de l'entrée),
+        il y a `age_seconds` secondes (ex: copie du réplica). Ignoré si une écriture a invalidé l'onglet pendant la lecture.
+        """
+        with self._lock:
+            if version == self._versions[sheet_name]:
+                self._entries[sheet_name] = (version, time.monotonic() - age_seconds, df)
+                self._generations[sheet_name] += 1
+
+    def get_projection(self, sheet_name: str, columns: list):
+        """DataFrame limité à `columns`, s'il est en cache, à jour et non expiré ; sinon None."""
+        with self._lock:
+            entry = self._projections.get((sheet_name, tuple(columns)))
+            if entry is not None:
+                version, fetched_at, df = entry
+                if version == self._versions[sheet_name] and time.monotonic() - fetched_at < self.ttl(sheet_name):
+                    return df
+            return None
+
+    def put_projection(self, sheet_name: str, columns: list, df: pd.DataFrame, version: int):
+        with self._lock:
+            if version == self._versions[sheet_name]:
+                self._projections[(sheet_name, tuple(columns))] = (version, time.monotonic(), df)
+
+    def touch(self, sheet_name: str, version: int):
+        """Relecture identique au contenu en cache : l'entrée repart pour un intervalle complet."""
+        with self._lock:
+            entry = self._entries.get(sheet_name)
+            if entry is not None and entry[0] == version == self._versions[sheet_name]:
+                self._entries[sheet_name] = (version, time.monotonic(), entry[2])
+
+    def invalidate(self, sheet_name: str):
+        with self._lock:
+            self._versions[sheet_name] += 1
+            self._generations[sheet_name] += 1
+            self._entries.pop(sheet_name, None)
+            for key in [key for key in self._projections if key[0] == sheet_name]:
+                del self._projections[key]
+
+    def stats(self) -> pd.DataFrame:
+        with self._lock:
+            now = time.monotonic()
+            rows = []
+            for sheet_name in WORKSHEET_NAMES:
+                hits, stale_hits, misses = self._hits[sheet_name], self._stale_hits[sheet_name], self._misses[sheet_name]
+                entry = self._entries.get(sheet_name)
+                rows.append({
+                    'Onglet': sheet_name,
+                    'Version': self._versions[sheet_name],
+                    'En_Cache': entry is not None,
+                    'Age_Cache_s': round(now - entry[1]) if entry is not None else None,
+                    'Intervalle_s': self.ttl(sheet_name),
+                    'Hits': hits,
+                    'Hits_Perimes': stale_hits,
+                    'Misses': misses,
+                    'Taux_Hit': round((hits + stale_hits) / (hits + stale_hits + misses), 3) if hits + stale_hits + misses else 0.0
+                })
+            return pd.DataFrame(rows)
+
+@st.cache_resource # Un seul cache partagé par toutes les sessions du processus, conservé entre les reruns
+def _get_tab_cache() -> _TabCache:
+    return _TabCache(TAB_REFRESH_INTERVALS_SECONDS, default_ttl_seconds=SHEETS_CACHE_TTL_SECONDS, max_staleness_factor=TAB_MAX_STALENESS_FACTOR)
+
+def invalidate_tab_cache(sheet_name: str):
+    """Invalide le cache d'un seul onglet (à appeler après toute écriture dans cet onglet)."""
+    _get_tab_cache().invalidate(sheet_name)
+
+def get_cache_stats() -> pd.DataFrame:
+    """Retourne, pour chaque onglet, sa version de cache, ses compteurs de hits/misses et l'âge de sa copie dans le réplica."""
+    stats_df = _get_tab_cache().stats()
+    replica = _get_sheets_replica()
+    now = time.time()
+    replica_ages = []
+    for sheet_name in stats_df['Onglet']:
+        synced_at = replica.synced_at(sheet_name)
+        replica_ages.append(round(now - synced_at) if synced_at else None)
+    stats_df['Age_Replica_s'] = replica_ages
+    return stats_df
+
+# --- Registre des en-têtes d'onglets ---
+
+class _HeaderRegistry:
+    """
+    Conserve la ligne d'en-têtes de chaque onglet. Les en-têtes sont alimentés gratuitement par les
+    lectures complètes et ne sont relus depuis le stockage que lorsqu'une incohérence est détectée
+    (colonne introuvable, onglet renommé...).
+    """
+
+    def __init__(self, backend: StorageBackend):
+        self._backend = backend
+        self._lock = threading.RLock()
+        self._headers = {}
+
+    def headers(self, sheet_name: str) -> list:
+        with self._lock:
+            if sheet_name not in self._headers:
+                self._headers[sheet_name] = self._backend.read_headers(sheet_name)
+            return self._headers[sheet_name]
+
+    def observe_headers(self, sheet_name: str, headers: list):
+        """Enregistre les en-têtes vus lors d'une lecture complète de l'onglet (aucun appel réseau)."""
+        with self._lock:
+            self._headers[sheet_name] = list(headers)
+
+    def refresh(self, sheet_name: str) -> list:
+        """Oublie les en-têtes (et les handles du stockage) d'un onglet puis relit les en-têtes."""
+        with self._lock:
+            self._backend.forget(sheet_name)
+            self._headers.pop(sheet_name, None)
+            return self.headers(sheet_name)
+
+    def reset(self):
+        """Oublie tous les en-têtes et handles (ex: Spreadsheet introuvable, partage révoqué)."""
+        with self._lock:
+            self._backend.reset()
+            self._headers.clear()
+
+@st.cache_resource # En-têtes partagés par toutes les sessions, conservés entre les reruns
+def _get_header_registry() -> _HeaderRegistry:
+    return _HeaderRegistry(_get_storage_backend())
+
+def _get_column_position(sheet_name: str, column_name: str):
+    """
+    Retourne la position (0-indexée) d'une colonne d'après les en-têtes en cache.
+    Si la colonne est absente, les en-têtes sont relus une fois avant de conclure (None).
+    """
+    registry = _get_header_registry()
+    headers = registry.headers(sheet_name)
+    if column_name not in headers:
+        headers = registry.refresh(sheet_name)
+    return headers.index(column_name) if column_name in headers else None
+
+# --- Index clé primaire -> numéro de ligne ---
+
+class _RowIndex:
+    """
+    Copie locale des lignes brutes d'un onglet (sans l'en-tête), indexée par valeur d'identifiant.
+    Construite à partir de la dernière lecture de l'onglet, puis tenue à jour localement lors des
+    ajouts, mises à jour et suppressions : retrouver une ligne ne nécessite aucun appel réseau.
+    """
+
+    def __init__(self, headers: list, rows: list):
+        self.headers = list(headers)
+        self.rows = [list(row) for row in rows]
+        self._positions = {} # colonne -> {valeur: position dans self.rows}, construit à la demande
+
+    def _position_map(self, column_name: str) -> dict:
+        if column_name not in self._positions:
+            col_position = self.headers.index(column_name)
+            mapping = {}
+            for position, row in enumerate(self.rows):
+                if col_position < len(row) and row[col_position] != '':
+                    mapping.setdefault(row[col_position], position) # Première occurrence, comme worksheet.find
+            self._positions[column_name] = mapping
+        return self._positions[column_name]
+
+    def row_number(self, column_name: str, value: str):
+        """Numéro de ligne (1-indexé, en-tête compris) de la valeur, ou None si inconnue."""
+        if column_name not in self.headers:
+            return None
+        position = self._position_map(column_name).get(str(value))
+        return position + 2 if position is not None else None
+
+    def row_values(self, row_number: int) -> list:
+        return self.rows[row_number - 2]
+
+    def record_append(self, row_number: int, values: list):
+        position = row_number - 2
+        if position >= len(self.rows):
+            # Des lignes vides peuvent séparer la fin des données de la ligne ajoutée
+            self.rows.extend([[''] * len(self.headers) for _ in range(position - len(self.rows))])
+            self.rows.append(list(values))
+            for column_name, mapping in self._positions.items():
+                value = values[self.headers.index(column_name)]
+                if value != '':
+                    mapping.setdefault(value, position)
+        else:
+            self.rows.insert(position, list(values))
+            self._positions.clear() # Les lignes suivantes ont été décalées
+
+    def record_cells(self, row_number: int, changed_cells: dict):
+        """Applique des cellules modifiées {position de colonne: valeur} à une ligne."""
+        row = self.rows[row_number - 2]
+        row.extend([''] * (len(self.headers) - len(row)))
+        for col_position, value in changed_cells.items():
+            row[col_position] = value
+            # Seule la table de la colonne modifiée devient fausse
+            self._positions.pop(self.headers[col_position], None)
+
+    def record_delete(self, row_number: int):
+        del self.rows[row_number - 2]
+        self._positions.clear() # Les lignes suivantes remontent d'un rang
+
+class _RowIndexRegistry:
+    """Un _RowIndex par onglet, remplacé à chaque lecture complète de l'onglet."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._indexes = {}
+
+    def observe(self, sheet_name: str, data: list):
+        with self._lock:
+            if data:
+                self._indexes[sheet_name] = _RowIndex(data[0], data[1:])
+            else:
+                self._indexes.pop(sheet_name, None)
+
+    def get(self, sheet_name: str):
+        with self._lock:
+            return self._indexes.get(sheet_name)
+
+    def lock(self):
+        return self._lock
+
+@st.cache_resource # Index partagés par toutes les sessions, conservés entre les reruns
+def _get_row_index_registry() -> _RowIndexRegistry:
+    return _RowIndexRegistry()
+
+def _observe_tab_values(sheet_name: str, data: list):
+    """Propage les valeurs brutes d'une lecture complète aux en-têtes en cache et à l'index des lignes."""
+    if data:
+        _get_header_registry().observe_headers(sheet_name, data[0])
+    _get_row_index_registry().observe(sheet_name, data)
+
+def _find_row_number(sheet_name: str, unique_id_col: str, unique_id_value: str):
+    """
+    Retrouve le numéro de ligne d'un identifiant via l'index local.
+    L'onglet n'est relu que si l'index est absent ou ne connaît pas l'identifiant
+    (ligne ajoutée par ailleurs, cache expiré...). Retourne None si l'identifiant reste introuvable.
+    """
+    _flush_pending_writes(sheet_name) # La ligne cherchée peut encore attendre dans la file d'écriture
+    index_registry = _get_row_index_registry()
+    with index_registry.lock():
+        index = index_registry.get(sheet_name)
+        row_number = index.row_number(unique_id_col, unique_id_value) if index is not None else None
+    if row_number is not None:
+        return row_number
+    invalidate_tab_cache(sheet_name)
+    _load_tab_from_storage(sheet_name) # Relecture complète depuis le stockage : reconstruit l'index
+    with index_registry.lock():
+        index = index_registry.get(sheet_name)
+        return index.row_number(unique_id_col, unique_id_value) if index is not None else None
+
+# --- Réplica SQLite local ---
+
+@st.cache_resource # Un seul réplica par processus
+def _get_sheets_replica() -> SheetsReplica:
+    return SheetsReplica(SQLITE_REPLICA_PATH)
+
+def _refresh_tabs(sheet_names: list, priority: int = PRIORITY_BACKGROUND) -> int:
+    """
+    Relit les onglets demandés en une seule lecture groupée et remplace d'un bloc leur entrée de cache,
+    leur copie dans le réplica et leur index. Un onglet modifié pendant la lecture
+    est ignoré jusqu'au prochain passage. Retourne le nombre d'onglets relus.
+    """
+    cache = _get_tab_cache()
+    replica = _get_sheets_replica()
+    versions = {name: cache.version(name) for name in sheet_names}
+    tab_values = _get_storage_backend().read_tabs(sheet_names, priority=priority)
+
+    refreshed = 0
+    index_registry = _get_row_index_registry()
+    for name, data in tab_values.items():
+        content_hash = hash_tab_values(data)
+        # Contenu identique à la dernière synchronisation : ni conversion ni réécriture du réplica
+        unchanged = content_hash == replica.content_hash(name)
+        df = None if unchanged else _coerce_dataframe(name, data)
+        with index_registry.lock():
+            if cache.version(name) != versions[name]:
+                continue # Écriture pendant la lecture : ces valeurs sont déjà dépassées
+            _observe_tab_values(name, data)
+            if unchanged:
+                replica.touch(name)
+                cache.touch(name, versions[name])
+            else:
+                replica.replace_tab(name, df, content_hash)
+                cache.put(name, df, versions[name])
+        refreshed += 1
+    return refreshed
+
+class _TabRefresher:
+    """
+    Thread d'arrière-plan qui relit les onglets en cache peu avant la fin de leur intervalle de fraîcheur
+    (config.TAB_REFRESH_INTERVALS_SECONDS), et tous les autres onglets à chaque synchronisation complète du
+    réplica, après laquelle l'historique est archivé si la rotation est due. Les onglets lus par la fin
+    (TAIL_READ_TABS) ne sont jamais relus en entier, même s'ils ont été mis en cache complets : seule leur
+    fenêtre de fin, si elle existe, est mise à jour par _sync_tail_window.
+    La première synchronisation complète n'a lieu que `initial_sync_delay_seconds` après le démarrage.
+    Les lecteurs gardent l'ancienne entrée jusqu'au remplacement et n'attendent jamais la relecture.
+    """
+
+    def __init__(self, check_interval_seconds: float, lead_seconds: float, full_sync_interval_seconds: float, initial_sync_delay_seconds: float):
+        self.check_interval_seconds = check_interval_seconds
+        self.lead_seconds = lead_seconds
+        self.full_sync_interval_seconds = full_sync_interval_seconds
+        self._wakeup = threading.Event()
+        self._last_full_sync = time.monotonic() - full_sync_interval_seconds + initial_sync_delay_seconds
+        self._failures = 0
+        self._thread = threading.Thread(target=self._run, name="sheets-tab-refresher", daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        """Demande un passage immédiat (ex: un lecteur vient de recevoir une entrée expirée)."""
+        self._wakeup.set()
+
+    def is_failing(self) -> bool:
+        """Vrai si la dernière relecture a échoué (les lecteurs reçoivent des données de plus en plus anciennes)."""
+        return self._failures > 0
+
+    def _due_tabs(self) -> tuple:
+        # Les onglets lus par la fin (TAIL_READ_TABS) grandissent sans limite : jamais relus en entier ici
+        now = time.monotonic()
+        if now - self._last_full_sync >= self.full_sync_interval_seconds:
+            return [name for name in WORKSHEET_NAMES if name not in TAIL_READ_TABS], True
+        return [name for name in _get_tab_cache().due_for_refresh(self.lead_seconds) if name not in TAIL_READ_TABS], False
+
+    def _sync_tail_windows(self):
+        """Met à jour les fenêtres de fin déjà chargées (seules les lignes ajoutées depuis sont lues)."""
+        windows = _get_tail_windows()
+        for sheet_name in TAIL_READ_TABS:
+            if windows.get(sheet_name) is None:
+                continue
+            try:
+                with windows.lock():
+                    _sync_tail_window(sheet_name)
+            except Exception:
+                logger.exception("Échec de la mise à jour de la fin de l'onglet '%s'", sheet_name)
+
+    def _run(self):
+        while True:
+            sheet_names, full_sync = self._due_tabs()
+            wait_seconds = self.check_interval_seconds
+            if sheet_names:
+                try:
+                    _refresh_tabs(sheet_names)
+                    self._failures = 0
+                except Exception:
+                    logger.exception("Échec du rafraîchissement des onglets %s", ', '.join(sheet_names))
+                    self._failures += 1
+                    # Stockage indisponible : on espace les tentatives, les lecteurs gardent l'ancienne version
+                    wait_seconds = min(self.check_interval_seconds * 2 ** self._failures, self.full_sync_interval_seconds)
+                if full_sync:
+                    self._last_full_sync = time.monotonic()
+                    self._sync_tail_windows()
+                    _rotate_history_if_due()
+            self._wakeup.wait(wait_seconds)
+            self._wakeup.clear()
+
+@st.cache_resource # Un seul thread de rafraîchissement par processus
+def _get_tab_refresher() -> _TabRefresher:
+    return _TabRefresher(
+        check_interval_seconds=TAB_REFRESH_CHECK_INTERVAL_SECONDS,
+        lead_seconds=TAB_REFRESH_LEAD_SECONDS,
+        full_sync_interval_seconds=SQLITE_REPLICA_SYNC_INTERVAL_SECONDS,
+        initial_sync_delay_seconds=TAB_REFRESH_INITIAL_SYNC_DELAY_SECONDS
+    )
+
+def _revalidate_if_expired(sheet_names: list):
+    """
+    Relance la relecture en arrière-plan si l'un des onglets servis depuis le cache a dépassé son intervalle
+    de fraîcheur ; si le rafraîchissement échoue, l'utilisateur est prévenu de l'âge des données affichées.
+    """
+    cache = _get_tab_cache()
+    expired = [name for name in sheet_names if cache.is_expired(name)]
+    if not expired:
+        return
+    refresher = _get_tab_refresher()
+    refresher.wake() # Servi tel quel, remplacé dès la relecture en arrière-plan
+    if refresher.is_failing():
+        oldest_minutes = max(cache.age(name) or 0 for name in expired) / 60
+        st.warning(f"Google Sheets ne répond pas : les données affichées ({', '.join(expired)}) datent de {oldest_minutes:.0f} min et seront rafraîchies dès que possible.")
+
+def _store_local_copies(sheet_name: str, df: pd.DataFrame, data: list, version: int):
+    """
+    Enregistre une lecture complète dans le réplica, sauf si une écriture l'a rendue obsolète entre-temps.
+    """
+    with _get_row_index_registry().lock():
+        if _get_tab_cache().version(sheet_name) != version:
+            return
+        try:
+            _get_sheets_replica().replace_tab(sheet_name, df, hash_tab_values(data))
+        except Exception:
+            logger.exception("Impossible d'enregistrer l'onglet '%s' dans le réplica SQLite", sheet_name)
+
+def _replica_age(sheet_name: str):
+    """Secondes écoulées depuis la dernière synchronisation complète de l'onglet dans le réplica, ou None."""
+    synced_at = _get_sheets_replica().synced_at(sheet_name)
+    return max(0.0, time.time() - synced_at) if synced_at is not None else None
+
+def _replica_within_staleness(sheet_name: str) -> bool:
+    """Le réplica n'est servi que dans la limite absolue de fraîcheur de l'onglet (voir TAB_MAX_STALENESS_FACTOR)."""
+    age = _replica_age(sheet_name)
+    return age is not None and age < _get_tab_cache().max_staleness(sheet_name)
 
-# --- Initialisation de la connexion à Google Sheets ---
-@st.cache_resource(ttl=3600) # Mise en cache de la connexion pendant 1 heure
-def get_gspread_client():
+def _read_tab_from_replica(sheet_name: str, allow_stale: bool = False):
     """
-    Initialise et retourne un client gspread authentifié.
-    Utilise les secrets Streamlit pour l'authentification du compte de service (clé JSON encodée en Base64).
+    DataFrame de l'onglet depuis le réplica, ou None s'il n'y est pas (ou plus) à jour.
+    Même avec `allow_stale`, une copie plus vieille que la limite absolue de fraîcheur n'est pas servie.
     """
+    if not _replica_within_staleness(sheet_name):
+        return None
     try:
-        service_account_info_b64 = st.secrets["GCP_SERVICE_ACCOUNT_B64"]
-        
-        # Décode la chaîne Base64 en JSON. Gère les retours à la ligne qui peuvent être dans la clé privée.
-        service_account_info_json_str = base64.b64decode(service_account_info_b64).decode('utf-8')
-        creds = json.loads(service_account_info_json_str)
-        
-        gc = gspread.service_account_from_dict(creds)
-        return gc
-    except KeyError:
-        st.error("La clé 'GCP_SERVICE_ACCOUNT_B64' est manquante dans votre fichier .streamlit/secrets.toml. Veuillez la configurer.")
+        return _get_sheets_replica().read_tab(sheet_name, allow_stale=allow_stale)
+    except Exception:
+        logger.exception("Lecture de l'onglet '%s' dans le réplica SQLite impossible", sheet_name)
+        return None
+
+def _replicate_write(sheet_name: str, apply_write):
+    """
+    Répercute une écriture sur le réplica (`apply_write(replica)`), sans appel réseau.
+    Si l'écriture ne peut pas y être appliquée, l'onglet y est marqué périmé et sera relu depuis Google Sheets.
+    """
+    replica = _get_sheets_replica()
+    if not replica.is_fresh(sheet_name):
+        return
+    try:
+        apply_write(replica)
+    except Exception:
+        logger.exception("Écriture non répercutée sur le réplica SQLite pour l'onglet '%s'", sheet_name)
+        replica.invalidate(sheet_name)
+
+def _invalidate_after_write(sheet_name: str, replicate_write=None, existing_rows_changed: bool = True):
+    """
+    Point unique d'invalidation, appelé par toute écriture dans un onglet : cache mémoire (entrée et projections),
+    fenêtre de fin d'onglet si des lignes existantes ont changé ou bougé, et réplica SQLite, où l'écriture est
+    répercutée par `replicate_write(replica)` ou, sans elle, l'onglet marqué périmé.
+    """
+    invalidate_tab_cache(sheet_name)
+    if existing_rows_changed:
+        _get_tail_windows().discard(sheet_name)
+    if replicate_write is None:
+        _get_sheets_replica().invalidate(sheet_name)
+    else:
+        _replicate_write(sheet_name, replicate_write)
+
+# --- Fonctions d'interaction avec Google Sheets ---
+
+def _coerce_dataframe(sheet_name: str, data: list) -> pd.DataFrame:
+    """
+    Transforme les valeurs brutes d'un onglet (en-têtes + lignes) en DataFrame Pandas.
+    Vérifie la présence des colonnes attendues et tente des conversions de type.
+    """
+    if not data:
+        return pd.DataFrame(columns=EXPECTED_COLUMNS.get(WORKSHEET_NAMES[sheet_name], [])) # Retourne un DF vide avec les colonnes attendues
+
+    headers = data[0]
+    records = data[1:]
+    df = pd.DataFrame(records, columns=headers)
+
+    # Assurer que toutes les colonnes attendues sont présentes
+    expected_cols_for_sheet = EXPECTED_COLUMNS.get(WORKSHEET_NAMES[sheet_name], headers)
+    missing_cols = [col for col in expected_cols_for_sheet if col not in df.columns]
+    if missing_cols:
+        st.warning(f"Attention: Les colonnes suivantes sont manquantes dans l'onglet '{WORKSHEET_NAMES[sheet_name]}': {', '.join(missing_cols)}. Ajoutées avec des valeurs vides.")
+        for col in missing_cols:
+            df[col] = '' # Ajoute les colonnes manquantes
+
+    # Réordonner les colonnes pour correspondre à l'ordre attendu
+    df = df[expected_cols_for_sheet]
+
+    # Conversion des types selon le schéma déclaré dans config.COLUMN_TYPES
+    return coerce_dataframe_types(df, COLUMN_TYPES.get(WORKSHEET_NAMES[sheet_name], {}), DATE_INPUT_FORMATS)
+
+
+def _read_tab_from_storage(sheet_name: str) -> pd.DataFrame:
+    """Lit un onglet directement depuis le stockage et alimente les en-têtes, l'index, le cache et le réplica."""
+    cache = _get_tab_cache()
+    version = cache.version(sheet_name)
+    
+    # Récupère toutes les données, y compris les en-têtes
+    data = _get_storage_backend().read_tab(sheet_name)
+    _observe_tab_values(sheet_name, data)
+    df = _coerce_dataframe(sheet_name, data)
+    cache.put(sheet_name, df, version)
+    _store_local_copies(sheet_name, df, data, version)
+    return df
+
+def _load_tab_from_storage(sheet_name: str) -> pd.DataFrame:
+    """
+    Lecture depuis le stockage (Google Sheets) avec gestion des erreurs pour l'interface.
+    Si Google Sheets ne répond pas, la dernière copie du réplica (même périmée) est servie avec un avertissement.
+    """
+    try:
+        return _read_tab_from_storage(sheet_name).copy()
+    except gspread.exceptions.SpreadsheetNotFound:
+        _get_header_registry().reset()
+        st.error(f"Le Google Sheet '{SHEET_NAME}' est introuvable. Veuillez vérifier le nom ou s'il est partagé avec le compte de service.")
         st.stop()
-    except json.JSONDecodeError as e:
-        st.error(f"Erreur de décodage JSON de la clé de service. Assurez-vous que le contenu Base64 est un JSON valide: {e}")
+    except TabNotFoundError:
+        _get_header_registry().reset()
+        st.error(f"L'onglet '{WORKSHEET_NAMES[sheet_name]}' est introuvable dans le Google Sheet '{SHEET_NAME}'.")
         st.stop()
     except Exception as e:
-        st.error(f"Erreur d'authentification gspread. Assurez-vous que la clé GCP_SERVICE_ACCOUNT_B64 est correctement encodée et configurée: {e}")
+        stale_df = _read_tab_from_replica(sheet_name, allow_stale=True)
+        if stale_df is not None:
+            st.warning(f"Google Sheets ne répond pas ({e}) : l'onglet '{sheet_name}' est affiché depuis la copie locale, synchronisée il y a {_replica_age(sheet_name) / 60:.0f} min.")
+            return stale_df
+        st.error(f"Erreur lors de la lecture de l'onglet '{sheet_name}': {e}")
         st.stop()
 
-gc = get_gspread_client()
-
-# --- Fonctions d'interaction avec Google Sheets ---
+def _read_tab_from_local_copies(sheet_name: str):
+    """
+    DataFrame de l'onglet depuis le réplica SQLite (conservé entre les redémarrages), mis en cache.
+    Retourne None si l'onglet n'y est pas à jour.
+    """
+    cache = _get_tab_cache()
+    version = cache.version(sheet_name)
+    local_df = _read_tab_from_replica(sheet_name)
+    if local_df is not None:
+        cache.put(sheet_name, local_df, version, age_seconds=_replica_age(sheet_name) or 0.0)
+    return local_df
 
-@st.cache_data(ttl=600) # Mise en cache des données lues pendant 10 minutes
 def get_dataframe_from_sheet(sheet_name: str) -> pd.DataFrame:
     """
     Lit un onglet spécifique du Google Sheet et le retourne sous forme de DataFrame Pandas.
     Vérifie la présence des colonnes attendues et tente des conversions de type.
+    Le résultat est servi depuis le cache de l'onglet tant qu'il n'a pas été invalidé par une écriture,
+    même au-delà de son intervalle de fraîcheur (relu en arrière-plan par _TabRefresher), puis depuis le réplica SQLite local (y compris juste après un redémarrage) ;
+    Google Sheets n'est lu que si l'onglet n'a aucune copie locale à jour. Aucune copie n'est servie au-delà de
+    TAB_MAX_STALENESS_FACTOR intervalles : si Google Sheets ne répond pas non plus, une erreur est affichée.
+    """
+    _flush_pending_writes(sheet_name)
+    _get_tab_refresher()
+    cache = _get_tab_cache()
+    cached_df = cache.get(sheet_name)
+    if cached_df is not None:
+        _revalidate_if_expired([sheet_name])
+        return cached_df.copy() # Copie pour que l'appelant ne modifie pas l'entrée du cache
+    local_df = _read_tab_from_local_copies(sheet_name)
+    if local_df is not None:
+        return local_df.copy()
+    return _load_tab_from_storage(sheet_name)
+
+def query_sheet(sheet_name: str, filters: dict) -> pd.DataFrame:
+    """
+    Retourne les lignes de l'onglet dont les colonnes valent exactement les valeurs de `filters` ({colonne: valeur}).
+    Exécuté en SQL indexé sur le réplica local ; à défaut, filtre le DataFrame complet de l'onglet.
     """
+    _flush_pending_writes(sheet_name)
+    _get_tab_refresher() # Garde le réplica revalidé en arrière-plan
     try:
-        spreadsheet = gc.open(SHEET_NAME)
-        worksheet = spreadsheet.worksheet(WORKSHEET_NAMES[sheet_name])
-        
-        # Récupère toutes les données, y compris les en-têtes
-        data = worksheet.get_all_values()
-        if not data:
-            return pd.DataFrame(columns=EXPECTED_COLUMNS.get(WORKSHEET_NAMES[sheet_name], [])) # Retourne un DF vide avec les colonnes attendues
-        
-        headers = data[0]
-        records = data[1:]
-        df = pd.DataFrame(records, columns=headers)
-
-        # Assurer que toutes les colonnes attendues sont présentes
-        expected_cols_for_sheet = EXPECTED_COLUMNS.get(WORKSHEET_NAMES[sheet_name], headers)
-        missing_cols = [col for col in expected_cols_for_sheet if col not in df.columns]
-        if missing_cols:
-            st.warning(f"Attention: Les colonnes suivantes sont manquantes dans l'onglet '{WORKSHEET_NAMES[sheet_name]}': {', '.join(missing_cols)}. Ajoutées avec des valeurs vides.")
-            for col in missing_cols:
-                df[col] = '' # Ajoute les colonnes manquantes
-        
-        # Réordonner les colonnes pour correspondre à l'ordre attendu
-        df = df[expected_cols_for_sheet]
-
-        # Gérer les types de données spécifiques
-        if WORKSHEET_NAMES[sheet_name] == WORKSHEET_NAMES["REGLES_DE_GENERATION_ORACLE"]:
-            if 'Statut_Actif' in df.columns:
-                df['Statut_Actif'] = df['Statut_Actif'].apply(parse_boolean_string)
-        if WORKSHEET_NAMES[sheet_name] == WORKSHEET_NAMES["MORCEAUX_GENERES"]:
-            if 'Favori' in df.columns:
-                df['Favori'] = df['Favori'].apply(parse_boolean_string)
-        if WORKSHEET_NAMES[sheet_name] == WORKSHEET_NAMES["OUTILS_IA_REFERENCEMENT"]:
-            if 'Compatibilite_API' in df.columns:
-                df['Compatibilite_API'] = df['Compatibilite_API'].apply(parse_boolean_string)
-
-        # Pour les colonnes numériques, convertir en numérique si possible
-        numeric_cols_to_check = {
-            WORKSHEET_NAMES["STATISTIQUES_ORBITALES_SIMULEES"]: ['Ecoutes_Totales', 'J_aimes_Recus', 'Partages_Simules', 'Revenus_Simules_Streaming'],
-            WORKSHEET_NAMES["MOODS_ET_EMOTIONS"]: ['Niveau_Intensite'],
-            WORKSHEET_NAMES["PROJETS_EN_COURS"]: ['Budget_Estime'],
-            WORKSHEET_NAMES["OUTILS_IA_REFERENCEMENT"]: ['Evaluation_Gardien']
-        }
-        if WORKSHEET_NAMES[sheet_name] in numeric_cols_to_check:
-            for col in numeric_cols_to_check[WORKSHEET_NAMES[sheet_name]]:
-                if col in df.columns:
-                    if 'Revenus' in col or 'Budget' in col: # Float pour les montants
-                        df[col] = df[col].apply(safe_cast_to_float)
-                    else: # Int pour les autres chiffres
-                        df[col] = df[col].apply(safe_cast_to_int)
-
-        # Conversion des colonnes de date au format YYYY-MM-DD
-        for col in ['Date_Creation', 'Date_Mise_A_Jour', 'Date_Sortie_Prevue', 'Date_Debut', 'Date_Cible_Fin', 'Date_Session', 'Date_Conseil', 'Date_Debut', 'Date_Fin', 'Date_Heure']:
-            if col in df.columns:
-                try:
-                    df[col] = pd.to_datetime(df[col], errors='coerce').dt.strftime('%Y-%m-%d').fillna('')
-                except Exception:
-                    pass # Laisser la colonne telle quelle si la conversion échoue
-
-        return df
+        filtered_df = _get_sheets_replica().query(sheet_name, filters) if _replica_within_staleness(sheet_name) else None
+    except Exception:
+        logger.exception("Requête filtrée sur le réplica SQLite impossible pour l'onglet '%s'", sheet_name)
+        filtered_df = None
+    if filtered_df is not None:
+        return filtered_df
+    filtered_df = get_dataframe_from_sheet(sheet_name)
+    for col, value in filters.items():
+        filtered_df = filtered_df[filtered_df[col] == value]
+    return filtered_df.reset_index(drop=True)
+
+
+# --- Lectures partielles : colonnes choisies, ligne isolée ---
+
+def _read_projection_from_local_copies(sheet_name: str, columns: list):
+    """Colonnes demandées depuis le réplica, sinon None."""
+    if not _replica_within_staleness(sheet_name):
+        return None
+    try:
+        return _get_sheets_replica().query(sheet_name, columns=columns)
+    except Exception:
+        logger.exception("Lecture partielle de l'onglet '%s' dans les copies locales impossible", sheet_name)
+        return None
+
+def _read_projection_from_storage(sheet_name: str, columns: list) -> pd.DataFrame:
+    """Une seule requête au stockage pour les colonnes demandées, converties selon config.COLUMN_TYPES."""
+    headers = _get_header_registry().headers(sheet_name)
+    column_values = _get_storage_backend().read_columns(sheet_name, [headers.index(col) + 1 for col in columns])
+    # Les cellules vides en fin de colonne sont omises : toutes les colonnes sont ramenées à la même hauteur
+    num_rows = max((len(values) for values in column_values), default=1) - 1
+    projected_df = pd.DataFrame({
+        col: (list(values[1:]) + [''] * num_rows)[:num_rows]
+        for col, values in zip(columns, column_values)
+    }, columns=columns)
+    column_types = COLUMN_TYPES.get(WORKSHEET_NAMES[sheet_name], {})
+    return coerce_dataframe_types(projected_df, {col: column_types[col] for col in columns if col in column_types}, DATE_INPUT_FORMATS)
+
+def get_columns_from_sheet(sheet_name: str, columns: list) -> pd.DataFrame:
+    """
+    Seulement les colonnes `columns` de l'onglet (ex: identifiant et nom pour une liste déroulante), dans l'ordre
+    du Sheet et avec les mêmes conversions de type que get_dataframe_from_sheet, sans transférer les grandes
+    colonnes de texte. Servi depuis l'onglet complet s'il est en cache, puis depuis le cache des projections,
+    les copies locales et enfin le stockage (seules ces colonnes sont demandées).
+    """
+    _flush_pending_writes(sheet_name)
+    _get_tab_refresher()
+    cache = _get_tab_cache()
+    cached_df = cache.get(sheet_name)
+    if cached_df is not None:
+        _revalidate_if_expired([sheet_name])
+        return cached_df[columns].copy()
+    projected_df = cache.get_projection(sheet_name, columns)
+    if projected_df is not None:
+        return projected_df.copy()
+    version = cache.version(sheet_name)
+    projected_df = _read_projection_from_local_copies(sheet_name, columns)
+    if projected_df is None:
+        try:
+            projected_df = _read_projection_from_storage(sheet_name, columns)
+        except Exception:
+            logger.exception("Lecture partielle de l'onglet '%s' impossible, lecture complète", sheet_name)
+            return get_dataframe_from_sheet(sheet_name)[columns]
+    cache.put_projection(sheet_name, columns, projected_df, version)
+    return projected_df.copy()
+
+def get_row_by_id(sheet_name: str, unique_id_col: str, unique_id_value: str):
+    """
+    Toutes les colonnes d'une seule ligne (ex: les longs textes de l'élément ouvert dans un formulaire),
+    sous forme de dictionnaire {colonne: valeur}, sans lire l'onglet entier. Retourne None si l'identifiant est introuvable.
+    La ligne vient de l'onglet en cache, sinon d'une requête indexée sur le réplica, sinon d'une lecture
+    de cette seule ligne dans le stockage (sa position est donnée par la colonne d'identifiants, en cache).
+    """
+    _flush_pending_writes(sheet_name)
+    cached_df = _get_tab_cache().get(sheet_name)
+    if cached_df is not None:
+        _revalidate_if_expired([sheet_name])
+        matches = cached_df[cached_df[unique_id_col] == unique_id_value]
+        return matches.iloc[0].to_dict() if not matches.empty else None
+    try:
+        replica_df = _get_sheets_replica().query(sheet_name, {unique_id_col: unique_id_value}) if _replica_within_staleness(sheet_name) else None
+    except Exception:
+        logger.exception("Requête de la ligne '%s' sur le réplica SQLite impossible", unique_id_value)
+        replica_df = None
+    if replica_df is not None:
+        return replica_df.iloc[0].to_dict() if not replica_df.empty else None
+
+    id_values = get_columns_from_sheet(sheet_name, [unique_id_col])[unique_id_col]
+    positions = id_values.index[id_values == unique_id_value]
+    if len(positions) == 0:
+        return None
+    row_number = int(positions[0]) + 2 # Ligne 1 = en-têtes
+    try:
+        headers = _get_header_registry().headers(sheet_name)
+        row_values = _get_storage_backend().read_rows(sheet_name, row_number, row_number)
+        if row_values and len(row_values[0]) > headers.index(unique_id_col) and row_values[0][headers.index(unique_id_col)] == str(unique_id_value):
+            padded_values = (list(row_values[0]) + [''] * len(headers))[:len(headers)]
+            return _coerce_dataframe(sheet_name, [headers, padded_values]).iloc[0].to_dict()
+    except Exception:
+        logger.exception("Lecture de la ligne %d de l'onglet '%s' impossible", row_number, sheet_name)
+    # Ligne déplacée depuis la lecture des identifiants (ajout, suppression ailleurs) : lecture complète
+    full_df = get_dataframe_from_sheet(sheet_name)
+    matches = full_df[full_df[unique_id_col] == unique_id_value]
+    return matches.iloc[0].to_dict() if not matches.empty else None
+
+def get_workbook_snapshot(sheet_names: list = None) -> dict:
+    """
+    Lit plusieurs onglets du Google Sheet en une seule requête `values_batch_get`.
+    sheet_names: Liste des clés de WORKSHEET_NAMES à charger (tous les onglets si None).
+    Retourne un dictionnaire {nom_onglet: DataFrame} avec les mêmes conversions de type
+    que get_dataframe_from_sheet. Seuls les onglets absents du cache et des copies locales sont demandés à l'API.
+    """
+    if sheet_names is None:
+        sheet_names = list(WORKSHEET_NAMES.keys())
+    for name in sheet_names:
+        _flush_pending_writes(name)
+    _get_tab_refresher()
+    cache = _get_tab_cache()
+    snapshot = {}
+    for name in sheet_names:
+        cached_df = cache.get(name)
+        if cached_df is not None:
+            snapshot[name] = cached_df.copy()
+    _revalidate_if_expired(list(snapshot))
+    for name in sheet_names:
+        if name not in snapshot:
+            local_df = _read_tab_from_local_copies(name)
+            if local_df is not None:
+                snapshot[name] = local_df.copy()
+    names_to_fetch = [name for name in sheet_names if name not in snapshot]
+    if not names_to_fetch:
+        return snapshot
+    try:
+        versions = {name: cache.version(name) for name in names_to_fetch}
+        tab_values = _get_storage_backend().read_tabs(names_to_fetch)
+        for name, data in tab_values.items():
+            _observe_tab_values(name, data)
+            df = _coerce_dataframe(name, data)
+            cache.put(name, df, versions[name])
+            _store_local_copies(name, df, data, versions[name])
+            snapshot[name] = df.copy()
+        return snapshot
     except gspread.exceptions.SpreadsheetNotFound:
+        _get_header_registry().reset()
         st.error(f"Le Google Sheet '{SHEET_NAME}' est introuvable. Veuillez vérifier le nom ou s'il est partagé avec le compte de service.")
         st.stop()
-    except gspread.exceptions.WorksheetNotFound:
-        st.error(f"L'onglet '{WORKSHEET_NAMES[sheet_name]}' est introuvable dans le Google Sheet '{SHEET_NAME}'.")
+    except gspread.exceptions.APIError as e:
+        st.error(f"Erreur API Google Sheets lors de la lecture groupée des onglets {', '.join(sheet_names)}: {e.response.text}")
         st.stop()
     except Exception as e:
-        st.error(f"Erreur lors de la lecture de l'onglet '{sheet_name}': {e}")
+        st.error(f"Erreur lors de la lecture groupée des onglets {', '.join(sheet_names)}: {e}")
         st.stop()
 
 
+def _prefetch_tab(sheet_name: str) -> dict:
+    """Charge un onglet dans le cache s'il n'y est pas déjà ; retourne la source utilisée et la durée."""
+    start = time.perf_counter()
+    if _get_tab_cache().get(sheet_name) is not None:
+        source = 'cache'
+    elif _read_tab_from_local_copies(sheet_name) is not None:
+        source = 'copie locale'
+    else:
+        _read_tab_from_storage(sheet_name)
+        source = 'stockage'
+    return {'Onglet': sheet_name, 'Source': source, 'Duree_ms': round((time.perf_counter() - start) * 1000, 1)}
+
+def prefetch_tabs(sheet_names: list, max_workers: int = PREFETCH_MAX_WORKERS) -> pd.DataFrame:
+    """
+    Charge en parallèle (pool de threads) les onglets dont une page aura besoin, pour que ses lectures
+    trouvent ensuite le cache partagé déjà chaud. Le temps d'attente est celui de la lecture la plus lente,
+    et non plus la somme des lectures. Les erreurs sont seulement journalisées : la page les affichera
+    à sa propre lecture de l'onglet.
+    Retourne la durée de chaque lecture : DataFrame (Onglet, Source, Duree_ms).
+    """
+    if not sheet_names:
+        return pd.DataFrame(columns=['Onglet', 'Source', 'Duree_ms'])
+    _get_tab_refresher()
+    script_run_ctx = get_script_run_ctx() # Propagé aux threads du pool (avertissements Streamlit éventuels)
+
+    def prefetch(sheet_name: str) -> dict:
+        if script_run_ctx is not None:
+            add_script_run_ctx(threading.current_thread(), script_run_ctx)
+        start = time.perf_counter()
+        try:
+            return _prefetch_tab(sheet_name)
+        except Exception as e:
+            logger.warning("Préchargement de l'onglet '%s' impossible : %s", sheet_name, e)
+            return {'Onglet': sheet_name, 'Source': 'erreur', 'Duree_ms': round((time.perf_counter() - start) * 1000, 1)}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(sheet_names)), thread_name_prefix="sheets-prefetch") as pool:
+        timings = list(pool.map(prefetch, sheet_names))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    for timing in timings:
+        logger.info("Préchargement de '%s' : %.1f ms (%s)", timing['Onglet'], timing['Duree_ms'], timing['Source'])
+    logger.info(
+        "Préchargement de %d onglets en %.1f ms (somme des lectures : %.1f ms)",
+        len(timings), elapsed_ms, sum(timing['Duree_ms'] for timing in timings)
+    )
+    return pd.DataFrame(timings)
+
+
+# --- Vue catalogue : morceaux joints à leurs bibliothèques de référence ---
+
+class _CatalogueViewHolder:
+    """Dernière vue catalogue construite, avec les générations des onglets sources à partir desquelles elle l'a été."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generations = None
+        self.view_df = None
+
+@st.cache_resource # Vue partagée par toutes les sessions, conservée entre les reruns
+def _get_catalogue_view_holder() -> _CatalogueViewHolder:
+    return _CatalogueViewHolder()
+
+def get_catalogue_view() -> pd.DataFrame:
+    """
+    MORCEAUX_GENERES avec les noms et descriptions de leur artiste, album, styles, mood, thème et structure
+    (voir catalogue_view.CATALOGUE_JOINS). La vue n'est reconstruite que si l'un de ses onglets sources
+    a changé depuis la dernière construction (écriture ou relecture au contenu différent).
+    """
+    cache = _get_tab_cache()
+    holder = _get_catalogue_view_holder()
+    with holder.lock:
+        source_dfs, generations = cache.current_entries(CATALOGUE_SOURCE_TABS)
+        # Un onglet source trop ancien pour être servi (None) impose de recharger la vue
+        if holder.view_df is not None and holder.generations == generations and all(df is not None for df in source_dfs.values()):
+            _revalidate_if_expired(CATALOGUE_SOURCE_TABS)
+            return holder.view_df.copy()
+        if any(df is None for df in source_dfs.values()):
+            snapshot = get_workbook_snapshot(CATALOGUE_SOURCE_TABS) # Charge les onglets manquants dans le cache
+            source_dfs, generations = cache.current_entries(CATALOGUE_SOURCE_TABS)
+            if any(df is None for df in source_dfs.values()):
+                source_dfs, generations = snapshot, None # Onglet modifié entre-temps : reconstruite au prochain appel
+        holder.view_df = build_catalogue_view(source_dfs['MORCEAUX_GENERES'], source_dfs)
+        holder.generations = generations
+        return holder.view_df.copy()
+
+def get_catalogue_entry(morceau_id: str):
+    """Ligne de la vue catalogue d'un morceau, sous forme de dictionnaire, ou None s'il est introuvable."""
+    view_df = get_catalogue_view()
+    matches = view_df[view_df['ID_Morceau'] == morceau_id]
+    return matches.iloc[0].to_dict() if not matches.empty else None
+
+# --- Bibliothèques de référence indexées par identifiant (pour l'Oracle) ---
+
+class _ReferenceTableRegistry:
+    """Une ReferenceTable par onglet, avec la génération du contenu à partir duquel elle a été construite."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tables = {} # onglet -> (génération, ReferenceTable)
+
+@st.cache_resource # Tables partagées par toutes les sessions, conservées entre les reruns
+def _get_reference_table_registry() -> _ReferenceTableRegistry:
+    return _ReferenceTableRegistry()
+
+def get_reference_tables(sheet_names: list) -> dict:
+    """
+    {onglet: ReferenceTable} indexées par leur colonne identifiant (première colonne de EXPECTED_COLUMNS).
+    Une table n'est reconstruite que si le contenu de son onglet a changé ; les onglets absents du cache
+    sont chargés ensemble (voir get_workbook_snapshot).
+    """
+    cache = _get_tab_cache()
+    registry = _get_reference_table_registry()
+    source_dfs, generations = cache.current_entries(sheet_names)
+    if any(df is None for df in source_dfs.values()):
+        snapshot = get_workbook_snapshot([name for name, df in source_dfs.items() if df is None])
+        source_dfs, generations = cache.current_entries(sheet_names)
+    else:
+        snapshot = {}
+        _revalidate_if_expired(sheet_names)
+    tables = {}
+    with registry.lock:
+        for name, generation in zip(sheet_names, generations):
+            entry = registry.tables.get(name)
+            if source_dfs[name] is not None and entry is not None and entry[0] == generation:
+                tables[name] = entry[1]
+                continue
+            df = source_dfs[name]
+            if df is None:
+                df = snapshot[name] if name in snapshot else get_dataframe_from_sheet(name)
+            tables[name] = ReferenceTable(name, df, EXPECTED_COLUMNS[WORKSHEET_NAMES[name]][0])
+            if source_dfs[name] is not None: # Sinon, onglet modifié entre-temps : table reconstruite au prochain appel
+                registry.tables[name] = (generation, tables[name])
+    return tables
+
+def get_reference_table(sheet_name: str) -> ReferenceTable:
+    return get_reference_tables([sheet_name])[sheet_name]
+
+# --- Lectures par fenêtre (fin d'onglet) pour les onglets qui ne font que grandir ---
+
+class _TailWindow:
+    """
+    Dernières lignes d'un onglet en ajout continu, avec le numéro de la dernière ligne connue.
+    Les lignes ajoutées depuis sont lues seules (plage ouverte après cette ligne) : le coût d'une lecture
+    dépend du nombre de nouvelles lignes, pas de la taille de l'onglet.
+    """
+
+    def __init__(self, headers: list, first_row_number: int, rows: list, capacity: int):
+        self.headers = list(headers)
+        self.capacity = capacity
+        self.loaded_at = time.monotonic()
+        self._rows = [] # (numéro de ligne, valeurs)
+        self.last_row_number = first_row_number - 1
+        self.extend(rows)
+
+    def extend(self, rows: list):
+        """Ajoute les lignes lues après la dernière ligne connue, en ne gardant que les `capacity` dernières."""
+        width = len(self.headers)
+        for values in rows:
+            self.last_row_number += 1
+            self._rows.append((self.last_row_number, (list(values) + [''] * width)[:width]))
+        del self._rows[:-self.capacity]
+
+    def covers_start(self) -> bool:
+        """Vrai si la fenêtre commence à la première ligne de données (elle contient tout l'onglet)."""
+        return not self._rows or self._rows[0][0] == 2
+
+    def rows(self, count: int = None) -> list:
+        selected = self._rows if count is None else self._rows[-count:] if count > 0 else []
+        return [values for _, values in selected]
+
+    def rows_after(self, column_name: str, value: str):
+        """Lignes qui suivent celle où `column_name` vaut `value`, ou None si elle n'est pas dans la fenêtre."""
+        col_position = self.headers.index(column_name)
+        for position, (_, values) in enumerate(self._rows):
+            if values[col_position] == str(value):
+                return [row_values for _, row_values in self._rows[position + 1:]]
+        return None
+
+class _TailWindowRegistry:
+    """Une _TailWindow par onglet ; les lectures d'un même onglet sont sérialisées (pas de double appel)."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._windows = {}
+
+    def lock(self):
+        return self._lock
+
+    def get(self, sheet_name: str):
+        with self._lock:
+            return self._windows.get(sheet_name)
+
+    def set(self, sheet_name: str, window: _TailWindow):
+        with self._lock:
+            self._windows[sheet_name] = window
+
+    def discard(self, sheet_name: str):
+        """À appeler quand des lignes existantes changent (mise à jour, suppression) : la fenêtre sera relue."""
+        with self._lock:
+            self._windows.pop(sheet_name, None)
+
+@st.cache_resource # Fenêtres partagées par toutes les sessions, conservées entre les reruns
+def _get_tail_windows() -> _TailWindowRegistry:
+    return _TailWindowRegistry()
+
+def _load_tail_window(sheet_name: str, capacity: int) -> _TailWindow:
+    """
+    Lit les `capacity` dernières lignes de l'onglet : la première colonne (identifiants) donne le nombre
+    de lignes, puis seule la plage de fin est demandée.
+    """
+    backend = _get_storage_backend()
+    headers = _get_header_registry().headers(sheet_name)
+    last_row_number = len(backend.read_column(sheet_name, 1))
+    first_row_number = max(2, last_row_number - capacity + 1)
+    rows = backend.read_rows(sheet_name, first_row_number, last_row_number) if last_row_number >= 2 else []
+    return _TailWindow(headers, first_row_number, rows, capacity)
+
+def _sync_tail_window(sheet_name: str, min_rows: int = 0) -> _TailWindow:
+    """
+    Fenêtre de fin d'onglet à jour : seules les lignes ajoutées depuis la dernière lecture sont demandées.
+    La fenêtre est relue en entier si elle est trop petite, si une ligne existante a changé ou si
+    l'intervalle de fraîcheur de l'onglet est dépassé (modifications faites directement dans le Sheet).
+    """
+    _flush_pending_writes(sheet_name) # Les lignes encore en file d'écriture font partie de la fin de l'onglet
+    windows = _get_tail_windows()
+    with windows.lock():
+        window = windows.get(sheet_name)
+        if (window is None
+                or (window.capacity < min_rows and not window.covers_start())
+                or time.monotonic() - window.loaded_at >= _get_tab_cache().ttl(sheet_name)):
+            window = _load_tail_window(sheet_name, max(min_rows, TAIL_WINDOW_ROWS))
+            windows.set(sheet_name, window)
+        else:
+            window.capacity = max(window.capacity, min_rows)
+            window.extend(_get_storage_backend().read_rows(sheet_name, window.last_row_number + 1))
+        return window
+
+def _tail_rows_to_dataframe(sheet_name: str, window: _TailWindow, rows: list) -> pd.DataFrame:
+    return _coerce_dataframe(sheet_name, [window.headers] + rows)
+
+def get_last_rows(sheet_name: str, count: int = TAIL_WINDOW_ROWS) -> pd.DataFrame:
+    """
+    Les `count` dernières lignes de l'onglet (dans l'ordre du Sheet), avec les mêmes conversions
+    de type que get_dataframe_from_sheet, sans lire l'onglet entier.
+    En cas d'échec de la lecture par plage, se rabat sur la lecture complète de l'onglet.
+    """
+    try:
+        windows = _get_tail_windows()
+        with windows.lock():
+            window = _sync_tail_window(sheet_name, min_rows=count)
+            return _tail_rows_to_dataframe(sheet_name, window, window.rows(count))
+    except Exception:
+        logger.exception("Lecture de la fin de l'onglet '%s' impossible, lecture complète", sheet_name)
+        return get_dataframe_from_sheet(sheet_name).tail(count).reset_index(drop=True)
+
+def get_rows_after_id(sheet_name: str, unique_id_col: str, unique_id_value: str) -> pd.DataFrame:
+    """
+    Les lignes ajoutées après celle dont `unique_id_col` vaut `unique_id_value` (ex: le dernier ID_GenLog déjà affiché).
+    Servi depuis la fenêtre de fin d'onglet ; si la ligne est plus ancienne, seule la plage qui la suit est lue.
+    Retourne un DataFrame vide si l'identifiant est introuvable.
+    """
+    try:
+        windows = _get_tail_windows()
+        with windows.lock():
+            window = _sync_tail_window(sheet_name)
+            rows = window.rows_after(unique_id_col, unique_id_value)
+            if rows is None:
+                backend = _get_storage_backend()
+                id_values = backend.read_column(sheet_name, window.headers.index(unique_id_col) + 1)
+                if str(unique_id_value) not in id_values[1:]:
+                    return _tail_rows_to_dataframe(sheet_name, window, [])
+                row_number = id_values.index(str(unique_id_value), 1) + 1
+                rows = backend.read_rows(sheet_name, row_number + 1, window.last_row_number)
+            return _tail_rows_to_dataframe(sheet_name, window, rows)
+    except Exception:
+        logger.exception("Lecture des lignes de '%s' après '%s' impossible, lecture complète", sheet_name, unique_id_value)
+        full_df = get_dataframe_from_sheet(sheet_name)
+        matches = full_df.index[full_df[unique_id_col] == unique_id_value]
+        return full_df.iloc[matches[0] + 1:].reset_index(drop=True) if len(matches) else full_df.iloc[0:0]
+
+# --- Archivage de l'historique des générations (partitions mensuelles) ---
+
+@st.cache_resource # Une seule archive par processus
+def _get_history_archive() -> HistoryArchive:
+    return HistoryArchive(HISTORY_ARCHIVE_DIR, date_col='Date_Heure', unique_id_col='ID_GenLog')
+
+def _iso_day(value):
+    """'AAAA-MM-JJ' d'une date (date, datetime, Timestamp ou chaîne), ou None."""
+    if value is None or value == '':
+        return None
+    return value.isoformat()[:10] if hasattr(value, 'isoformat') else str(value)[:10]
+
+def rotate_historique_generations(max_age_days: int = HISTORY_HOT_WINDOW_DAYS, priority: int = PRIORITY_INTERACTIVE) -> int:
+    """
+    Déplace les générations de plus de `max_age_days` jours de l'onglet HISTORIQUE_GENERATIONS vers l'archive.
+    Seul le début de l'onglet est déplacé (jusqu'à la première ligne récente ou non datée), pour que
+    la suppression porte sur une plage continue : une seule requête. Les lignes sont écrites dans l'archive
+    avant d'être retirées de l'onglet ; une rotation interrompue laisse au pire des doublons, ignorés en lecture.
+    Sans activation explicite (config.HISTORY_ROTATION_ENABLED, archive sur un stockage durable et partagé),
+    aucune ligne n'est retirée de l'onglet. Retourne le nombre de lignes archivées.
+    """
+    sheet_name = "HISTORIQUE_GENERATIONS"
+    archive = _get_history_archive()
+    if not HISTORY_ROTATION_ENABLED or not archive.enabled:
+        return 0
+    _flush_pending_writes(sheet_name)
+    cutoff = (datetime.now() - timedelta(days=max_age_days)).strftime('%Y-%m-%d')
+    index_registry = _get_row_index_registry()
+    with index_registry.lock(): # Aucune écriture par numéro de ligne pendant le décalage des lignes
+        history_df = _read_tab_from_storage(sheet_name)
+        dates = history_df['Date_Heure'].astype(str)
+        is_recent = ((dates == '') | (dates >= cutoff)).to_numpy()
+        num_archived = int(is_recent.argmax()) if is_recent.any() else len(history_df)
+        if num_archived:
+            archive.append(history_df.iloc[:num_archived])
+            _get_storage_backend().delete_rows(sheet_name, 2, num_archived + 1, priority=priority)
+            index_registry.observe(sheet_name, []) # Reconstruit à la prochaine lecture complète
+            _invalidate_after_write(sheet_name)
+    archive.record_rotation()
+    logger.info("%d générations antérieures au %s archivées", num_archived, cutoff)
+    return num_archived
+
+def _rotate_history_if_due():
+    """Rotation de l'historique si la dernière date de plus de HISTORY_ROTATION_INTERVAL_SECONDS (y compris avant un redémarrage)."""
+    if not HISTORY_ROTATION_ENABLED:
+        return
+    archive = _get_history_archive()
+    last_rotation_at = archive.last_rotation_at()
+    if not archive.enabled or (last_rotation_at is not None and time.time() - last_rotation_at < HISTORY_ROTATION_INTERVAL_SECONDS):
+        return
+    try:
+        rotate_historique_generations(priority=PRIORITY_BACKGROUND)
+    except Exception:
+        logger.exception("Échec de l'archivage de l'historique des générations")
+
+def get_historique_generations(start_date=None, end_date=None, columns: list = None) -> pd.DataFrame:
+    """
+    Générations datées entre `start_date` et `end_date` (bornes incluses, None = sans borne), de la plus
+    ancienne à la plus récente, que les lignes soient encore dans l'onglet ou déjà archivées.
+    L'archive n'est ouverte que si la période commence avant la date la plus récente archivée, et seules
+    les partitions des mois concernés sont lues. `columns` limite les colonnes lues (onglet et archive).
+    Sans borne, les lignes non datées de l'onglet sont incluses.
+    """
+    sheet_name = "HISTORIQUE_GENERATIONS"
+    start, end = _iso_day(start_date), _iso_day(end_date)
+    read_columns = None if columns is None else list(dict.fromkeys(list(columns) + ['ID_GenLog', 'Date_Heure']))
+    live_df = get_dataframe_from_sheet(sheet_name) if read_columns is None else get_columns_from_sheet(sheet_name, read_columns)
+    dates = live_df['Date_Heure'].astype(str)
+    if start is not None:
+        live_df = live_df[dates >= start]
+    if end is not None:
+        live_df = live_df[(dates != '') & (dates <= end)]
+
+    archive = _get_history_archive()
+    archived_until = archive.archived_until()
+    parts = [live_df]
+    if archived_until is not None and (start is None or start <= archived_until):
+        try:
+            archived_df = archive.read(start, end, read_columns)
+            if not archived_df.empty:
+                # Une ligne encore présente dans l'onglet (rotation interrompue) y est la version à jour
+                parts.insert(0, archived_df[~archived_df['ID_GenLog'].isin(live_df['ID_GenLog'])])
+        except Exception as e:
+            st.warning(f"L'historique archivé n'a pas pu être lu ({e}) : seules les générations récentes sont affichées.")
+    history_df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else live_df.reset_index(drop=True)
+    return history_df[columns] if columns is not None else history_df
+
+def get_history_archive_summary() -> dict:
+    """Mois archivés, date de la génération archivée la plus récente et instant de la dernière rotation."""
+    archive = _get_history_archive()
+    return {
+        'enabled': archive.enabled,
+        'rotation_enabled': HISTORY_ROTATION_ENABLED and archive.enabled,
+        'months': archive.months(),
+        'archived_until': archive.archived_until(),
+        'last_rotation_at': archive.last_rotation_at(),
+    }
+
+def _record_appended_rows(sheet_name: str, first_row_number, rows: list):
+    """Ajoute les lignes écrites à l'index local et au réplica, à partir du numéro de la première ligne écrite."""
+    index_registry = _get_row_index_registry()
+    with index_registry.lock():
+        if first_row_number is None:
+            index_registry.observe(sheet_name, []) # Position inconnue : l'index sera reconstruit
+            _invalidate_after_write(sheet_name, existing_rows_changed=False)
+            return
+        index = index_registry.get(sheet_name)
+        if index is not None: # Sans index, il sera construit à la prochaine lecture
+            for offset, values in enumerate(rows):
+                index.record_append(first_row_number + offset, values)
+        headers = EXPECTED_COLUMNS.get(WORKSHEET_NAMES[sheet_name]) or _get_header_registry().headers(sheet_name)
+        _invalidate_after_write(
+            sheet_name,
+            lambda replica: replica.insert_rows(sheet_name, _coerce_dataframe(sheet_name, [headers] + rows), first_row_number),
+            existing_rows_changed=False
+        )
+
+def _serialize_value(value) -> str:
+    """Convertit une valeur Python en texte de cellule Google Sheets."""
+    # Valeurs manquantes (None, NaN, <NA> des colonnes Int64) : cellule vide
+    if not isinstance(value, (list, str)) and pd.isna(value):
+        return ''
+    # Convertir les booléens en 'VRAI'/'FAUX' pour Google Sheets
+    if isinstance(value, bool):
+        value = 'VRAI' if value else 'FAUX'
+    # Gérer les listes pour les transformer en chaînes
+    if isinstance(value, list):
+        value = ', '.join(map(str, value))
+    return str(value) # Convertir toutes les valeurs en string pour gspread
+
+def _order_row_values(sheet_name: str, row_data: dict) -> list:
+    """
+    Ordonne les valeurs d'un dictionnaire selon les colonnes attendues de l'onglet.
+    Si une colonne attendue n'est pas dans row_data, elle sera ajoutée vide.
+    Les en-têtes (en cache) ne servent que pour un onglet absent de EXPECTED_COLUMNS.
+    """
+    expected_cols_for_sheet = EXPECTED_COLUMNS.get(WORKSHEET_NAMES[sheet_name]) or _get_header_registry().headers(sheet_name)
+    return [_serialize_value(row_data.get(col, '')) for col in expected_cols_for_sheet]
+
+def _append_rows_now(sheet_name: str, rows: list, priority: int = PRIORITY_INTERACTIVE):
+    """Écrit immédiatement des lignes déjà ordonnées en un seul appel `append_rows`."""
+    first_row_number = _get_storage_backend().append_rows(sheet_name, rows, priority=priority)
+    _record_appended_rows(sheet_name, first_row_number, rows) # Invalide uniquement l'onglet modifié
+    return first_row_number
+
 def append_row_to_sheet(sheet_name: str, row_data: dict) -> bool:
     """
     Ajoute une nouvelle ligne à l'onglet spécifié.
     row_data doit être un dictionnaire où les clés correspondent aux en-têtes de colonnes.
     """
     try:
-        spreadsheet = gc.open(SHEET_NAME)
-        worksheet = spreadsheet.worksheet(WORKSHEET_NAMES[sheet_name])
-
-        # Récupérer les en-têtes actuels de la feuille pour s'assurer de l'ordre et des colonnes manquantes
-        current_headers = worksheet.row_values(1)
-        
-        # Assurer que toutes les colonnes attendues par l'onglet sont présentes dans row_data
-        # Si une colonne attendue n'est pas dans row_data, elle sera ajoutée vide
-        expected_cols_for_sheet = EXPECTED_COLUMNS.get(WORKSHEET_NAMES[sheet_name], current_headers)
-        
-        # Créer la liste des valeurs dans le bon ordre
-        ordered_values = []
-        for col in expected_cols_for_sheet:
-            value = row_data.get(col, '')
-            # Convertir les booléens en 'VRAI'/'FAUX' pour Google Sheets
-            if isinstance(value, bool):
-                value = 'VRAI' if value else 'FAUX'
-            # Gérer les listes pour les transformer en chaînes
-            if isinstance(value, list):
-                value = ', '.join(map(str, value))
-            ordered_values.append(str(value)) # Convertir toutes les valeurs en string pour gspread
-        
-        worksheet.append_row(ordered_values)
-        st.cache_data.clear() # Invalider le cache après une écriture
+        _append_rows_now(sheet_name, [_order_row_values(sheet_name, row_data)])
         return True
     except gspread.exceptions.APIError as e:
         st.error(f"Erreur API Google Sheets lors de l'ajout à '{sheet_name}': {e.response.text}")
@@ -153,53 +1270,129 @@ def append_row_to_sheet(sheet_name: str, row_data: dict) -> bool:
         st.error(f"Erreur lors de l'ajout de la ligne à l'onglet '{sheet_name}': {e}")
         return False
 
-def update_row_in_sheet(sheet_name: str, unique_id_col: str, unique_id_value: str, row_data: dict) -> bool:
+def _dataframe_to_rows(sheet_name: str, df: pd.DataFrame) -> list:
     """
-    Met à jour une ligne existante dans l'onglet spécifié, identifiée par une colonne et une valeur unique.
+    Aligne un DataFrame sur les colonnes attendues de l'onglet (colonnes manquantes vides,
+    colonnes en trop ignorées) et le convertit en lignes de texte prêtes pour `append_rows`.
+    Les conversions sont faites colonne par colonne, sans boucle sur les lignes.
+    """
+    expected_cols_for_sheet = EXPECTED_COLUMNS.get(WORKSHEET_NAMES[sheet_name]) or _get_header_registry().headers(sheet_name)
+    aligned = df.reindex(columns=expected_cols_for_sheet)
+    text_columns = {}
+    for col in expected_cols_for_sheet:
+        series = aligned[col]
+        if pd.api.types.is_bool_dtype(series):
+            text_columns[col] = np.where(series.to_numpy(), 'VRAI', 'FAUX')
+        elif pd.api.types.is_numeric_dtype(series):
+            text_columns[col] = series.astype(object).where(series.notna(), '').astype(str).to_numpy()
+        else:
+            # Colonnes texte : seules les valeurs non textuelles (booléens, listes...) passent par _serialize_value
+            series = series.where(series.notna(), '')
+            is_text = series.map(type).eq(str)
+            text_columns[col] = series.where(is_text, series[~is_text].map(_serialize_value)).to_numpy()
+    return pd.DataFrame(text_columns, columns=expected_cols_for_sheet).to_numpy().tolist()
+
+def append_dataframe_to_sheet(sheet_name: str, df: pd.DataFrame, chunk_size: int = SHEETS_APPEND_CHUNK_SIZE) -> bool:
+    """
+    Ajoute toutes les lignes d'un DataFrame à l'onglet spécifié, par paquets de `chunk_size`
+    lignes (un appel `append_rows` par paquet) au lieu d'un appel par ligne.
+    Les colonnes du DataFrame doivent correspondre aux en-têtes de l'onglet.
+    """
+    if df.empty:
+        return True
+    rows = _dataframe_to_rows(sheet_name, df)
+    written = 0
+    try:
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            _append_rows_now(sheet_name, chunk)
+            written += len(chunk)
+        return True
+    except gspread.exceptions.APIError as e:
+        st.error(f"Erreur API Google Sheets lors de l'ajout groupé à '{sheet_name}' ({written}/{len(rows)} lignes écrites): {e.response.text}")
+        return False
+    except Exception as e:
+        st.error(f"Erreur lors de l'ajout groupé à l'onglet '{sheet_name}' ({written}/{len(rows)} lignes écrites): {e}")
+        return False
+
+def _diff_row_cells(headers: list, current_values: list, row_data: dict) -> dict:
+    """
+    Compare les nouvelles valeurs à la ligne en cache et retourne uniquement les cellules modifiées,
+    sous la forme {position de colonne (0-indexée): valeur sérialisée}. Les colonnes inconnues sont ignorées.
+    """
+    changed_cells = {}
+    for col_name, new_value in row_data.items():
+        if col_name not in headers:
+            continue
+        col_position = headers.index(col_name)
+        serialized = _serialize_value(new_value)
+        current_value = current_values[col_position] if col_position < len(current_values) else ''
+        if serialized != current_value:
+            changed_cells[col_position] = serialized
+    return changed_cells
+
+def update_rows_in_sheet(sheet_name: str, unique_id_col: str, updates: dict) -> bool:
+    """
+    Met à jour plusieurs lignes de l'onglet spécifié en un seul appel `batch_update`.
     unique_id_col: Nom de la colonne qui contient l'identifiant unique (ex: 'ID_Morceau').
-    unique_id_value: La valeur de l'identifiant unique de la ligne à mettre à jour.
-    row_data: Dictionnaire des données à mettre à jour (clés = en-têtes de colonnes).
+    updates: Dictionnaire {valeur de l'identifiant: {colonne: nouvelle valeur}}.
+    Seules les cellules dont la valeur diffère de la copie locale de la ligne sont envoyées :
+    les autres colonnes ne sont pas réécrites et les modifications faites ailleurs sont préservées.
+    Si un identifiant est introuvable, aucune ligne n'est modifiée.
     """
     try:
-        spreadsheet = gc.open(SHEET_NAME)
-        worksheet = spreadsheet.worksheet(WORKSHEET_NAMES[sheet_name])
+        registry = _get_header_registry()
         
-        # Trouver la colonne de l'ID unique
-        # Utiliser `find` avec `re.compile` pour une correspondance exacte (ignorer les sous-chaînes)
-        # Assure-toi que la première ligne contient les en-têtes.
-        list_of_headers = worksheet.row_values(1)
-        try:
-            id_col_index = list_of_headers.index(unique_id_col) + 1 # +1 car gspread est 1-indexé
-        except ValueError:
+        # Trouver la colonne de l'ID unique à partir des en-têtes en cache
+        id_col_position = _get_column_position(sheet_name, unique_id_col)
+        if id_col_position is None:
             st.error(f"La colonne '{unique_id_col}' est introuvable dans l'onglet '{sheet_name}'.")
             return False
+        list_of_headers = registry.headers(sheet_name)
+        # Une colonne attendue absente des en-têtes en cache signale un onglet modifié : relire les en-têtes
+        expected_cols_for_sheet = EXPECTED_COLUMNS.get(WORKSHEET_NAMES[sheet_name], [])
+        if any(col in expected_cols_for_sheet and col not in list_of_headers for row_data in updates.values() for col in row_data):
+            list_of_headers = registry.refresh(sheet_name)
+
+        # S'assurer que l'index local connaît chaque identifiant (relecture de l'onglet au besoin)
+        missing_ids = [str(unique_id_value) for unique_id_value in updates if _find_row_number(sheet_name, unique_id_col, unique_id_value) is None]
+        if missing_ids:
+            st.error(f"L'identifiant '{', '.join(missing_ids)}' n'a pas été trouvé dans la colonne '{unique_id_col}' de l'onglet '{sheet_name}'.")
+            return False
 
-        # Trouver la cellule contenant la valeur de l'ID unique
-        cell = worksheet.find(unique_id_value, in_column=id_col_index)
-        row_index = cell.row
-
-        # Récupérer les valeurs actuelles de la ligne pour ne modifier que les champs concernés
-        current_row_values = worksheet.row_values(row_index)
-        updated_values = current_row_values[:] # Copie pour modification
-        
-        for col_name, new_value in row_data.items():
-            if col_name in list_of_headers:
-                col_idx_to_update = list_of_headers.index(col_name)
-                # Convertir les booléens en 'VRAI'/'FAUX' pour Google Sheets
-                if isinstance(new_value, bool):
-                    new_value = 'VRAI' if new_value else 'FAUX'
-                # Gérer les listes pour les transformer en chaînes
-                if isinstance(new_value, list):
-                    new_value = ', '.join(map(str, new_value))
-                updated_values[col_idx_to_update] = str(new_value) # Convertir en string
-
-        # Mettre à jour toute la ligne
-        worksheet.update(f'A{row_index}', [updated_values])
-        st.cache_data.clear() # Invalider le cache après une écriture
+        # Calculer les cellules modifiées sur un état cohérent de l'index (une relecture a pu décaler les lignes)
+        index_registry = _get_row_index_registry()
+        cell_updates = {} # numéro de ligne -> {position de colonne: valeur}
+        with index_registry.lock():
+            index = index_registry.get(sheet_name)
+            for unique_id_value, row_data in updates.items():
+                row_index = index.row_number(unique_id_col, unique_id_value) if index is not None else None
+                if row_index is None:
+                    st.error(f"L'identifiant '{unique_id_value}' n'a pas été trouvé dans la colonne '{unique_id_col}' de l'onglet '{sheet_name}'.")
+                    return False
+                changed_cells = _diff_row_cells(list_of_headers, index.row_values(row_index), row_data)
+                if changed_cells:
+                    cell_updates[row_index] = changed_cells
+
+        if not cell_updates:
+            return True # Rien n'a changé : aucun appel à l'API
+
+        _get_storage_backend().update_cells(sheet_name, [
+            (row_index, col_position + 1, value)
+            for row_index, changed_cells in cell_updates.items()
+            for col_position, value in changed_cells.items()
+        ])
+        with index_registry.lock():
+            index = index_registry.get(sheet_name)
+            if index is None:
+                _invalidate_after_write(sheet_name)
+                return True
+            for row_index, changed_cells in cell_updates.items():
+                index.record_cells(row_index, changed_cells)
+            updated_rows = [list(index.row_values(row_index)) for row_index in cell_updates]
+            # Invalider uniquement l'onglet modifié
+            _invalidate_after_write(sheet_name, lambda replica: replica.replace_rows(sheet_name, _coerce_dataframe(sheet_name, [index.headers] + updated_rows), list(cell_updates)))
         return True
-    except gspread.exceptions.CellNotFound:
-        st.error(f"L'identifiant '{unique_id_value}' n'a pas été trouvé dans la colonne '{unique_id_col}' de l'onglet '{sheet_name}'.")
-        return False
     except gspread.exceptions.APIError as e:
         st.error(f"Erreur API Google Sheets lors de la mise à jour dans '{sheet_name}': {e.response.text}")
         return False
@@ -207,28 +1400,38 @@ def update_row_in_sheet(sheet_name: str, unique_id_col: str, unique_id_value: st
         st.error(f"Erreur lors de la mise à jour de la ligne dans l'onglet '{sheet_name}': {e}")
         return False
 
+def update_row_in_sheet(sheet_name: str, unique_id_col: str, unique_id_value: str, row_data: dict) -> bool:
+    """
+    Met à jour une ligne existante dans l'onglet spécifié, identifiée par une colonne et une valeur unique.
+    unique_id_col: Nom de la colonne qui contient l'identifiant unique (ex: 'ID_Morceau').
+    unique_id_value: La valeur de l'identifiant unique de la ligne à mettre à jour.
+    row_data: Dictionnaire des données à mettre à jour (clés = en-têtes de colonnes).
+    Seules les cellules modifiées sont envoyées (voir update_rows_in_sheet).
+    """
+    return update_rows_in_sheet(sheet_name, unique_id_col, {unique_id_value: row_data})
+
 def delete_row_from_sheet(sheet_name: str, unique_id_col: str, unique_id_value: str) -> bool:
     """
     Supprime une ligne de l'onglet spécifié, identifiée par une colonne et une valeur unique.
     """
     try:
-        spreadsheet = gc.open(SHEET_NAME)
-        worksheet = spreadsheet.worksheet(WORKSHEET_NAMES[sheet_name])
-        
-        list_of_headers = worksheet.row_values(1)
-        try:
-            id_col_index = list_of_headers.index(unique_id_col) + 1
-        except ValueError:
+        id_col_position = _get_column_position(sheet_name, unique_id_col)
+        if id_col_position is None:
             st.error(f"La colonne '{unique_id_col}' est introuvable dans l'onglet '{sheet_name}'.")
             return False
 
-        cell = worksheet.find(unique_id_value, in_column=id_col_index)
-        worksheet.delete_rows(cell.row)
-        st.cache_data.clear() # Invalider le cache après une suppression
+        row_index = _find_row_number(sheet_name, unique_id_col, unique_id_value)
+        if row_index is None:
+            st.error(f"L'identifiant '{unique_id_value}' n'a pas été trouvé dans la colonne '{unique_id_col}' de l'onglet '{sheet_name}'.")
+            return False
+        _get_storage_backend().delete_row(sheet_name, row_index)
+        index_registry = _get_row_index_registry()
+        with index_registry.lock():
+            index = index_registry.get(sheet_name)
+            if index is not None:
+                index.record_delete(row_index) # Les lignes suivantes remontent d'un rang dans l'index
+            _invalidate_after_write(sheet_name, lambda replica: replica.delete_row(sheet_name, row_index)) # Invalider uniquement l'onglet modifié
         return True
-    except gspread.exceptions.CellNotFound:
-        st.error(f"L'identifiant '{unique_id_value}' n'a pas été trouvé dans la colonne '{unique_id_col}' de l'onglet '{sheet_name}'.")
-        return False
     except gspread.exceptions.APIError as e:
         st.error(f"Erreur API Google Sheets lors de la suppression dans '{sheet_name}': {e.response.text}")
         return False
@@ -236,6 +1439,204 @@ def delete_row_from_sheet(sheet_name: str, unique_id_col: str, unique_id_value:
         st.error(f"Erreur lors de la suppression de la ligne dans l'onglet '{sheet_name}': {e}")
         return False
 
+# --- Écriture différée (write-behind) pour les onglets en ajout seul ---
+
+class _WriteBehindQueue:
+    """
+    File d'écriture différée pour les onglets où l'on ne fait qu'ajouter des lignes (historique...).
+    Un thread d'arrière-plan regroupe les lignes et les envoie par `append_rows`, dès que
+    `batch_size` lignes attendent ou au plus tard toutes les `flush_interval_seconds` secondes.
+    La file est bornée : quand elle est pleine, l'appelant la vide lui-même plutôt que de perdre des lignes.
+    Les lignes restent en file d'une exécution du script à l'autre ; en fin d'exécution, la file n'est vidée que si
+    l'un des seuils est atteint sans que le thread l'ait fait (flush_write_behind_at_run_end). Elle est aussi vidée
+    à l'arrêt du processus (atexit), ce qui n'est pas garanti s'il est tué : au plus `flush_interval_seconds`
+    secondes de lignes peuvent alors être perdues.
+    """
+
+    def __init__(self, max_size: int, batch_size: int, flush_interval_seconds: float):
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self._queue = queue.Queue(maxsize=max_size)
+        self._failed_rows = [] # (onglet, valeurs) à renvoyer au prochain vidage après une erreur API
+        self._dropped_counts = defaultdict(int) # Lignes abandonnées par onglet, pas encore signalées à l'utilisateur
+        self._pending_counts = defaultdict(int)
+        self._oldest_pending_at = None # Instant de mise en file de la plus ancienne ligne en attente
+        self._counts_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sheets-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def enqueue(self, sheet_name: str, values: list):
+        with self._counts_lock:
+            self._pending_counts[sheet_name] += 1
+            if self._oldest_pending_at is None:
+                self._oldest_pending_at = time.monotonic()
+        try:
+            self._queue.put_nowait((sheet_name, values))
+        except queue.Full:
+            self.flush() # File pleine : écriture synchrone pour libérer de la place
+            self._queue.put((sheet_name, values))
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def has_pending(self, sheet_name: str = None) -> bool:
+        """Indique si des lignes de cet onglet (ou de n'importe quel onglet) attendent encore d'être écrites."""
+        with self._counts_lock:
+            if sheet_name is None:
+                return any(count > 0 for count in self._pending_counts.values())
+            return self._pending_counts[sheet_name] > 0
+
+    def is_due(self) -> bool:
+        """Vrai si `batch_size` lignes attendent ou si la plus ancienne attend depuis plus de `flush_interval_seconds`."""
+        with self._counts_lock:
+            oldest = self._oldest_pending_at
+        return self._queue.qsize() >= self.batch_size or (oldest is not None and time.monotonic() - oldest >= self.flush_interval_seconds)
+
+    def failed_count(self) -> int:
+        """Nombre de lignes en échec d'écriture, renvoyées au prochain vidage."""
+        return len(self._failed_rows)
+
+    def take_dropped_counts(self) -> dict:
+        """Retourne (et oublie) le nombre de lignes abandonnées par onglet depuis le dernier appel."""
+        with self._counts_lock:
+            dropped, self._dropped_counts = dict(self._dropped_counts), defaultdict(int)
+            return dropped
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(timeout=self.flush_interval_seconds)
+            self._wakeup.clear()
+            # Budget de requêtes bas : on le laisse aux actions de l'utilisateur, tant que la file n'est pas à moitié pleine
+            remaining_budget = get_sheets_quota_remaining()
+            if remaining_budget is not None and remaining_budget <= SHEETS_QUOTA_INTERACTIVE_RESERVE and self._queue.qsize() < self._queue.maxsize // 2:
+                continue
+            try:
+                self.flush(priority=PRIORITY_BACKGROUND)
+            except Exception:
+                logger.exception("Échec du vidage de la file d'écriture différée")
+
+    def _without_already_written(self, failed_rows: list, priority: int) -> list:
+        """
+        Une erreur serveur peut arriver alors que l'ajout a été appliqué : avant de renvoyer des lignes en échec,
+        on retire celles dont l'identifiant (première colonne) est déjà dans l'onglet, pour ne pas les dupliquer.
+        Si l'onglet ne peut pas être relu, les lignes restent en échec sans être renvoyées.
+        """
+        if not failed_rows:
+            return []
+        to_send, kept = [], []
+        for sheet_name in dict.fromkeys(sheet for sheet, _ in failed_rows):
+            rows = [values for sheet, values in failed_rows if sheet == sheet_name]
+            try:
+                written_ids = set(_get_storage_backend().read_column(sheet_name, 1, priority=priority))
+            except Exception:
+                logger.exception("Impossible de vérifier les lignes déjà écrites dans '%s', renvoi reporté", sheet_name)
+                kept.extend((sheet_name, values) for values in rows)
+                continue
+            already_written = [values for values in rows if values and values[0] in written_ids]
+            if already_written:
+                logger.warning("%d ligne(s) en échec étaient déjà écrites dans '%s', non renvoyées", len(already_written), sheet_name)
+                _invalidate_after_write(sheet_name, existing_rows_changed=False)
+                with self._counts_lock:
+                    self._pending_counts[sheet_name] -= len(already_written)
+            to_send.extend((sheet_name, values) for values in rows if not (values and values[0] in written_ids))
+        self._failed_rows.extend(kept)
+        return to_send
+
+    def flush(self, priority: int = PRIORITY_INTERACTIVE) -> int:
+        """
+        Envoie toutes les lignes en attente, un appel `append_rows` par onglet. Retourne le nombre de lignes écrites.
+        Le vidage périodique passe après les appels interactifs ; un vidage demandé par un lecteur ne fait pas la queue.
+        """
+        with self._flush_lock:
+            failed_rows, self._failed_rows = self._failed_rows, []
+            with self._counts_lock:
+                self._oldest_pending_at = None # Les lignes mises en file après ce point relancent le délai
+            pending = self._without_already_written(failed_rows, priority)
+            while True:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows_by_sheet = defaultdict(list)
+            for sheet_name, values in pending:
+                rows_by_sheet[sheet_name].append(values)
+
+            written = 0
+            for sheet_name, rows in rows_by_sheet.items():
+                try:
+                    _append_rows_now(sheet_name, rows, priority=priority)
+                    written += len(rows)
+                    with self._counts_lock:
+                        self._pending_counts[sheet_name] -= len(rows)
+                except Exception:
+                    logger.exception("Échec de l'écriture différée de %d ligne(s) dans '%s', nouvel essai au prochain vidage", len(rows), sheet_name)
+                    self._failed_rows.extend((sheet_name, values) for values in rows)
+
+            # Les lignes en échec restent bornées par la taille de la file : les plus anciennes sont abandonnées
+            overflow = len(self._failed_rows) - self._queue.maxsize
+            if overflow > 0:
+                dropped, self._failed_rows = self._failed_rows[:overflow], self._failed_rows[overflow:]
+                logger.error("File d'écriture différée saturée : %d ligne(s) abandonnée(s)", len(dropped))
+                with self._counts_lock:
+                    for sheet_name, _ in dropped:
+                        self._pending_counts[sheet_name] -= 1
+                        self._dropped_counts[sheet_name] += 1
+            if self._failed_rows:
+                with self._counts_lock:
+                    self._oldest_pending_at = self._oldest_pending_at or time.monotonic()
+            return written
+
+@st.cache_resource # Une seule file (et un seul thread) par processus, conservée entre les reruns
+def _get_write_behind_queue() -> _WriteBehindQueue:
+    return _WriteBehindQueue(
+        max_size=WRITE_BEHIND_MAX_QUEUE_SIZE,
+        batch_size=WRITE_BEHIND_BATCH_SIZE,
+        flush_interval_seconds=WRITE_BEHIND_FLUSH_INTERVAL_SECONDS
+    )
+
+def queue_row_for_append(sheet_name: str, row_data: dict) -> bool:
+    """
+    Ajoute une ligne en écriture différée si l'onglet fait partie de WRITE_BEHIND_TABS,
+    sinon l'écrit immédiatement via append_row_to_sheet.
+    Retourne True si la ligne a été mise en file (ou écrite).
+    """
+    if sheet_name not in WRITE_BEHIND_TABS:
+        return append_row_to_sheet(sheet_name, row_data)
+    try:
+        _get_write_behind_queue().enqueue(sheet_name, _order_row_values(sheet_name, row_data))
+        return True
+    except Exception as e:
+        st.error(f"Erreur lors de la mise en file de la ligne pour l'onglet '{sheet_name}': {e}")
+        return False
+
+def flush_write_behind_queue() -> int:
+    """Force l'envoi immédiat des lignes en attente. Retourne le nombre de lignes écrites."""
+    return _get_write_behind_queue().flush()
+
+def flush_write_behind_at_run_end():
+    """
+    En fin d'exécution du script : vide la file d'écriture différée seulement si un seuil de vidage est atteint
+    (le thread d'arrière-plan est en retard), sinon les lignes attendent d'être regroupées avec les suivantes.
+    Prévient l'utilisateur des lignes encore en échec (renvoyées au prochain vidage) ou abandonnées faute de place.
+    """
+    write_behind = _get_write_behind_queue()
+    if write_behind.is_due():
+        write_behind.flush()
+    failed = write_behind.failed_count()
+    if failed:
+        st.warning(f"{failed} ligne(s) d'historique n'ont pas encore pu être écrites dans Google Sheets : nouvel essai au prochain vidage.")
+    for sheet_name, count in write_behind.take_dropped_counts().items():
+        st.warning(f"{count} ligne(s) de l'onglet '{sheet_name}' ont été abandonnées après des échecs d'écriture répétés (voir les logs du serveur).")
+
+def _flush_pending_writes(sheet_name: str):
+    """Vide la file d'écriture différée si elle contient des lignes de cet onglet (lecture de ses propres écritures)."""
+    if sheet_name in WRITE_BEHIND_TABS:
+        write_behind = _get_write_behind_queue()
+        if write_behind.has_pending(sheet_name):
+            write_behind.flush()
+
 # --- Fonctions spécifiques pour chaque onglet (simplifiées pour les ajouts/mises à jour) ---
 # Ces fonctions sont des wrappers qui ajoutent des ID uniques et des dates si nécessaire
 # avant d'appeler les fonctions append_row_to_sheet et update_row_in_sheet.
@@ -247,6 +1648,16 @@ def add_morceau_generes(data: dict) -> bool:
     data['Date_Mise_A_Jour'] = datetime.now().strftime('%Y-%m-%d')
     return append_row_to_sheet("MORCEAUX_GENERES", data)
 
+def add_morceaux_generes(rows: list) -> bool:
+    """Ajoute plusieurs morceaux en une seule écriture groupée (identifiants et dates complétés comme add_morceau_generes)."""
+    today = datetime.now().strftime('%Y-%m-%d')
+    for data in rows:
+        if 'ID_Morceau' not in data or not data['ID_Morceau']:
+            data['ID_Morceau'] = generate_unique_id('M')
+        data['Date_Creation'] = today
+        data['Date_Mise_A_Jour'] = today
+    return append_dataframe_to_sheet("MORCEAUX_GENERES", pd.DataFrame(rows))
+
 def update_morceau_generes(morceau_id: str, data: dict) -> bool:
     data['Date_Mise_A_Jour'] = datetime.now().strftime('%Y-%m-%d')
     return update_row_in_sheet("MORCEAUX_GENERES", 'ID_Morceau', morceau_id, data)
@@ -389,7 +1800,7 @@ def add_historique_generation(data: dict) -> bool:
     data['ID_GenLog'] = generate_unique_id('LOG')
     data['Date_Heure'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     data['ID_Utilisateur'] = st.session_state.get('user_id', 'Gardien') # Récupère l'ID utilisateur de la session
-    return append_row_to_sheet("HISTORIQUE_GENERATIONS", data)
+    return queue_row_for_append("HISTORIQUE_GENERATIONS", data) # Écriture différée : ne bloque pas la réponse de l'Oracle
 
 # Fonctions génériques pour obtenir toutes les données d'un onglet
 def get_all_morceaux():
@@ -455,5 +1866,16 @@ def get_all_timeline_evenements():
 def get_all_paroles_existantes():
     return get_dataframe_from_sheet("PAROLES_EXISTANTES")
 
+def get_recent_historique_generations(count: int = TAIL_WINDOW_ROWS):
+    """Les `count` dernières générations, sans lire tout l'historique."""
+    return get_last_rows("HISTORIQUE_GENERATIONS", count)
+
 def get_all_historique_generations():
     return get_dataframe_from_sheet("HISTORIQUE_GENERATIONS")
+
+def get_full_history_with_archive() -> pd.DataFrame:
+    """
+    Tout l'historique des générations : lignes archivées (toutes les partitions) puis onglet HISTORIQUE_GENERATIONS.
+    Plus coûteux que get_all_historique_generations, qui ne lit que l'onglet.
+    """
+    return get_historique_generations()
@@ -0,0 +1,209 @@
+# sqlite_replica.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from config import WORKSHEET_NAMES, COLUMN_TYPES
+
+# Type SQLite de chaque type déclaré dans config.COLUMN_TYPES
+_SQL_TYPES = {'int': 'INTEGER', 'float': 'REAL', 'bool': 'INTEGER', 'date': 'TEXT', 'str': 'TEXT'}
+# Colonnes indexées : identifiants et colonnes de filtre courantes (statut, genre)
+_INDEXED_PREFIXES = ('ID_', 'Statut_', 'Genre_')
+# Numéro de la ligne dans le Google Sheet (en-tête = ligne 1), conservé pour répercuter les écritures
+_ROW_NUMBER_COL = '_ligne'
+_META_TABLE = '_onglets_repliques'
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+def hash_tab_values(data: list) -> str:
+    """Empreinte du contenu brut d'un onglet (en-têtes + lignes), pour savoir s'il a changé depuis la dernière synchronisation."""
+    digest = hashlib.sha256()
+    for row in data:
+        digest.update('\x1f'.join(row).encode('utf-8'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+class SheetsReplica:
+    """
+    Copie locale (SQLite) des onglets du Google Sheet : une table typée par onglet, avec les mêmes
+    colonnes et les mêmes types que les DataFrames de get_dataframe_from_sheet.
+    Un onglet est « à jour » après une synchronisation complète et tant qu'aucune écriture n'a échoué
+    à y être répercutée ; un onglet périmé garde ses lignes, utilisables en secours.
+    Le fichier est la seule copie locale conservée entre les redémarrages. L'empreinte du contenu brut lu
+    lors de la synchronisation évite de réécrire un onglet inchangé ; elle est effacée par toute écriture locale.
+    """
+
+    def __init__(self, db_path: str):
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        meta_columns = [row[1] for row in self._conn.execute(f"PRAGMA table_info({_META_TABLE})")]
+        if meta_columns and 'empreinte' not in meta_columns:
+            self._conn.execute(f"DROP TABLE {_META_TABLE}") # Réplica d'une version précédente : resynchronisé en entier
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {_META_TABLE} (onglet TEXT PRIMARY KEY, colonnes TEXT, a_jour INTEGER, synchronise_le REAL, empreinte TEXT)")
+        self._conn.commit()
+
+    def _column_types(self, sheet_name: str) -> dict:
+        return COLUMN_TYPES.get(WORKSHEET_NAMES[sheet_name], {})
+
+    def _meta(self, sheet_name: str):
+        return self._conn.execute(f"SELECT colonnes, a_jour, synchronise_le FROM {_META_TABLE} WHERE onglet = ?", (sheet_name,)).fetchone()
+
+    def _columns(self, sheet_name: str) -> list:
+        meta = self._meta(sheet_name)
+        return meta[0].split('\x1f') if meta and meta[0] else []
+
+    def is_fresh(self, sheet_name: str) -> bool:
+        with self._lock:
+            meta = self._meta(sheet_name)
+            return bool(meta and meta[1])
+
+    def synced_at(self, sheet_name: str):
+        """Horodatage (time.time) de la dernière synchronisation complète de l'onglet, ou None."""
+        with self._lock:
+            meta = self._meta(sheet_name)
+            return meta[2] if meta else None
+
+    def content_hash(self, sheet_name: str):
+        """Empreinte du contenu brut de la dernière synchronisation, si l'onglet est à jour et n'a pas été modifié depuis."""
+        with self._lock:
+            meta = self._conn.execute(f"SELECT a_jour, empreinte FROM {_META_TABLE} WHERE onglet = ?", (sheet_name,)).fetchone()
+            return meta[1] if meta and meta[0] else None
+
+    def touch(self, sheet_name: str):
+        """Contenu relu et identique à la dernière synchronisation : seul l'instant de synchronisation est mis à jour."""
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE {_META_TABLE} SET synchronise_le = ? WHERE onglet = ? AND a_jour = 1", (time.time(), sheet_name))
+
+    def _forget_content_hash(self, sheet_name: str):
+        self._conn.execute(f"UPDATE {_META_TABLE} SET empreinte = NULL WHERE onglet = ?", (sheet_name,))
+
+    def invalidate(self, sheet_name: str):
+        """Marque l'onglet comme périmé : il sera relu depuis Google Sheets avant d'être resservi."""
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE {_META_TABLE} SET a_jour = 0 WHERE onglet = ?", (sheet_name,))
+
+    def _records(self, sheet_name: str, df: pd.DataFrame, row_numbers: list) -> list:
+        """Lignes prêtes pour executemany : types Python natifs, NULL pour les valeurs manquantes."""
+        column_types = self._column_types(sheet_name)
+        values = []
+        for col in df.columns:
+            series = df[col]
+            if column_types.get(col) == 'bool':
+                series = series.astype(bool).astype(int)
+            values.append(series.astype(object).where(series.notna(), None).tolist())
+        return list(zip(row_numbers, *values))
+
+    def _insert(self, sheet_name: str, df: pd.DataFrame, row_numbers: list):
+        columns = [_ROW_NUMBER_COL] + list(df.columns)
+        placeholders = ', '.join('?' for _ in columns)
+        self._conn.executemany(
+            f"INSERT INTO {_quote(WORKSHEET_NAMES[sheet_name])} ({', '.join(_quote(col) for col in columns)}) VALUES ({placeholders})",
+            self._records(sheet_name, df, row_numbers)
+        )
+
+    def _check_columns(self, sheet_name: str, df: pd.DataFrame):
+        if self._columns(sheet_name) != list(df.columns):
+            raise ValueError(f"Les colonnes de l'onglet '{sheet_name}' ne correspondent plus au réplica local.")
+
+    def replace_tab(self, sheet_name: str, df: pd.DataFrame, content_hash: str = None):
+        """
+        Remplace tout le contenu de l'onglet (synchronisation complète). La ligne i du DataFrame est la ligne i + 2 du Sheet.
+        `content_hash` est l'empreinte (hash_tab_values) des valeurs brutes dont `df` est issu.
+        """
+        table = _quote(WORKSHEET_NAMES[sheet_name])
+        column_types = self._column_types(sheet_name)
+        column_defs = ', '.join(f"{_quote(col)} {_SQL_TYPES[column_types.get(col, 'str')]}" for col in df.columns)
+        with self._lock, self._conn:
+            self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self._conn.execute(f"CREATE TABLE {table} ({_quote(_ROW_NUMBER_COL)} INTEGER, {column_defs})")
+            self._conn.execute(f"CREATE INDEX {_quote('idx_' + WORKSHEET_NAMES[sheet_name] + _ROW_NUMBER_COL)} ON {table} ({_quote(_ROW_NUMBER_COL)})")
+            for col in df.columns:
+                if col.startswith(_INDEXED_PREFIXES):
+                    self._conn.execute(f"CREATE INDEX {_quote('idx_' + WORKSHEET_NAMES[sheet_name] + '_' + col)} ON {table} ({_quote(col)})")
+            self._insert(sheet_name, df, list(range(2, len(df) + 2)))
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {_META_TABLE} (onglet, colonnes, a_jour, synchronise_le, empreinte) VALUES (?, ?, 1, ?, ?)",
+                (sheet_name, '\x1f'.join(df.columns), time.time(), content_hash)
+            )
+
+    def insert_rows(self, sheet_name: str, df: pd.DataFrame, first_row_number: int):
+        """Insère des lignes écrites à partir de `first_row_number`, en décalant les lignes suivantes."""
+        table = _quote(WORKSHEET_NAMES[sheet_name])
+        with self._lock, self._conn:
+            self._check_columns(sheet_name, df)
+            self._conn.execute(f"UPDATE {table} SET {_quote(_ROW_NUMBER_COL)} = {_quote(_ROW_NUMBER_COL)} + ? WHERE {_quote(_ROW_NUMBER_COL)} >= ?", (len(df), first_row_number))
+            self._insert(sheet_name, df, list(range(first_row_number, first_row_number + len(df))))
+            self._forget_content_hash(sheet_name)
+
+    def replace_rows(self, sheet_name: str, df: pd.DataFrame, row_numbers: list):
+        """Remplace des lignes existantes (après une mise à jour) par leur nouveau contenu."""
+        table = _quote(WORKSHEET_NAMES[sheet_name])
+        with self._lock, self._conn:
+            self._check_columns(sheet_name, df)
+            self._conn.executemany(f"DELETE FROM {table} WHERE {_quote(_ROW_NUMBER_COL)} = ?", [(row_number,) for row_number in row_numbers])
+            self._insert(sheet_name, df, row_numbers)
+            self._forget_content_hash(sheet_name)
+
+    def delete_row(self, sheet_name: str, row_number: int):
+        """Supprime une ligne et remonte les suivantes d'un rang, comme dans le Sheet."""
+        table = _quote(WORKSHEET_NAMES[sheet_name])
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {table} WHERE {_quote(_ROW_NUMBER_COL)} = ?", (row_number,))
+            self._conn.execute(f"UPDATE {table} SET {_quote(_ROW_NUMBER_COL)} = {_quote(_ROW_NUMBER_COL)} - 1 WHERE {_quote(_ROW_NUMBER_COL)} > ?", (row_number,))
+            self._forget_content_hash(sheet_name)
+
+    def _restore_types(self, sheet_name: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Redonne aux colonnes lues les types produits par la conversion de sheets_connector."""
+        column_types = self._column_types(sheet_name)
+        for col in df.columns:
+            col_type = column_types.get(col, 'str')
+            if col_type == 'bool':
+                df[col] = df[col].fillna(0).astype(bool)
+            elif col_type == 'int':
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+            elif col_type == 'float':
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+            else:
+                df[col] = df[col].astype(object).where(df[col].notna(), '')
+        return df
+
+    def query(self, sheet_name: str, filters: dict = None, allow_stale: bool = False, columns: list = None):
+        """
+        Lignes de l'onglet, dans l'ordre du Sheet, filtrées par égalité sur les colonnes de `filters`
+        (requête SQL indexée) et limitées aux colonnes `columns` si fourni.
+        Retourne None si l'onglet n'est pas répliqué (ou périmé, sauf `allow_stale`).
+        """
+        filters = filters or {}
+        with self._lock:
+            meta = self._meta(sheet_name)
+            if not meta or not (meta[1] or allow_stale):
+                return None
+            tab_columns = self._columns(sheet_name)
+            selected_columns = columns or tab_columns
+            unknown = [col for col in list(filters) + list(selected_columns) if col not in tab_columns]
+            if unknown:
+                raise KeyError(f"Colonnes inconnues dans l'onglet '{sheet_name}': {', '.join(unknown)}")
+            column_types = self._column_types(sheet_name)
+            where = ' AND '.join(f"{_quote(col)} = ?" for col in filters)
+            params = [int(value) if column_types.get(col) == 'bool' else value for col, value in filters.items()]
+            sql = (
+                f"SELECT {', '.join(_quote(col) for col in selected_columns)} FROM {_quote(WORKSHEET_NAMES[sheet_name])}"
+                + (f" WHERE {where}" if where else "")
+                + f" ORDER BY {_quote(_ROW_NUMBER_COL)}"
+            )
+            df = pd.read_sql_query(sql, self._conn, params=params)
+        return self._restore_types(sheet_name, df)
+
+    def read_tab(self, sheet_name: str, allow_stale: bool = False):
+        """Tout l'onglet sous forme de DataFrame, ou None s'il n'est pas disponible."""
+        return self.query(sheet_name, allow_stale=allow_stale)
@@ -0,0 +1,425 @@
+# storage_backends.py
+
+import streamlit as st
+import gspread
+from gspread.utils import absolute_range_name, fill_gaps, a1_to_rowcol, rowcol_to_a1
+from config import (
+    SHEET_NAME, WORKSHEET_NAMES, EXPECTED_COLUMNS,
+    SHEETS_QUOTA_REQUESTS_PER_MINUTE, SHEETS_QUOTA_INTERACTIVE_RESERVE,
+    SHEETS_MAX_RETRIES, SHEETS_BACKOFF_BASE_SECONDS, SHEETS_BACKOFF_MAX_SECONDS,
+    SQLITE_BACKEND_PATH, MEMORY_BACKEND_LATENCY_SECONDS
+)
+from rate_limiting import TokenBucket, RateLimiter, PRIORITY_INTERACTIVE
+from abc import ABC, abstractmethod
+import base64
+import json # Nécessaire pour décoder le JSON de la clé
+import os
+import sqlite3
+import threading
+import time
+
+class TabNotFoundError(Exception):
+    """L'onglet demandé n'existe pas dans le stockage."""
+
+class StorageBackend(ABC):
+    """
+    Stockage des onglets du classeur. Chaque onglet est un tableau de chaînes dont la ligne 1 contient
+    les en-têtes ; lignes et colonnes sont numérotées à partir de 1, comme dans Google Sheets.
+    Les onglets sont désignés par leur clé dans WORKSHEET_NAMES. `priority` n'a d'effet que
+    pour les stockages soumis à un quota.
+    Un stockage implémente au moins read_tab, append_rows, update_cells et delete_row (méthodes abstraites :
+    un stockage incomplet ne peut pas être instancié) ; les autres lectures ont une version par défaut.
+    """
+
+    @abstractmethod
+    def read_tab(self, sheet_name: str, priority: int = PRIORITY_INTERACTIVE) -> list:
+        """Toutes les valeurs de l'onglet (en-têtes compris), en lignes de même longueur."""
+
+    def read_tabs(self, sheet_names: list, priority: int = PRIORITY_INTERACTIVE) -> dict:
+        """Valeurs de plusieurs onglets : {nom_onglet: valeurs}."""
+        return {sheet_name: self.read_tab(sheet_name, priority) for sheet_name in sheet_names}
+
+    def read_headers(self, sheet_name: str, priority: int = PRIORITY_INTERACTIVE) -> list:
+        header_rows = self.read_rows(sheet_name, 1, 1, priority)
+        return list(header_rows[0]) if header_rows else []
+
+    def read_rows(self, sheet_name: str, first_row: int, last_row: int = None, priority: int = PRIORITY_INTERACTIVE) -> list:
+        """
+        Lignes `first_row` à `last_row` incluses (jusqu'à la fin de l'onglet si `last_row` est None).
+        Une ligne peut être plus courte que les en-têtes si ses dernières cellules sont vides.
+        """
+        return self.read_tab(sheet_name, priority)[first_row - 1:last_row]
+
+    def read_column(self, sheet_name: str, col_number: int, priority: int = PRIORITY_INTERACTIVE) -> list:
+        """Valeurs d'une colonne, en-tête compris ; les cellules vides en fin de colonne peuvent être omises."""
+        return self.read_columns(sheet_name, [col_number], priority)[0]
+
+    def read_columns(self, sheet_name: str, col_numbers: list, priority: int = PRIORITY_INTERACTIVE) -> list:
+        """Valeurs de plusieurs colonnes (une liste par colonne, dans l'ordre demandé), comme read_column."""
+        data = self.read_tab(sheet_name, priority)
+        return [[row[col_number - 1] if len(row) >= col_number else '' for row in data] for col_number in col_numbers]
+
+    @abstractmethod
+    def append_rows(self, sheet_name: str, rows: list, priority: int = PRIORITY_INTERACTIVE):
+        """Ajoute des lignes en fin d'onglet. Retourne le numéro de la première ligne écrite (None si inconnu)."""
+
+    @abstractmethod
+    def update_cells(self, sheet_name: str, cells: list, priority: int = PRIORITY_INTERACTIVE):
+        """Écrit des cellules isolées : liste de (numéro de ligne, numéro de colonne, valeur)."""
+
+    @abstractmethod
+    def delete_row(self, sheet_name: str, row_number: int, priority: int = PRIORITY_INTERACTIVE):
+        """Supprime une ligne ; les lignes suivantes remontent d'un rang."""
+
+    def delete_rows(self, sheet_name: str, first_row: int, last_row: int, priority: int = PRIORITY_INTERACTIVE):
+        """Supprime les lignes `first_row` à `last_row` (incluses) ; les lignes suivantes remontent d'autant."""
+        for row_number in range(last_row, first_row - 1, -1):
+            self.delete_row(sheet_name, row_number, priority)
+
+    def forget(self, sheet_name: str):
+        """Oublie ce qui est conservé pour un onglet (handles...), ex: après un renommage de colonnes."""
+
+    def reset(self):
+        """Oublie tout ce qui est conservé (ex: classeur introuvable, partage révoqué)."""
+
+    def remaining_budget(self):
+        """Nombre de requêtes possibles immédiatement, ou None si le stockage n'a pas de quota."""
+        return None
+
+def _rectangular(data: list) -> list:
+    """Copie des lignes complétées par des chaînes vides jusqu'à la largeur de la plus longue."""
+    return fill_gaps([list(row) for row in data]) if data else []
+
+# --- Google Sheets ---
+
+@st.cache_resource(ttl=3600) # Mise en cache de la connexion pendant 1 heure
+def get_gspread_client():
+    """
+    Initialise et retourne un client gspread authentifié.
+    Utilise les secrets Streamlit pour l'authentification du compte de service (clé JSON encodée en Base64).
+    """
+    try:
+        service_account_info_b64 = st.secrets["GCP_SERVICE_ACCOUNT_B64"]
+
+        # Décode la chaîne Base64 en JSON. Gère les retours à la ligne qui peuvent être dans la clé privée.
+        service_account_info_json_str = base64.b64decode(service_account_info_b64).decode('utf-8')
+        creds = json.loads(service_account_info_json_str)
+
+        gc = gspread.service_account_from_dict(creds)
+        return gc
+    except KeyError:
+        st.error("La clé 'GCP_SERVICE_ACCOUNT_B64' est manquante dans votre fichier .streamlit/secrets.toml. Veuillez la configurer.")
+        st.stop()
+    except json.JSONDecodeError as e:
+        st.error(f"Erreur de décodage JSON de la clé de service. Assurez-vous que le contenu Base64 est un JSON valide: {e}")
+        st.stop()
+    except Exception as e:
+        st.error(f"Erreur d'authentification gspread. Assurez-vous que la clé GCP_SERVICE_ACCOUNT_B64 est correctement encodée et configurée: {e}")
+        st.stop()
+
+def _is_retryable_sheets_error(exc: Exception) -> bool:
+    """Erreurs transitoires qui méritent une nouvelle tentative : quota dépassé (429) et erreurs serveur (5xx)."""
+    if not isinstance(exc, gspread.exceptions.APIError):
+        return False
+    status = exc.response.status_code if exc.response is not None else exc.code
+    return status == 429 or status >= 500
+
+def _is_sheets_quota_error(exc: Exception) -> bool:
+    return isinstance(exc, gspread.exceptions.APIError) and exc.response is not None and exc.response.status_code == 429
+
+def _create_sheets_rate_limiter() -> RateLimiter:
+    bucket = TokenBucket(
+        capacity=SHEETS_QUOTA_REQUESTS_PER_MINUTE,
+        refill_per_second=SHEETS_QUOTA_REQUESTS_PER_MINUTE / 60,
+        interactive_reserve=SHEETS_QUOTA_INTERACTIVE_RESERVE
+    )
+    return RateLimiter(
+        bucket,
+        is_retryable=_is_retryable_sheets_error,
+        is_throttled=_is_sheets_quota_error,
+        max_retries=SHEETS_MAX_RETRIES,
+        base_delay=SHEETS_BACKOFF_BASE_SECONDS,
+        max_delay=SHEETS_BACKOFF_MAX_SECONDS
+    )
+
+def _get_appended_row_number(append_response: dict):
+    """Extrait le numéro de la première ligne écrite de la réponse de l'API `values.append`."""
+    updated_range = append_response.get('updates', {}).get('updatedRange', '')
+    if '!' not in updated_range:
+        return None
+    first_cell = updated_range.split('!')[1].split(':')[0]
+    return a1_to_rowcol(first_cell)[0]
+
+class GoogleSheetsBackend(StorageBackend):
+    """
+    Stockage dans le Google Sheet SHEET_NAME. Le client n'est authentifié qu'au premier appel ;
+    le Spreadsheet et les Worksheets sont ouverts une seule fois puis conservés.
+    Tous les appels passent par le limiteur de débit (quota, nouvelles tentatives sur 429/5xx).
+    Les ajouts et suppressions de lignes ne sont rejoués que sur 429 : après une erreur 5xx, la modification
+    a pu être appliquée, et la rejouer dupliquerait les lignes ou supprimerait des lignes décalées.
+    """
+
+    def __init__(self, client_factory, rate_limiter: RateLimiter):
+        self._client_factory = client_factory
+        self._rate_limiter = rate_limiter
+        self._lock = threading.RLock()
+        self._spreadsheet = None
+        self._worksheets = {}
+
+    def _call(self, func, *args, priority: int = PRIORITY_INTERACTIVE, idempotent: bool = True, **kwargs):
+        return self._rate_limiter.call(func, *args, priority=priority, idempotent=idempotent, **kwargs)
+
+    def _get_spreadsheet(self):
+        with self._lock:
+            if self._spreadsheet is None:
+                self._spreadsheet = self._call(self._client_factory().open, SHEET_NAME)
+            return self._spreadsheet
+
+    def _get_worksheet(self, sheet_name: str):
+        with self._lock:
+            if sheet_name not in self._worksheets:
+                # Un seul appel de métadonnées ouvre tous les onglets, au lieu d'un appel par onglet
+                worksheets_by_title = {worksheet.title: worksheet for worksheet in self._call(self._get_spreadsheet().worksheets)}
+                for name, title in WORKSHEET_NAMES.items():
+                    if title in worksheets_by_title:
+                        self._worksheets[name] = worksheets_by_title[title]
+                if sheet_name not in self._worksheets:
+                    raise TabNotFoundError(WORKSHEET_NAMES[sheet_name])
+            return self._worksheets[sheet_name]
+
+    def read_tab(self, sheet_name: str, priority: int = PRIORITY_INTERACTIVE) -> list:
+        return self._call(self._get_worksheet(sheet_name).get_all_values, priority=priority)
+
+    def read_tabs(self, sheet_names: list, priority: int = PRIORITY_INTERACTIVE) -> dict:
+        """Une seule requête `values_batch_get` pour tous les onglets demandés."""
+        ranges = [absolute_range_name(WORKSHEET_NAMES[sheet_name]) for sheet_name in sheet_names]
+        response = self._call(self._get_spreadsheet().values_batch_get, ranges, priority=priority)
+        # L'API renvoie les plages dans l'ordre demandé. Les lignes sont tronquées
+        # après la dernière cellule non vide, fill_gaps les remet à la même largeur.
+        return {
+            sheet_name: _rectangular(value_range.get('values', []))
+            for sheet_name, value_range in zip(sheet_names, response.get('valueRanges', []))
+        }
+
+    def read_headers(self, sheet_name: str, priority: int = PRIORITY_INTERACTIVE) -> list:
+        return self._call(self._get_worksheet(sheet_name).row_values, 1, priority=priority)
+
+    def read_rows(self, sheet_name: str, first_row: int, last_row: int = None, priority: int = PRIORITY_INTERACTIVE) -> list:
+        """Une requête sur la seule plage de lignes demandée (ex: 'A120:K' pour tout ce qui suit la ligne 119)."""
+        worksheet = self._get_worksheet(sheet_name)
+        last_col = rowcol_to_a1(1, worksheet.col_count).rstrip('0123456789')
+        range_name = f"A{first_row}:{last_col}{last_row if last_row is not None else ''}"
+        return [list(row) for row in self._call(worksheet.get_values, range_name, priority=priority)]
+
+    def read_column(self, sheet_name: str, col_number: int, priority: int = PRIORITY_INTERACTIVE) -> list:
+        values = self._call(self._get_worksheet(sheet_name).col_values, col_number, priority=priority)
+        return ['' if value is None else value for value in values]
+
+    def read_columns(self, sheet_name: str, col_numbers: list, priority: int = PRIORITY_INTERACTIVE) -> list:
+        """Une seule requête `values_batch_get` (une plage 'B:B' par colonne), par colonnes plutôt que par lignes."""
+        title = WORKSHEET_NAMES[sheet_name]
+        ranges = []
+        for col_number in col_numbers:
+            col_letter = rowcol_to_a1(1, col_number).rstrip('0123456789')
+            ranges.append(absolute_range_name(title, f"{col_letter}:{col_letter}"))
+        response = self._call(self._get_spreadsheet().values_batch_get, ranges, params={'majorDimension': 'COLUMNS'}, priority=priority)
+        return [(value_range.get('values') or [[]])[0] for value_range in response.get('valueRanges', [])]
+
+    def append_rows(self, sheet_name: str, rows: list, priority: int = PRIORITY_INTERACTIVE):
+        response = self._call(self._get_worksheet(sheet_name).append_rows, rows, priority=priority, idempotent=False)
+        return _get_appended_row_number(response)
+
+    def update_cells(self, sheet_name: str, cells: list, priority: int = PRIORITY_INTERACTIVE):
+        self._call(self._get_worksheet(sheet_name).batch_update, [
+            {'range': rowcol_to_a1(row_number, col_number), 'values': [[value]]}
+            for row_number, col_number, value in cells
+        ], priority=priority)
+
+    def delete_row(self, sheet_name: str, row_number: int, priority: int = PRIORITY_INTERACTIVE):
+        self._call(self._get_worksheet(sheet_name).delete_rows, row_number, priority=priority, idempotent=False)
+
+    def delete_rows(self, sheet_name: str, first_row: int, last_row: int, priority: int = PRIORITY_INTERACTIVE):
+        self._call(self._get_worksheet(sheet_name).delete_rows, first_row, last_row, priority=priority, idempotent=False) # Une seule requête
+
+    def forget(self, sheet_name: str):
+        with self._lock:
+            self._worksheets.pop(sheet_name, None)
+
+    def reset(self):
+        with self._lock:
+            self._spreadsheet = None
+            self._worksheets.clear()
+
+    def remaining_budget(self):
+        return self._rate_limiter.remaining_budget()
+
+# --- Stockages locaux (hors ligne, tests de charge) ---
+
+def _initial_tab(sheet_name: str) -> list:
+    """Onglet vide avec les en-têtes attendus."""
+    return [list(EXPECTED_COLUMNS.get(WORKSHEET_NAMES[sheet_name], []))]
+
+class InMemoryBackend(StorageBackend):
+    """
+    Stockage en mémoire du processus, initialisé avec des onglets vides aux en-têtes attendus.
+    `latency_seconds` simule le temps d'aller-retour d'un stockage distant pour les mesures de performance.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self._lock = threading.RLock()
+        self._tabs = {sheet_name: _initial_tab(sheet_name) for sheet_name in WORKSHEET_NAMES}
+
+    def _simulate_latency(self):
+        # En dehors du verrou : des appels simultanés se chevauchent, comme avec un stockage distant
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def _tab(self, sheet_name: str) -> list:
+        if sheet_name not in self._tabs:
+            raise TabNotFoundError(sheet_name)
+        return self._tabs[sheet_name]
+
+    def load_tab(self, sheet_name: str, data: list):
+        """Remplace tout le contenu d'un onglet (en-têtes compris), ex: pour préparer un jeu de données."""
+        with self._lock:
+            self._tabs[sheet_name] = [list(map(str, row)) for row in data]
+
+    def read_tab(self, sheet_name: str, priority: int = PRIORITY_INTERACTIVE) -> list:
+        self._simulate_latency()
+        with self._lock:
+            return _rectangular(self._tab(sheet_name))
+
+    def read_rows(self, sheet_name: str, first_row: int, last_row: int = None, priority: int = PRIORITY_INTERACTIVE) -> list:
+        self._simulate_latency()
+        with self._lock:
+            return [list(row) for row in self._tab(sheet_name)[first_row - 1:last_row]]
+
+    def read_columns(self, sheet_name: str, col_numbers: list, priority: int = PRIORITY_INTERACTIVE) -> list:
+        self._simulate_latency()
+        with self._lock:
+            tab = self._tab(sheet_name)
+            return [[row[col_number - 1] if len(row) >= col_number else '' for row in tab] for col_number in col_numbers]
+
+    def append_rows(self, sheet_name: str, rows: list, priority: int = PRIORITY_INTERACTIVE):
+        self._simulate_latency()
+        with self._lock:
+            tab = self._tab(sheet_name)
+            first_row_number = len(tab) + 1
+            tab.extend(list(row) for row in rows)
+            return first_row_number
+
+    def update_cells(self, sheet_name: str, cells: list, priority: int = PRIORITY_INTERACTIVE):
+        self._simulate_latency()
+        with self._lock:
+            tab = self._tab(sheet_name)
+            for row_number, col_number, value in cells:
+                tab.extend([] for _ in range(row_number - len(tab)))
+                row = tab[row_number - 1]
+                row.extend([''] * (col_number - len(row)))
+                row[col_number - 1] = value
+
+    def delete_row(self, sheet_name: str, row_number: int, priority: int = PRIORITY_INTERACTIVE):
+        self._simulate_latency()
+        with self._lock:
+            tab = self._tab(sheet_name)
+            if row_number <= len(tab):
+                del tab[row_number - 1]
+
+    def delete_rows(self, sheet_name: str, first_row: int, last_row: int, priority: int = PRIORITY_INTERACTIVE):
+        self._simulate_latency()
+        with self._lock:
+            del self._tab(sheet_name)[first_row - 1:last_row]
+
+class SQLiteBackend(StorageBackend):
+    """
+    Stockage dans un fichier SQLite local, organisé comme un classeur : une ligne SQL par ligne d'onglet,
+    valeurs conservées en texte (JSON). Permet de faire tourner l'application sans compte Google.
+    """
+
+    def __init__(self, db_path: str):
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS lignes (onglet TEXT, ligne INTEGER, valeurs TEXT)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_lignes_onglet_ligne ON lignes (onglet, ligne)")
+
+    def _ensure_tab(self, sheet_name: str):
+        if sheet_name not in WORKSHEET_NAMES:
+            raise TabNotFoundError(sheet_name)
+        if self._conn.execute("SELECT 1 FROM lignes WHERE onglet = ? LIMIT 1", (sheet_name,)).fetchone() is None:
+            self._conn.execute("INSERT INTO lignes (onglet, ligne, valeurs) VALUES (?, 1, ?)", (sheet_name, json.dumps(_initial_tab(sheet_name)[0])))
+
+    def read_tab(self, sheet_name: str, priority: int = PRIORITY_INTERACTIVE) -> list:
+        with self._lock, self._conn:
+            self._ensure_tab(sheet_name)
+            rows = self._conn.execute("SELECT valeurs FROM lignes WHERE onglet = ? ORDER BY ligne", (sheet_name,)).fetchall()
+        return _rectangular([json.loads(values) for (values,) in rows])
+
+    def read_rows(self, sheet_name: str, first_row: int, last_row: int = None, priority: int = PRIORITY_INTERACTIVE) -> list:
+        with self._lock, self._conn:
+            self._ensure_tab(sheet_name)
+            rows = self._conn.execute(
+                "SELECT valeurs FROM lignes WHERE onglet = ? AND ligne >= ? AND ligne <= ? ORDER BY ligne",
+                (sheet_name, first_row, last_row if last_row is not None else 2 ** 62)
+            ).fetchall()
+        return [json.loads(values) for (values,) in rows]
+
+    def read_columns(self, sheet_name: str, col_numbers: list, priority: int = PRIORITY_INTERACTIVE) -> list:
+        selected = ', '.join('json_extract(valeurs, ?)' for _ in col_numbers)
+        with self._lock, self._conn:
+            self._ensure_tab(sheet_name)
+            rows = self._conn.execute(
+                f"SELECT {selected} FROM lignes WHERE onglet = ? ORDER BY ligne",
+                [f"$[{col_number - 1}]" for col_number in col_numbers] + [sheet_name]
+            ).fetchall()
+        return [['' if row[position] is None else str(row[position]) for row in rows] for position in range(len(col_numbers))]
+
+    def append_rows(self, sheet_name: str, rows: list, priority: int = PRIORITY_INTERACTIVE):
+        with self._lock, self._conn:
+            self._ensure_tab(sheet_name)
+            (last_row_number,) = self._conn.execute("SELECT MAX(ligne) FROM lignes WHERE onglet = ?", (sheet_name,)).fetchone()
+            first_row_number = last_row_number + 1
+            self._conn.executemany(
+                "INSERT INTO lignes (onglet, ligne, valeurs) VALUES (?, ?, ?)",
+                [(sheet_name, first_row_number + offset, json.dumps([str(value) for value in row])) for offset, row in enumerate(rows)]
+            )
+            return first_row_number
+
+    def update_cells(self, sheet_name: str, cells: list, priority: int = PRIORITY_INTERACTIVE):
+        with self._lock, self._conn:
+            self._ensure_tab(sheet_name)
+            for row_number, col_number, value in cells:
+                found = self._conn.execute("SELECT valeurs FROM lignes WHERE onglet = ? AND ligne = ?", (sheet_name, row_number)).fetchone()
+                row = json.loads(found[0]) if found else []
+                row.extend([''] * (col_number - len(row)))
+                row[col_number - 1] = value
+                if found:
+                    self._conn.execute("UPDATE lignes SET valeurs = ? WHERE onglet = ? AND ligne = ?", (json.dumps(row), sheet_name, row_number))
+                else:
+                    self._conn.execute("INSERT INTO lignes (onglet, ligne, valeurs) VALUES (?, ?, ?)", (sheet_name, row_number, json.dumps(row)))
+
+    def delete_row(self, sheet_name: str, row_number: int, priority: int = PRIORITY_INTERACTIVE):
+        with self._lock, self._conn:
+            self._ensure_tab(sheet_name)
+            self._conn.execute("DELETE FROM lignes WHERE onglet = ? AND ligne = ?", (sheet_name, row_number))
+            self._conn.execute("UPDATE lignes SET ligne = ligne - 1 WHERE onglet = ? AND ligne > ?", (sheet_name, row_number))
+
+    def delete_rows(self, sheet_name: str, first_row: int, last_row: int, priority: int = PRIORITY_INTERACTIVE):
+        with self._lock, self._conn:
+            self._ensure_tab(sheet_name)
+            self._conn.execute("DELETE FROM lignes WHERE onglet = ? AND ligne BETWEEN ? AND ?", (sheet_name, first_row, last_row))
+            self._conn.execute("UPDATE lignes SET ligne = ligne - ? WHERE onglet = ? AND ligne > ?", (last_row - first_row + 1, sheet_name, last_row))
+
+def create_storage_backend(kind: str) -> StorageBackend:
+    """Crée le stockage choisi par config.STORAGE_BACKEND : 'google_sheets', 'sqlite' ou 'memory'."""
+    if kind == "google_sheets":
+        return GoogleSheetsBackend(get_gspread_client, _create_sheets_rate_limiter())
+    if kind == "sqlite":
+        return SQLiteBackend(SQLITE_BACKEND_PATH)
+    if kind == "memory":
+        return InMemoryBackend(latency_seconds=MEMORY_BACKEND_LATENCY_SECONDS)
+    raise ValueError(f"Stockage inconnu : '{kind}'. Valeurs possibles : 'google_sheets', 'sqlite', 'memory'.")
@@ -3,6 +3,8 @@
 import os
 import streamlit as st
 import pandas as pd
+import numpy as np
+import pyarrow as pa
 from datetime import datetime
 import random
 
@@ -100,3 +102,79 @@ def safe_cast_to_float(value):
         return float(value)
     except (ValueError, TypeError):
         return None
+
+# Nombre décimal après nettoyage des séparateurs ("-1234.5", ".5", "1e3")
+_NUMBER_PATTERN = r'[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?'
+
+def parse_number_series(series: pd.Series, integer: bool = False) -> pd.Series:
+    """
+    Convertit une colonne de texte en nombres de façon vectorisée (valeur manquante si échec).
+    Espaces et points sont des séparateurs de milliers lorsque la virgule est le séparateur décimal ("1.234,5").
+    Pour les entiers, les points sont toujours des séparateurs de milliers et la valeur est tronquée,
+    comme dans safe_cast_to_int ; le résultat est en Int64 (entier nullable, <NA> pour les cellules vides).
+    Les textes "nan", "inf" ou "infinity" ne sont pas des nombres.
+    """
+    try:
+        # Chemin rapide : colonne déjà propre (cas des valeurs écrites par l'application elle-même)
+        numbers = series.astype('int64' if integer else 'float64')
+        if integer:
+            return numbers.astype('Int64')
+        if np.isfinite(numbers).all(): # float() accepte "nan" et "inf" : ces colonnes passent par le chemin complet
+            return numbers
+    except (ValueError, TypeError, OverflowError):
+        pass
+
+    # Nettoyage sur des chaînes Arrow, dont les accesseurs .str ne bouclent pas en Python
+    text = series.astype(str).astype(pd.ArrowDtype(pa.string())).str.replace(r'[\s\x{00a0}\x{202f}]', '', regex=True)
+    if integer:
+        text = text.str.replace('.', '', regex=False)
+    else:
+        has_decimal_comma = text.str.contains(',', regex=False)
+        text = text.where(~has_decimal_comma, text.str.replace('.', '', regex=False))
+    text = text.str.replace(',', '.', regex=False)
+    is_number = text.str.fullmatch(_NUMBER_PATTERN).fillna(False).astype(bool)
+    numbers = text.where(is_number, None).astype(pd.ArrowDtype(pa.float64())).astype(float)
+    if not integer:
+        return numbers
+    return np.trunc(numbers).astype('Int64')
+
+def parse_boolean_series(series: pd.Series) -> pd.Series:
+    """Version vectorisée de parse_boolean_string pour une colonne de texte."""
+    if series.isin(['VRAI', 'FAUX', '']).all():
+        return series.eq('VRAI')
+    return series.astype(str).str.strip().str.upper().eq('VRAI')
+
+def parse_date_series(series: pd.Series, date_formats: list) -> pd.Series:
+    """
+    Lit une colonne de dates avec des formats explicites (essayés dans l'ordre) et la renvoie au format AAAA-MM-JJ.
+    Les dates se répètent beaucoup : seules les valeurs distinctes sont analysées.
+    """
+    codes, uniques = pd.factorize(series.astype(str).str.strip())
+    uniques = pd.Series(uniques)
+    parsed = pd.Series(pd.NaT, index=uniques.index, dtype='datetime64[ns]')
+    for date_format in date_formats:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed = parsed.fillna(pd.to_datetime(uniques[missing], format=date_format, errors='coerce'))
+    formatted = parsed.dt.strftime('%Y-%m-%d').fillna('').to_numpy(dtype=object)
+    # factorize renvoie -1 pour les valeurs manquantes : on les mappe sur une chaîne vide
+    return pd.Series(np.append(formatted, '')[codes], index=series.index, dtype=object)
+
+def coerce_dataframe_types(df: pd.DataFrame, column_types: dict, date_formats: list) -> pd.DataFrame:
+    """
+    Applique un schéma {colonne: 'int' | 'float' | 'bool' | 'date' | 'str'} à un DataFrame de texte brut.
+    Chaque colonne est convertie en une seule opération vectorisée ; les colonnes absentes du schéma restent du texte.
+    """
+    for col, col_type in column_types.items():
+        if col not in df.columns:
+            continue
+        if col_type == 'int':
+            df[col] = parse_number_series(df[col], integer=True)
+        elif col_type == 'float':
+            df[col] = parse_number_series(df[col])
+        elif col_type == 'bool':
+            df[col] = parse_boolean_series(df[col])
+        elif col_type == 'date':
+            df[col] = parse_date_series(df[col], date_formats)
+    return df